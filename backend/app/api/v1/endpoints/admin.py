@@ -0,0 +1,151 @@
+from fastapi import Path, Query, HTTPException, Depends
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+from app.core.endpoints.endpoint import BaseEndpoint
+from app.services.authentication import admin_user_check
+from app.services.profiling import Profiles, PROFILE_FORMATS
+from app.services.memory import Memory, GROUP_BY
+from app.schemas.admin import (
+    SlowQueryStat,
+    RequestProfile,
+    MemorySnapshot,
+    MemoryStatus,
+    MemoryStat,
+    RequestMemoryStat
+)
+from app.schemas.base import DefaultResponse
+from app.core.config import MEMORY_TRACE_FRAMES
+from typing import List, Optional
+from app.db import database
+
+
+class AdminEndpoint(BaseEndpoint):
+    def __init__(self):
+        super().__init__()
+
+        self.router.get(
+            "/slow-queries",
+            response_model=List[SlowQueryStat],
+            summary="Top slow queries",
+            description="Admin only: Slowest statements from the slow-query log, ordered by total time"
+        )(self.get_slow_queries)
+
+        self.router.get(
+            "/profiles",
+            response_model=List[RequestProfile],
+            summary="List request profiles",
+            description="Admin only: Profiles captured with the X-Profile header, newest first"
+        )(self.get_profiles)
+
+        self.router.get(
+            "/profiles/{profile_id}",
+            summary="Download a request profile",
+            description="Admin only: Call tree (text), collapsed stacks (folded) or raw cProfile dump (pstats)"
+        )(self.get_profile)
+
+        self.router.get(
+            "/memory",
+            response_model=MemoryStatus,
+            summary="Memory tracing status",
+            description="Admin only: tracemalloc status and snapshots of the worker serving the request"
+        )(self.get_memory_status)
+
+        self.router.post(
+            "/memory/start",
+            response_model=DefaultResponse,
+            summary="Start memory tracing",
+            description="Admin only: Start tracemalloc in this worker"
+        )(self.start_memory_tracing)
+
+        self.router.post(
+            "/memory/stop",
+            response_model=DefaultResponse,
+            summary="Stop memory tracing",
+            description="Admin only: Stop tracemalloc and drop snapshots in this worker"
+        )(self.stop_memory_tracing)
+
+        self.router.post(
+            "/memory/snapshots",
+            response_model=MemorySnapshot,
+            summary="Take a memory snapshot",
+            description="Admin only: Take a tracemalloc snapshot in this worker"
+        )(self.take_memory_snapshot)
+
+        self.router.get(
+            "/memory/diff",
+            response_model=List[MemoryStat],
+            summary="Diff memory snapshots",
+            description="Admin only: Allocation growth between two snapshots (or top allocations of one)"
+        )(self.get_memory_diff)
+
+        self.router.get(
+            "/memory/requests",
+            response_model=List[RequestMemoryStat],
+            summary="Per-request memory peaks",
+            description="Admin only: Peak allocation of sampled requests, grouped by route"
+        )(self.get_request_memory)
+
+    async def get_slow_queries(
+        self,
+        limit: int = Query(20, ge=1, le=200),
+        admin=Depends(admin_user_check)
+    ) -> List[SlowQueryStat]:
+        if database.SlowQueries is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Slow query log is disabled, set SLOW_QUERY_THRESHOLD_MS to enable it"
+            )
+        # Flushing the log queue and reading the files both block
+        return await run_in_threadpool(database.SlowQueries.top_offenders, limit=limit)
+
+    async def get_profiles(self, admin=Depends(admin_user_check)) -> List[RequestProfile]:
+        return Profiles.list()
+
+    async def get_profile(
+        self,
+        profile_id: str = Path(...),
+        format: str = Query("text", pattern="^(" + "|".join(PROFILE_FORMATS) + ")$"),
+        admin=Depends(admin_user_check)
+    ):
+        path = Profiles.path(profile_id, format)
+        if not path:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        media_type = "application/octet-stream" if format == "pstats" else "text/plain"
+        return FileResponse(path, media_type=media_type, filename=f"{profile_id}{PROFILE_FORMATS[format]}")
+
+    async def get_memory_status(self, admin=Depends(admin_user_check)) -> MemoryStatus:
+        return Memory.status()
+
+    async def start_memory_tracing(
+        self,
+        frames: int = Query(MEMORY_TRACE_FRAMES, ge=1, le=100),
+        admin=Depends(admin_user_check)
+    ) -> DefaultResponse:
+        Memory.start(frames)
+        return DefaultResponse(code=200, result="Memory tracing started")
+
+    async def stop_memory_tracing(self, admin=Depends(admin_user_check)) -> DefaultResponse:
+        Memory.stop()
+        return DefaultResponse(code=200, result="Memory tracing stopped")
+
+    async def take_memory_snapshot(self, admin=Depends(admin_user_check)) -> MemorySnapshot:
+        if not Memory.is_tracing:
+            raise HTTPException(status_code=400, detail="Memory tracing is not running in this worker")
+        return Memory.take_snapshot()
+
+    async def get_memory_diff(
+        self,
+        current: str = Query(...),
+        base: Optional[str] = Query(None),
+        group_by: str = Query("lineno", pattern="^(" + "|".join(GROUP_BY) + ")$"),
+        file_filter: Optional[str] = Query(None, alias="filter"),
+        limit: int = Query(30, ge=1, le=500),
+        admin=Depends(admin_user_check)
+    ) -> List[MemoryStat]:
+        try:
+            return Memory.diff(current, base_id=base, group_by=group_by, file_filter=file_filter, limit=limit)
+        except KeyError:
+            raise HTTPException(status_code=404, detail="Snapshot not found in this worker")
+
+    async def get_request_memory(self, admin=Depends(admin_user_check)) -> List[RequestMemoryStat]:
+        return Memory.request_stats()
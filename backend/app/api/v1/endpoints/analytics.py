@@ -0,0 +1,75 @@
+from fastapi import HTTPException, Depends, Path, Query, Request, Response
+from app.core.endpoints.endpoint import BaseEndpoint
+from app.core.endpoints.etag import make_etag, etag_matches, not_modified, set_etag
+from app.schemas.analytics import DurationStats, ProjectAnalytics, WeeklyThroughput
+from app.services.authentication import user_check
+from app.services.analytics import (
+    DONE, completion_durations, duration_stats, status_flow, to_date, weekly_completions
+)
+from app.db.relational import Projects, StatusHistory
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+
+class AnalyticsEndpoint(BaseEndpoint):
+    def __init__(self):
+        super().__init__()
+
+        self.router.get("/{project_id}", response_model=ProjectAnalytics)(self.get_project_analytics)
+
+    async def get_project_analytics(
+        self,
+        request: Request,
+        response: Response,
+        project_id: str = Path(...),
+        window_start: Optional[date] = Query(None, alias="from"),
+        window_end: Optional[date] = Query(None, alias="to"),
+        userinfo=Depends(user_check)
+    ) -> ProjectAnalytics:
+        """Burndown, cumulative flow, weekly throughput and cycle/lead times of a project."""
+        if not Projects.user_has_access(userinfo.id, project_id):
+            raise HTTPException(status_code=403, detail="No access to this project")
+        if window_start and window_end and window_start > window_end:
+            raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+        version = Projects.get_project_version(project_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Project not found")
+
+        # Status changes bump the version; the date covers the open-ended window growing daily
+        today = date.today()
+        etag = make_etag("analytics", project_id, version, f"{window_start}/{window_end}/{today}")
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        buckets = StatusHistory.get_status_days(project_id)
+        last = window_end or today
+        first = window_start or (min(to_date(buckets[0][0]), last) if buckets else last)
+        flow = status_flow(buckets, first, last)
+        counts = flow["counts"]
+        done = flow["statuses"].index(DONE) if DONE in flow["statuses"] else None
+        scope = counts.sum(axis=1)
+        remaining = scope - counts[:, done] if done is not None else scope
+
+        completions = StatusHistory.get_completions(
+            project_id,
+            datetime.combine(first, datetime.min.time()),
+            datetime.combine(last + timedelta(days=1), datetime.min.time())
+        )
+        durations = completion_durations(completions)
+
+        set_etag(response, etag)
+        return ProjectAnalytics(
+            project_id=project_id,
+            days=flow["days"],
+            cumulative_flow={
+                status: counts[:, i].tolist() for i, status in enumerate(flow["statuses"])
+            },
+            remaining=remaining.tolist(),
+            scope=scope.tolist(),
+            throughput=[
+                WeeklyThroughput(week_start=week, completed=completed)
+                for week, completed in weekly_completions(buckets, first, last)
+            ],
+            cycle_time=DurationStats(**duration_stats(durations["cycle"])),
+            lead_time=DurationStats(**duration_stats(durations["lead"]))
+        )
@@ -0,0 +1,64 @@
+from fastapi import Path, Body, HTTPException, Depends, Query
+from app.core.endpoints.endpoint import BaseEndpoint
+from app.schemas.task import TaskDependency, TaskDependencyCreate
+from app.schemas.base import DefaultResponse
+from app.services.authentication import user_check
+from app.db.relational import Dependencies, Projects, Tasks
+from typing import List
+
+
+class DependenciesEndpoint(BaseEndpoint):
+    def __init__(self):
+        super().__init__()
+
+        self.router.get("/", response_model=List[TaskDependency])(self.get_dependencies)
+        self.router.post("/", response_model=TaskDependency)(self.create_dependency)
+        self.router.delete("/{dependency_id}", response_model=DefaultResponse)(self.delete_dependency)
+
+    async def get_dependencies(
+        self,
+        project_id: str = Query(...),
+        userinfo=Depends(user_check)
+    ) -> List[TaskDependency]:
+        if not Projects.user_has_access(userinfo.id, project_id):
+            raise HTTPException(status_code=403, detail="No access to this project")
+        return Dependencies.get_project_dependencies(project_id)
+
+    async def create_dependency(
+        self,
+        dependency: TaskDependencyCreate = Body(...),
+        userinfo=Depends(user_check)
+    ) -> TaskDependency:
+        project_id = Tasks.get_task_project_id(dependency.predecessor_id)
+        if not project_id or not Tasks.get_task_project_id(dependency.successor_id):
+            raise HTTPException(status_code=404, detail="Task not found")
+
+        if not (userinfo.is_admin or Projects.is_project_manager(userinfo.id, project_id)):
+            raise HTTPException(
+                status_code=403,
+                detail="Only admins and project managers can link tasks"
+            )
+
+        try:
+            return Dependencies.add_dependency(dependency)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    async def delete_dependency(
+        self,
+        dependency_id: str = Path(...),
+        userinfo=Depends(user_check)
+    ) -> DefaultResponse:
+        dependency = Dependencies.get_dependency(dependency_id)
+        if not dependency:
+            raise HTTPException(status_code=404, detail="Dependency not found")
+
+        if not (userinfo.is_admin or Projects.is_project_manager(userinfo.id, dependency.project_id)):
+            raise HTTPException(
+                status_code=403,
+                detail="Only admins and project managers can unlink tasks"
+            )
+
+        if Dependencies.delete_dependency(dependency_id):
+            return DefaultResponse(code=200, result="Dependency deleted successfully")
+        raise HTTPException(status_code=404, detail="Dependency not found")
@@ -1,10 +1,14 @@
-from fastapi import Path, HTTPException, Depends
+from fastapi import Path, HTTPException, Depends, Request, Response, Query
 from app.core.endpoints.endpoint import BaseEndpoint
+from app.core.endpoints.etag import make_etag, etag_matches, not_modified, set_etag
 from app.services.authentication import user_check
-from app.db.relational import Projects, Tasks
-from typing import List, Optional
-from datetime import datetime
+from app.db.relational import Projects, Tasks, Dependencies
+from app.services.scheduling import ScheduleNode, critical_path, edges_from, predecessors_by_task
+from app.services.cache import GanttCache
+from typing import List, Literal, Optional
+from datetime import datetime, timezone
 from pydantic import BaseModel
+import hashlib
 
 
 class GanttTask(BaseModel):
@@ -16,6 +20,9 @@ class GanttTask(BaseModel):
     dependencies: List[str] = []
     parent: Optional[str] = None
     collapsed: bool = False
+    critical: bool = False
+    slack: Optional[float] = None  # total slack in days
+    kind: Literal["project", "task"] = "task"
 
 
 class GanttChart(BaseModel):
@@ -26,20 +33,19 @@ class GanttEndpoint(BaseEndpoint):
     def __init__(self):
         super().__init__()
 
+        # Registered before /{project_id} so "portfolio" is not taken for a project id
+        self.router.get("/portfolio", response_model=GanttChart)(self.get_portfolio)
         self.router.get("/{project_id}", response_model=GanttChart)(self.get_gantt)
 
     def _task_to_gantt(self, task, include_subtasks=True) -> List[GanttTask]:
         result = []
-        progress = 1.0 if task.status == 'completed' else (
-            0.5 if task.status == 'in_progress' else 0.0
-        )
-
         gantt_task = GanttTask(
             id=task.id,
             name=task.name,
             start=task.start_date,
             end=task.deadline,
-            progress=progress,
+            # Rolled up over the whole subtree, weighted by each leaf task's duration
+            progress=task.progress,
             parent=task.parent_task_id,
             dependencies=[]
         )
@@ -53,7 +59,10 @@ class GanttEndpoint(BaseEndpoint):
 
     async def get_gantt(
         self,
+        request: Request,
         project_id: str = Path(...),
+        window_start: Optional[datetime] = Query(None, alias="from"),
+        window_end: Optional[datetime] = Query(None, alias="to"),
         userinfo=Depends(user_check)
     ) -> GanttChart:
         # Check if user has access to project
@@ -63,10 +72,154 @@ class GanttEndpoint(BaseEndpoint):
                 detail="No access to this project"
             )
 
-        tasks = Tasks.get_project_tasks(project_id)
-        gantt_tasks = []
+        windowed = window_start is not None or window_end is not None
+        if window_start and window_end and window_start > window_end:
+            raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
 
-        for task in tasks:
-            gantt_tasks.extend(self._task_to_gantt(task))
+        # Answer revalidations from the project version before loading any task
+        version = Projects.get_project_version(project_id)
+        if version is None:
+            return self._build_chart(project_id, window_start, window_end)
+        variant = f"{window_start}/{window_end}" if windowed else ""
+        etag = make_etag("gantt", project_id, version, variant)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        # Charts are cached per version, so any write to the project invalidates them
+        cache_key = f"{project_id}@{variant}" if windowed else project_id
+        payload = GanttCache.get(cache_key, version)
+        if payload is None:
+            payload = self._build_chart(project_id, window_start, window_end).model_dump_json().encode()
+            GanttCache.put(cache_key, version, payload)
+        response = Response(content=payload, media_type="application/json")
+        set_etag(response, etag)
+        return response
+
+    def _build_chart(
+        self,
+        project_id: str,
+        window_start: Optional[datetime] = None,
+        window_end: Optional[datetime] = None
+    ) -> GanttChart:
+        edges = edges_from(Dependencies.get_project_dependencies(project_id))
+
+        if window_start is None and window_end is None:
+            # Every task at any depth, siblings in manual order
+            gantt_tasks = self._flat_to_gantt(Tasks.get_project_task_list(project_id))
+        else:
+            # Only tasks overlapping the viewport (and their ancestors) are loaded
+            tasks = Tasks.get_project_tasks_in_window(project_id, window_start, window_end)
+            gantt_tasks = self._flat_to_gantt(sorted(tasks, key=lambda t: (str(t.start_date), t.id)))
+        # Slack always comes from the whole project's dates, so both charts agree
+        nodes = [ScheduleNode(*row) for row in Tasks.get_project_schedule(project_id)]
+
+        # Critical path and slack; cached along with the rest of the chart
+        predecessors = predecessors_by_task(edges)
+        schedule = critical_path(nodes, edges)
+        for gantt_task in gantt_tasks:
+            gantt_task.dependencies = predecessors.get(gantt_task.id, [])
+            gantt_task.slack = schedule.slack.get(gantt_task.id)
+            gantt_task.critical = schedule.critical.get(gantt_task.id, False)
 
         return GanttChart(tasks=gantt_tasks)
+
+    def _flat_to_gantt(self, tasks) -> List[GanttTask]:
+        """Gantt bars for a flat task list, each parent followed by its subtree; siblings keep the list's order."""
+        ids = {task.id for task in tasks}
+        children = {}
+        roots = []
+        for task in tasks:
+            if task.parent_task_id in ids:
+                children.setdefault(task.parent_task_id, []).append(task)
+            else:
+                roots.append(task)
+
+        result = []
+        stack = list(reversed(roots))
+        while stack:
+            task = stack.pop()
+            result.extend(self._task_to_gantt(task, include_subtasks=False))
+            stack.extend(reversed(children.get(task.id, [])))
+        return result
+
+    async def get_portfolio(
+        self,
+        request: Request,
+        window_start: Optional[datetime] = Query(None, alias="from"),
+        window_end: Optional[datetime] = Query(None, alias="to"),
+        include_tasks: bool = False,
+        summary: bool = False,
+        userinfo=Depends(user_check)
+    ) -> GanttChart:
+        """One timeline across every project the user can see.
+
+        Each project is a bar (kind "project") spanning its planned dates, with
+        duration-weighted progress rolled up from its tasks; `include_tasks` adds the top-level
+        task bars under it. In `summary` mode each project collapses to a single
+        bar spanning all of its tasks and no task bars are returned.
+        """
+        if window_start and window_end and window_start > window_end:
+            raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+        versions = Projects.get_visible_project_versions(userinfo.id, userinfo.is_admin)
+        digest = hashlib.sha1(repr(versions).encode()).hexdigest()
+        variant = f"{window_start}/{window_end}/{include_tasks}/{summary}"
+        etag = make_etag("portfolio", "", digest, variant)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        project_ids = [project_id for project_id, _ in versions]
+        rollups = Tasks.get_project_rollups(project_ids)
+        low, high = _naive_utc(window_start), _naive_utc(window_end)
+
+        task_bars = {}
+        if include_tasks and not summary:
+            for task in Tasks.get_top_level_tasks(project_ids, window_start, window_end):
+                bar = self._task_to_gantt(task, include_subtasks=False)[0]
+                bar.parent = task.project_id
+                task_bars.setdefault(task.project_id, []).append(bar)
+
+        # One group per project: its bar followed by its task bars
+        groups = []
+        for project in Projects.get_projects_by_ids(project_ids):
+            start, end = _naive_utc(project.start_date), _naive_utc(project.deadline)
+            rollup = rollups.get(project.id)
+            if rollup and rollup["total"]:
+                # Same duration weighting as the task bars, over all top-level tasks
+                progress = min(rollup["progress_done"] / rollup["progress_weight"], 1.0)
+                if summary:
+                    start = min(start, rollup["start"] or start)
+                    end = max(end, rollup["end"] or end)
+            else:
+                progress = 1.0 if project.status == "completed" else (
+                    0.5 if project.status == "in_progress" else 0.0
+                )
+
+            children = task_bars.get(project.id, [])
+            overlaps = (low is None or end >= low) and (high is None or start <= high)
+            if not overlaps and not children:
+                continue
+            project_bar = GanttTask(
+                id=project.id,
+                name=project.name,
+                start=start,
+                end=end,
+                progress=round(progress, 4),
+                kind="project"
+            )
+            groups.append([project_bar] + sorted(children, key=lambda bar: _naive_utc(bar.start)))
+        groups.sort(key=lambda group: (group[0].start, group[0].id))
+
+        response = Response(
+            content=GanttChart(tasks=[bar for group in groups for bar in group]).model_dump_json(),
+            media_type="application/json"
+        )
+        set_etag(response, etag)
+        return response
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Drop the timezone (after converting to UTC) so stored and parsed dates compare."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
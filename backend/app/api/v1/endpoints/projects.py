@@ -1,15 +1,30 @@
-from fastapi import Path, Body, HTTPException, status, Depends
+import os
+import re
+import tempfile
+from fastapi import BackgroundTasks, Path, Body, HTTPException, status, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from app.core.endpoints.endpoint import BaseEndpoint
-from app.schemas.project import Project, ProjectCreate, ProjectUpdate, ProjectMember, ProjectMemberBase
+from app.core.endpoints.etag import make_etag, etag_matches, not_modified, set_etag
+from app.core.endpoints.cursor import encode_cursor, decode_cursor
+from app.schemas.project import (
+    BoardColumn, Project, ProjectBoard, ProjectCreate, ProjectImport, ProjectUpdate, ProjectMember,
+    ProjectMemberBase
+)
 from app.schemas.task import Task
 from app.schemas.base import DefaultResponse
 from app.services.authentication import admin_user_check, user_check
 from app.db.relational import Projects, Tasks
-from typing import List
+from app.services.cache import GanttCache
+from app.services.analytics import STATUS_ORDER
+from app.services.project_transfer import EXTENSIONS, FORMATS_BY_MEDIA_TYPE, MEDIA_TYPES, export_project, run_import
+from typing import List, Literal, Optional
 from app.schemas.users import UserRole
 from app.services.email_service import EmailService
 from app.db.relational import Users
-from app.core.config import SERVER_URL
+from app.core.config import PROJECT_IMPORT_MAX_BYTES, SERVER_URL
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class ProjectsEndpoint(BaseEndpoint):
@@ -18,23 +33,148 @@ class ProjectsEndpoint(BaseEndpoint):
 
         self.router.get("/", response_model=List[Project])(self.get_projects)
         self.router.post("/", response_model=Project)(self.create_project)
+        self.router.post("/import", response_model=ProjectImport, status_code=202)(self.import_project)
+        self.router.get("/imports/{import_id}", response_model=ProjectImport)(self.get_import)
         self.router.get("/{project_id}", response_model=Project)(self.get_project)
         self.router.put("/{project_id}", response_model=Project)(self.update_project)
         self.router.delete("/{project_id}", response_model=DefaultResponse)(self.delete_project)
+        self.router.get("/{project_id}/board", response_model=ProjectBoard)(self.get_board)
+        self.router.get("/{project_id}/export")(self.export_project)
         self.router.get("/{project_id}/members", response_model=List[ProjectMember])(self.get_project_members)
         self.router.post("/{project_id}/members", response_model=ProjectMember)(self.add_project_member)
         self.router.delete("/{project_id}/members/{user_id}",
                            response_model=DefaultResponse)(self.remove_project_member)
 
-    async def get_project(self, project_id: str = Path(...), userinfo=Depends(user_check)) -> Project:
-        if userinfo.role == UserRole.ADMIN:
-            project = Projects.get_project(project_id)
-        else:
-            project = Projects.get_user_project(userinfo.id, project_id)
+    async def get_project(
+        self,
+        request: Request,
+        response: Response,
+        project_id: str = Path(...),
+        userinfo=Depends(user_check)
+    ) -> Project:
+        if userinfo.role != UserRole.ADMIN and not Projects.user_has_access(userinfo.id, project_id):
+            raise HTTPException(status_code=404, detail="Project not found")
+        version = Projects.get_project_version(project_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Project not found")
+        etag = make_etag("project", project_id, version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        project = Projects.get_project(project_id)
         if not project:
             raise HTTPException(status_code=404, detail="Project not found")
+        set_etag(response, etag)
         return project
 
+    async def get_board(
+        self,
+        request: Request,
+        response: Response,
+        project_id: str = Path(...),
+        limit: int = Query(20, ge=1, le=200, description="Cards per column"),
+        column: Optional[str] = Query(None, alias="status", description="Only this column"),
+        cursor: Optional[str] = Query(None, description="`next_cursor` of the column's previous page"),
+        userinfo=Depends(user_check)
+    ) -> ProjectBoard:
+        """Kanban board: each status column's total and first page of cards."""
+        if not (userinfo.is_admin or Projects.user_has_access(userinfo.id, project_id)):
+            raise HTTPException(status_code=403, detail="No access to this project")
+        if cursor and column is None:
+            raise HTTPException(status_code=400, detail="A cursor pages through one column; pass its status")
+        after = decode_cursor(cursor)
+        version = Projects.get_project_version(project_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Project not found")
+
+        # Non-admins only see their own tasks, as in the task list
+        owner = None if userinfo.is_admin else userinfo.id
+        etag = make_etag("board", project_id, version, f"{owner or 'all'}/{column}/{cursor}/{limit}")
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        board = Tasks.get_board(project_id, user_id=owner, status=column, after=after, limit=limit)
+        statuses = [column] if column is not None else (
+            list(STATUS_ORDER) + sorted(set(board) - set(STATUS_ORDER))
+        )
+        columns = []
+        for column_status in statuses:
+            total, cards, next_key = board.get(column_status, (0, [], None))
+            columns.append(BoardColumn(
+                status=column_status, total=total, cards=cards, next_cursor=encode_cursor(next_key)
+            ))
+        set_etag(response, etag)
+        return ProjectBoard(project_id=project_id, columns=columns)
+
+    async def export_project(
+        self,
+        project_id: str = Path(...),
+        format: Literal["ndjson", "csv", "msproject"] = Query("ndjson"),
+        userinfo=Depends(user_check)
+    ) -> StreamingResponse:
+        """Stream a whole plan as NDJSON, CSV or MS Project XML, tasks in outline order.
+
+        X-Task-Count gives the number of tasks up front, for a progress bar.
+        """
+        if not (userinfo.is_admin or Projects.is_project_manager(userinfo.id, project_id)):
+            raise HTTPException(status_code=403, detail="Only project managers can export a project")
+        project = Projects.get_project(project_id)
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+        filename = re.sub(r"[^\w.-]+", "_", project.name).strip("_") or "project"
+        return StreamingResponse(
+            export_project(project_id, format),
+            media_type=MEDIA_TYPES[format],
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}.{EXTENSIONS[format]}"',
+                "X-Task-Count": str(Tasks.count_project_tasks(project_id))
+            }
+        )
+
+    async def import_project(
+        self,
+        request: Request,
+        background_tasks: BackgroundTasks,
+        format: Optional[Literal["ndjson", "csv", "msproject"]] = Query(
+            None, description="Defaults to the one named by the Content-Type"
+        ),
+        name: Optional[str] = Query(None, min_length=1, max_length=200, description="Overrides the file's"),
+        userinfo=Depends(user_check)
+    ) -> ProjectImport:
+        """Import a plan file, sent as the request body, into a new project.
+
+        The upload is spooled to disk and imported in the background; poll
+        GET /projects/imports/{id} for progress and the new project's id.
+        """
+        media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        format = format or FORMATS_BY_MEDIA_TYPE.get(media_type)
+        if format is None:
+            raise HTTPException(status_code=400, detail="Pass format=ndjson, csv or msproject")
+        fd, path = tempfile.mkstemp(prefix="project-import-")
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as upload:
+                async for chunk in request.stream():
+                    size += len(chunk)
+                    if size > PROJECT_IMPORT_MAX_BYTES:
+                        raise HTTPException(status_code=413, detail="The file is too large to import")
+                    upload.write(chunk)
+            if not size:
+                raise HTTPException(status_code=400, detail="The file is empty")
+        except BaseException:
+            os.unlink(path)
+            raise
+        job = Projects.create_import(userinfo.id, format, size)
+        background_tasks.add_task(run_import, job.id, path, format, userinfo.id, name, userinfo.is_admin)
+        return job
+
+    async def get_import(self, import_id: str = Path(...), userinfo=Depends(user_check)) -> ProjectImport:
+        """Progress of an import; only its uploader and admins can see it."""
+        job = Projects.get_import(import_id, user_id=None if userinfo.is_admin else userinfo.id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Import not found")
+        return job
+
     async def get_projects(self, include_tasks: bool = False, userinfo=Depends(user_check)) -> List[Project]:
         if userinfo.role == UserRole.ADMIN:
             projects = Projects.get_all_projects()
@@ -78,6 +218,7 @@ class ProjectsEndpoint(BaseEndpoint):
         if not Projects.is_project_manager(userinfo.id, project_id) and userinfo.role != UserRole.ADMIN:
             raise HTTPException(status_code=403, detail="Only project managers can delete projects")
         if Projects.delete_project(project_id):
+            GanttCache.invalidate(project_id)
             return DefaultResponse(code=200, result="Project deleted successfully")
         raise HTTPException(status_code=404, detail="Project not found")
 
@@ -120,8 +261,8 @@ class ProjectsEndpoint(BaseEndpoint):
                     project.name,
                     project_url
                 )
-            except Exception as e:
-                print(f"Error sending project assignment email: {e}")
+            except Exception:
+                logger.exception("Error sending project assignment email", extra={"project_id": project_id})
 
         return added_member
 
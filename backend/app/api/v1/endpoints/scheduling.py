@@ -0,0 +1,213 @@
+from fastapi import Body, HTTPException, Depends, Path, Query, Response
+from app.core.endpoints.endpoint import BaseEndpoint
+from app.core import config
+from app.schemas.base import DefaultResponse
+from app.schemas.scheduling import (
+    Overload, WorkloadReport, ScheduleChange, LevellingProposal, ForecastPercentile, ProjectForecast
+)
+from app.services.authentication import user_check
+from app.services.cache import ForecastCache
+from app.services.forecast import PERCENTILES, simulate
+from app.services.levelling import level, workload
+from app.services.workers import run_in_worker
+from app.services.scheduling import as_datetime, from_julian_day, julian_day
+from app.db.relational import Projects, Tasks, Dependencies
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+import hashlib
+
+
+class SchedulingEndpoint(BaseEndpoint):
+    def __init__(self):
+        super().__init__()
+
+        self.router.get("/workload", response_model=WorkloadReport)(self.get_workload)
+        self.router.get("/level", response_model=LevellingProposal)(self.get_levelling)
+        self.router.post("/level/apply", response_model=DefaultResponse)(self.apply_levelling)
+        self.router.get("/forecast/{project_id}", response_model=ProjectForecast)(self.get_forecast)
+
+    def _scope(self, project_id: Optional[str], userinfo) -> Dict[str, int]:
+        """{project id: version} of one project, or of every project the user can see."""
+        if project_id is None:
+            return dict(Projects.get_visible_project_versions(userinfo.id, userinfo.is_admin))
+        if not Projects.user_has_access(userinfo.id, project_id):
+            raise HTTPException(status_code=403, detail="No access to this project")
+        version = Projects.get_project_version(project_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Project not found")
+        return {project_id: version}
+
+    async def get_workload(
+        self,
+        project_id: Optional[str] = Query(None, description="Omit for the whole portfolio"),
+        userinfo=Depends(user_check)
+    ) -> WorkloadReport:
+        scope = self._scope(project_id, userinfo)
+        snapshot = Tasks.get_workload_snapshot(list(scope))
+        report = await run_in_worker(
+            workload,
+            [{"assignee": t["assignee"], "start": t["start"], "end": t["end"]} for t in snapshot],
+            config.LEVELLING_CAPACITY,
+            config.LEVELLING_MAX_DAYS
+        )
+        day0 = from_julian_day(report["day0"])
+        return WorkloadReport(
+            capacity=config.LEVELLING_CAPACITY,
+            overloaded_days=report["overloaded_days"],
+            overloads=[
+                Overload(
+                    user_id=user_id,
+                    start=(day0 + timedelta(days=start)).date(),
+                    end=(day0 + timedelta(days=end)).date(),
+                    peak=peak
+                )
+                for user_id, start, end, peak in report["overloads"]
+            ]
+        )
+
+    async def get_levelling(
+        self,
+        project_id: Optional[str] = Query(None, description="Omit for the whole portfolio"),
+        userinfo=Depends(user_check)
+    ) -> LevellingProposal:
+        """Propose a levelled schedule. Nothing is written; POST it to /level/apply."""
+        scope = self._scope(project_id, userinfo)
+        snapshot = Tasks.get_workload_snapshot(list(scope))
+        deadlines = Projects.get_project_deadlines(list(scope))
+        # Only pending tasks of the projects in scope move; everything else is load
+        tasks = [
+            {
+                "id": t["id"],
+                "assignee": t["assignee"],
+                "start": t["start"],
+                "end": t["end"],
+                "movable": t["project_id"] in scope and t["status"] == "pending",
+                "limit": deadlines.get(t["project_id"])
+            }
+            for t in snapshot
+        ]
+        result = await run_in_worker(
+            level,
+            tasks,
+            Dependencies.get_edges(list(scope)),
+            config.LEVELLING_CAPACITY,
+            config.LEVELLING_MAX_DAYS
+        )
+
+        by_id = {t["id"]: t for t in snapshot}
+        changes = []
+        for task_id, shift in result["shifts"].items():
+            task = by_id[task_id]
+            start, deadline = as_datetime(task["start_date"]), as_datetime(task["deadline"])
+            changes.append(ScheduleChange(
+                task_id=task_id,
+                project_id=task["project_id"],
+                assigned_to_id=task["assignee"],
+                start_date=start,
+                deadline=deadline,
+                new_start_date=start + timedelta(days=shift),
+                new_deadline=deadline + timedelta(days=shift),
+                shift_days=shift
+            ))
+        return LevellingProposal(
+            capacity=config.LEVELLING_CAPACITY,
+            changes=changes,
+            unresolved_task_ids=result["unresolved"],
+            overloaded_days_before=result["overloaded_days_before"],
+            overloaded_days_after=result["overloaded_days_after"],
+            base_versions=scope
+        )
+
+    async def apply_levelling(
+        self,
+        proposal: LevellingProposal = Body(...),
+        userinfo=Depends(user_check)
+    ) -> DefaultResponse:
+        for change in proposal.changes:
+            if change.project_id not in proposal.base_versions:
+                raise HTTPException(status_code=400, detail="Change outside the proposal's projects")
+        for project_id, version in proposal.base_versions.items():
+            if not (userinfo.is_admin or Projects.is_project_manager(userinfo.id, project_id)):
+                raise HTTPException(
+                    status_code=403,
+                    detail="Only admins and project managers can reschedule tasks"
+                )
+            if Projects.get_project_version(project_id) != version:
+                raise HTTPException(
+                    status_code=409,
+                    detail="The schedule changed since this proposal was made"
+                )
+
+        # New dates are the stored ones moved by shift_days, never taken from the body as posted
+        stored = Tasks.get_task_dates([change.task_id for change in proposal.changes])
+        dates = {}
+        for change in proposal.changes:
+            project_id, start, deadline = stored.get(change.task_id, (None, None, None))
+            if project_id != change.project_id:
+                raise HTTPException(status_code=400, detail="Task does not belong to the project")
+            if change.shift_days < 0:
+                raise HTTPException(status_code=400, detail="Levelling only moves tasks later")
+            shift = timedelta(days=change.shift_days)
+            new_start, new_deadline = as_datetime(start) + shift, as_datetime(deadline) + shift
+            if (change.new_start_date, change.new_deadline) != (new_start, new_deadline):
+                raise HTTPException(status_code=400, detail="New dates do not match shift_days")
+            dates[change.task_id] = (new_start, new_deadline)
+        Tasks.set_task_dates(dates)
+        return DefaultResponse(code=200, result=f"{len(dates)} tasks rescheduled")
+
+    async def get_forecast(
+        self,
+        project_id: str = Path(...),
+        iterations: Optional[int] = Query(None, ge=100, le=100000, description="Defaults to FORECAST_ITERATIONS"),
+        userinfo=Depends(user_check)
+    ) -> ProjectForecast:
+        """Monte Carlo completion forecast, cached until the project changes or the day ends."""
+        version = self._scope(project_id, userinfo)[project_id]
+        iterations = iterations or config.FORECAST_ITERATIONS
+        now = datetime.now(timezone.utc)
+        # Pending tasks start no earlier than now and the shared history grows with
+        # other projects, so a forecast also goes stale with the date
+        today = now.date()
+        cache_key = f"{project_id}:{iterations}:{today}"
+        payload = ForecastCache.get(cache_key, version)
+        if payload is None:
+            payload = (await self._forecast(project_id, version, iterations, now)).model_dump_json().encode()
+            ForecastCache.put(cache_key, version, payload)
+        return Response(content=payload, media_type="application/json")
+
+    async def _forecast(self, project_id: str, version: int, iterations: int, now: datetime) -> ProjectForecast:
+        # Fall back to everyone's history until the project has enough of its own
+        history, scope = Tasks.get_overrun_history(project_id), "project"
+        if len(history) < config.FORECAST_MIN_HISTORY:
+            history, scope = Tasks.get_overrun_history(), "all"
+        tasks = Tasks.get_open_task_spans(project_id)
+        deadline = Projects.get_project_deadlines([project_id])[project_id]
+        # Same version and day, same draws: workers differ only by how far into the day they run
+        seed = int(hashlib.sha1(f"{project_id}:{version}:{now.date()}".encode()).hexdigest()[:16], 16)
+
+        result = await run_in_worker(
+            simulate,
+            tasks,
+            Dependencies.get_edges([project_id]),
+            history,
+            julian_day(now),
+            iterations,
+            seed,
+            PERCENTILES,
+            deadline
+        )
+        return ProjectForecast(
+            project_id=project_id,
+            deadline=from_julian_day(deadline),
+            computed_at=now,
+            iterations=iterations,
+            tasks=len(tasks),
+            history_size=len(history),
+            history_scope=scope,
+            planned_finish=from_julian_day(result["planned_finish"]),
+            on_time_probability=result["on_time_probability"],
+            percentiles=[
+                ForecastPercentile(percentile=p, finish=from_julian_day(finish))
+                for p, finish in result["percentiles"].items()
+            ]
+        )
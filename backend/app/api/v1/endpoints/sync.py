@@ -0,0 +1,97 @@
+from fastapi import HTTPException, Depends, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from app.core.config import SYNC_STREAM_HEARTBEAT, SYNC_STREAM_MAX_PER_USER
+from app.core.endpoints.endpoint import BaseEndpoint
+from app.core.endpoints.cursor import encode_cursor, decode_cursor
+from app.schemas.sync import SyncChanges, Tombstone
+from app.services.authentication import user_check
+from app.services.change_stream import ChangeEvents, RESYNC, Subscriber
+from app.db.relational import Changes, Projects
+from typing import Optional
+
+
+def _cursor_seq(cursor: Optional[str]) -> Optional[int]:
+    key = decode_cursor(cursor, parts=1)
+    if key is None:
+        return None
+    if not key[0].isdigit():
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return int(key[0])
+
+
+class SyncEndpoint(BaseEndpoint):
+    def __init__(self):
+        super().__init__()
+
+        self.router.get("/", response_model=SyncChanges)(self.get_changes)
+        self.router.get("/events")(self.stream_events)
+
+    async def get_changes(
+        self,
+        since: Optional[str] = Query(None, description="`next_cursor` of the previous sync; none for a full sync"),
+        limit: int = Query(500, ge=1, le=5000, description="Most changed rows per response"),
+        userinfo=Depends(user_check)
+    ) -> SyncChanges:
+        """Projects, tasks, members and comments changed since the cursor, in the caller's projects.
+
+        Apply `deleted` before the changed rows, and keep calling with
+        `next_cursor` while `has_more` is set.
+        """
+        changes = Changes.get_changes(
+            userinfo.id, is_admin=userinfo.is_admin, since=_cursor_seq(since) or 0, limit=limit
+        )
+        return SyncChanges(
+            projects=changes["projects"],
+            tasks=changes["tasks"],
+            members=changes["members"],
+            comments=changes["comments"],
+            deleted=[Tombstone(entity=entity, id=entity_id) for entity, entity_id in changes["deleted"]],
+            next_cursor=encode_cursor((str(changes["next_seq"]),)),
+            has_more=changes["has_more"],
+            reset=changes["reset"]
+        )
+
+    async def stream_events(
+        self,
+        request: Request,
+        project_id: Optional[str] = Query(None, description="Only this project; all of the caller's by default"),
+        last_event_id: Optional[str] = Header(None),
+        userinfo=Depends(user_check)
+    ) -> StreamingResponse:
+        """Server-sent `change` events as projects, tasks, members and comments change.
+
+        Each event's id is a `/sync` cursor. A `resync` event means changes
+        were missed (the client reconnected late or read too slowly): call
+        `/sync` with the last event id seen.
+        """
+        if project_id and not Projects.user_has_access(userinfo.id, project_id):
+            raise HTTPException(status_code=403, detail="No access to this project")
+        resume_from = _cursor_seq(last_event_id)
+        project_ids = [] if userinfo.is_admin else [
+            pid for pid, _ in Projects.get_visible_project_versions(userinfo.id, False)
+        ]
+        subscriber = ChangeEvents.subscribe(
+            userinfo.id, userinfo.is_admin, project_ids, project_id, max_per_user=SYNC_STREAM_MAX_PER_USER
+        )
+        if subscriber is None:
+            raise HTTPException(status_code=429, detail="Too many open event streams")
+        return StreamingResponse(
+            self._events(request, subscriber, resume_from),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    async def _events(self, request: Request, subscriber: Subscriber, resume_from: Optional[int]):
+        try:
+            if resume_from is not None and resume_from < subscriber.start_seq:
+                yield RESYNC
+            while True:
+                event = await subscriber.next_event(SYNC_STREAM_HEARTBEAT)
+                if event is not None:
+                    yield event
+                elif await request.is_disconnected():
+                    break
+                else:
+                    yield ": keep-alive\n\n"
+        finally:
+            ChangeEvents.unsubscribe(subscriber)
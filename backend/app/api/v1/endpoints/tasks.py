@@ -1,12 +1,21 @@
-from fastapi import Path, Body, HTTPException, status, Depends, Query
+from fastapi import BackgroundTasks, Path, Body, HTTPException, status, Depends, Query, Request, Response
 from app.core.endpoints.endpoint import BaseEndpoint
-from app.schemas.task import Task, TaskCreate, TaskUpdate
+from app.core.endpoints.etag import make_etag, etag_matches, not_modified, set_etag
+from app.core.endpoints.cursor import encode_cursor, decode_cursor
+from app.schemas.task import (
+    MyTasksPage, Task, TaskBatch, TaskBatchResult, TaskCreate, TaskMove, TaskUpdate, TaskUpdateResult
+)
 from app.schemas.base import DefaultResponse
 from app.services.authentication import user_check
 from app.db.relational import Tasks, Projects, Users
-from typing import List
+from typing import List, Literal, Optional
+from datetime import datetime
+from peewee import DatabaseError
 from app.services.email_service import EmailService
-from app.core.config import SERVER_URL
+from app.core.config import SERVER_URL, TASK_BATCH_MAX_SIZE, TASK_RANK_MAX_LENGTH
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class TasksEndpoint(BaseEndpoint):
@@ -15,8 +24,14 @@ class TasksEndpoint(BaseEndpoint):
 
         self.router.get("/", response_model=List[Task])(self.get_tasks)
         self.router.post("/", response_model=Task)(self.create_task)
-        self.router.put("/{task_id}", response_model=Task)(self.update_task)
+        self.router.post("/batch", response_model=TaskBatchResult)(self.apply_batch)
+        # Registered before /{task_id} so "mine" is not taken for a task id
+        self.router.get("/mine", response_model=MyTasksPage)(self.get_my_tasks)
+        self.router.put("/{task_id}", response_model=TaskUpdateResult)(self.update_task)
+        self.router.post("/{task_id}/move", response_model=Task)(self.move_task)
         self.router.get("/{task_id}", response_model=Task)(self.get_task)
+        self.router.get("/{task_id}/subtree", response_model=Task)(self.get_subtree)
+        self.router.get("/{task_id}/ancestors", response_model=List[Task])(self.get_ancestors)
         self.router.delete("/{task_id}", response_model=DefaultResponse)(self.delete_task)
 
     async def get_task(self, task_id: str = Path(...), userinfo=Depends(user_check)) -> Task:
@@ -33,15 +48,72 @@ class TasksEndpoint(BaseEndpoint):
 
         return task
 
-    async def get_tasks(self, project_id: str = Query(...), userinfo=Depends(user_check)) -> List[Task]:
+    async def get_subtree(self, task_id: str = Path(...), userinfo=Depends(user_check)) -> Task:
+        """The task with all its subtasks nested at every depth."""
+        task = Tasks.get_subtree(task_id)
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+        if not (userinfo.is_admin or Projects.is_project_member(userinfo.id, task.project_id)):
+            raise HTTPException(status_code=403, detail="You don't have access to this task")
+        return task
+
+    async def get_ancestors(self, task_id: str = Path(...), userinfo=Depends(user_check)) -> List[Task]:
+        """The chain of parent tasks above a task, top-level task first."""
+        task = Tasks.get_task(task_id)
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+        if not (userinfo.is_admin or Projects.is_project_member(userinfo.id, task.project_id)):
+            raise HTTPException(status_code=403, detail="You don't have access to this task")
+        return Tasks.get_ancestors(task_id)
+
+    async def get_my_tasks(
+        self,
+        status: Optional[List[str]] = Query(None, description="Only tasks in these statuses"),
+        due_after: Optional[datetime] = Query(None, description="Only tasks due at or after this time"),
+        due_before: Optional[datetime] = Query(None, description="Only tasks due before this time"),
+        cursor: Optional[str] = Query(None, description="`next_cursor` of the previous page"),
+        limit: int = Query(50, ge=1, le=200),
+        userinfo=Depends(user_check)
+    ) -> MyTasksPage:
+        """Every task assigned to or created by the current user across their projects, by deadline."""
+        items, next_key = Tasks.get_my_tasks(
+            userinfo.id,
+            is_admin=userinfo.is_admin,
+            statuses=status,
+            due_after=due_after,
+            due_before=due_before,
+            after=decode_cursor(cursor),
+            limit=limit
+        )
+        return MyTasksPage(items=items, next_cursor=encode_cursor(next_key))
+
+    async def get_tasks(
+        self,
+        request: Request,
+        response: Response,
+        project_id: str = Query(...),
+        order: Literal["deadline", "rank"] = Query("deadline", description="`rank` keeps the manual order"),
+        userinfo=Depends(user_check)
+    ) -> List[Task]:
         # Verify user has access to the project
         if not (userinfo.is_admin or Projects.user_has_access(userinfo.id, project_id)):
             raise HTTPException(status_code=403, detail="No access to this project")
 
+        # Non-admins only see their own tasks, so their list is a separate representation
+        version = Projects.get_project_version(project_id)
+        if version is not None:
+            variant = "all" if userinfo.is_admin else f"user:{userinfo.id}"
+            etag = make_etag("tasks", project_id, version, f"{variant}/{order}")
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            set_etag(response, etag)
+
         if userinfo.is_admin:
             tasks = Tasks.get_project_tasks(project_id)
         else:
             tasks = Tasks.get_user_tasks(userinfo.id, project_id)
+        if order == "rank":
+            return tasks
 
         # Sort tasks by deadline, None values go last
         def sort_key(x):
@@ -56,6 +128,7 @@ class TasksEndpoint(BaseEndpoint):
     async def create_task(
         self,
         task: TaskCreate,
+        background_tasks: BackgroundTasks,
         userinfo=Depends(user_check)
     ) -> Task:
         if not Projects.user_has_access(userinfo.id, task.project_id):
@@ -68,21 +141,10 @@ class TasksEndpoint(BaseEndpoint):
             created_task = Tasks.create_task(task, created_by=userinfo.id)
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
+        self._rebalance_if_needed(created_task, background_tasks)
 
         # Check project status and update if needed
-        project = Projects.get_project(task.project_id)
-        if project and project.status == "completed":
-            Projects.update_project_status(task.project_id, "in_progress")
-            # Notify project members about project being reopened
-            try:
-                project_members = Projects.get_project_members(task.project_id)
-                member_ids = [member.user_id for member in project_members]
-                member_users = [Users.get_user_by_id(mid) for mid in member_ids]
-                member_emails = [u.username for u in member_users if u is not None]
-                if member_emails:
-                    EmailService.notify_project_reopened(member_emails, project.name)
-            except Exception as e:
-                print(f"Error sending project reopened notification: {e}")
+        project = self._reopen_project(task.project_id)
 
         # Send email notification if task is assigned
         if created_task.assigned_to_id:
@@ -96,17 +158,175 @@ class TasksEndpoint(BaseEndpoint):
                         project.name,
                         task_url
                     )
-            except Exception as e:
-                print(f"Error sending task assignment notification: {e}")
+            except Exception:
+                logger.exception("Error sending task assignment notification", extra={"task_id": created_task.id})
 
         return created_task
 
+    async def apply_batch(
+        self,
+        batch: TaskBatch,
+        background_tasks: BackgroundTasks,
+        userinfo=Depends(user_check)
+    ) -> TaskBatchResult:
+        """Create, update and delete many tasks at once, all or nothing.
+
+        Permissions are those of the single-task endpoints, checked once per
+        project. Project statuses are rolled up and notifications sent once
+        per project, after the batch is stored.
+        """
+        if len(batch.create) + len(batch.update) + len(batch.delete) > TASK_BATCH_MAX_SIZE:
+            raise HTTPException(status_code=400, detail=f"At most {TASK_BATCH_MAX_SIZE} operations per batch")
+
+        current = Tasks.get_task_heads([u.id for u in batch.update] + batch.delete)
+        for task_id in [u.id for u in batch.update] + batch.delete:
+            if task_id not in current:
+                raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+
+        project_ids = {c.project_id for c in batch.create} | {head[0] for head in current.values()}
+        has_access = {pid: Projects.user_has_access(userinfo.id, pid) for pid in project_ids}
+        manages = {
+            pid: has_access[pid] and (userinfo.is_admin or Projects.is_project_manager(userinfo.id, pid))
+            for pid in project_ids
+        }
+        if not all(has_access[c.project_id] for c in batch.create):
+            raise HTTPException(status_code=403, detail="No access to this project")
+        for update in batch.update:
+            project_id, assigned_to_id, _, _ = current[update.id]
+            if not (manages[project_id] or assigned_to_id == userinfo.id):
+                raise HTTPException(status_code=403, detail="Not enough permissions")
+            if update.project_id and update.project_id != project_id:
+                raise HTTPException(status_code=400, detail="Cannot move tasks between projects")
+        if not all(manages[current[task_id][0]] for task_id in batch.delete):
+            raise HTTPException(status_code=403, detail="Only admins and project managers can delete tasks")
+
+        try:
+            result = Tasks.apply_batch(batch.create, batch.update, batch.delete, created_by=userinfo.id)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        for task in result["created"]:
+            self._rebalance_if_needed(task, background_tasks)
+        for project_id in {task.project_id for task in result["created"]}:
+            self._reopen_project(project_id)
+        for project_id in {current[u.id][0] for u in batch.update if u.status}:
+            self._roll_up_project_status(project_id)
+
+        # One email per assignee and project, and one per project for completions
+        assigned, completed = {}, {}
+        for task in result["created"]:
+            if task.assigned_to_id:
+                assigned.setdefault((task.assigned_to_id, task.project_id), []).append(task)
+        for task in result["updated"]:
+            _, old_assignee, old_status, _ = current[task.id]
+            if task.assigned_to_id and task.assigned_to_id != old_assignee:
+                assigned.setdefault((task.assigned_to_id, task.project_id), []).append(task)
+            if task.status == "completed" and old_status != "completed":
+                completed.setdefault(task.project_id, []).append(task)
+        if assigned or completed:
+            background_tasks.add_task(
+                self._notify_batch, assigned, completed, userinfo.name or userinfo.username
+            )
+
+        return TaskBatchResult(**result)
+
+    def _notify_batch(self, assigned: dict, completed: dict, completed_by: str):
+        projects = {}
+
+        def project_name(project_id):
+            if project_id not in projects:
+                project = Projects.get_project(project_id)
+                projects[project_id] = project.name if project else None
+            return projects[project_id]
+
+        for (user_id, project_id), tasks in assigned.items():
+            try:
+                assigned_user = Users.get_user_by_id(user_id)
+                name = project_name(project_id)
+                if not (assigned_user and name):
+                    continue
+                if len(tasks) == 1:
+                    EmailService.notify_task_assignment(
+                        assigned_user.username, tasks[0].name, name,
+                        f"{SERVER_URL}/projects/{project_id}/tasks/{tasks[0].id}"
+                    )
+                else:
+                    EmailService.notify_tasks_assigned(
+                        assigned_user.username, [t.name for t in tasks], name, f"{SERVER_URL}/projects/{project_id}"
+                    )
+            except Exception:
+                logger.exception("Error sending task assignment notification", extra={"project_id": project_id})
+
+        for project_id, tasks in completed.items():
+            try:
+                name = project_name(project_id)
+                member_emails = self._member_emails(project_id) if name else []
+                if not member_emails:
+                    continue
+                if len(tasks) == 1:
+                    EmailService.notify_task_completed(member_emails, tasks[0].name, name, completed_by)
+                else:
+                    EmailService.notify_tasks_completed(member_emails, [t.name for t in tasks], name, completed_by)
+            except Exception:
+                logger.exception("Error sending task completed notification", extra={"project_id": project_id})
+
+    def _member_emails(self, project_id: str) -> List[str]:
+        project_members = Projects.get_project_members(project_id)
+        member_users = [Users.get_user_by_id(member.user_id) for member in project_members]
+        return [u.username for u in member_users if u is not None]
+
+    def _reopen_project(self, project_id: str):
+        """Reopen a completed project that got new tasks; returns the project."""
+        project = Projects.get_project(project_id)
+        if project and project.status == "completed":
+            Projects.update_project_status(project_id, "in_progress")
+            # Notify project members about project being reopened
+            try:
+                member_emails = self._member_emails(project_id)
+                if member_emails:
+                    EmailService.notify_project_reopened(member_emails, project.name)
+            except Exception:
+                logger.exception("Error sending project reopened notification", extra={"project_id": project_id})
+        return project
+
+    def _roll_up_project_status(self, project_id: str):
+        """Complete a project once all its tasks are, or mark it in progress."""
+        project_tasks = Tasks.get_project_tasks(project_id)
+        all_completed = True
+        has_in_progress = False
+
+        for t in project_tasks:
+            if t.status != "completed":
+                all_completed = False
+            if t.status == "in_progress":
+                has_in_progress = True
+
+        project = Projects.get_project(project_id)
+        new_status = None
+
+        if project and all_completed and project.status != "completed":
+            new_status = "completed"
+            # Get project members for notification
+            try:
+                member_emails = self._member_emails(project_id)
+                if member_emails:
+                    EmailService.notify_project_completed(member_emails, project.name)
+            except Exception:
+                logger.exception("Error sending project completed notification", extra={"project_id": project_id})
+        elif has_in_progress:
+            new_status = "in_progress"
+
+        if new_status:
+            Projects.update_project_status(project_id, new_status)
+
     async def update_task(
         self,
         task_id: str = Path(...),
         task: TaskUpdate = Body(...),
+        cascade: bool = Query(False, description="Push dependent tasks later when the dates change"),
+        move_started: bool = Query(False, description="With cascade, also move tasks already in progress"),
         userinfo=Depends(user_check)
-    ) -> Task:
+    ) -> TaskUpdateResult:
         current_task = Tasks.get_task(task_id)
         if not current_task:
             raise HTTPException(status_code=404, detail="Task not found")
@@ -124,42 +344,13 @@ class TasksEndpoint(BaseEndpoint):
             )
 
         try:
-            updated = Tasks.update_task(task_id, task)
+            updated = Tasks.update_task(task_id, task, cascade=cascade, move_started=move_started)
             if not updated:
                 raise HTTPException(status_code=404, detail="Task not found")
 
             # Check if we need to update project status
             if task.status:
-                project_tasks = Tasks.get_project_tasks(current_task.project_id)
-                all_completed = True
-                has_in_progress = False
-
-                for t in project_tasks:
-                    if t.status != "completed":
-                        all_completed = False
-                    if t.status == "in_progress":
-                        has_in_progress = True
-
-                project = Projects.get_project(current_task.project_id)
-                new_status = None
-
-                if project and all_completed and project.status != "completed":
-                    new_status = "completed"
-                    # Get project members for notification
-                    try:
-                        project_members = Projects.get_project_members(current_task.project_id)
-                        member_ids = [member.user_id for member in project_members]
-                        member_users = [Users.get_user_by_id(mid) for mid in member_ids]
-                        member_emails = [u.username for u in member_users if u is not None]
-                        if member_emails:
-                            EmailService.notify_project_completed(member_emails, project.name)
-                    except Exception as e:
-                        print(f"Error sending project completed notification: {e}")
-                elif has_in_progress:
-                    new_status = "in_progress"
-
-                if new_status:
-                    Projects.update_project_status(current_task.project_id, new_status)
+                self._roll_up_project_status(current_task.project_id)
 
             # Handle task assignment notification
             if task.assigned_to_id and task.assigned_to_id != current_task.assigned_to_id:
@@ -174,18 +365,15 @@ class TasksEndpoint(BaseEndpoint):
                             project.name,
                             task_url
                         )
-                except Exception as e:
-                    print(f"Error sending task assignment notification: {e}")
+                except Exception:
+                    logger.exception("Error sending task assignment notification", extra={"task_id": task_id})
 
             # Handle task completion notification
             if task.status == "completed" and current_task.status != "completed":
                 try:
                     project = Projects.get_project(current_task.project_id)
                     if project:
-                        project_members = Projects.get_project_members(current_task.project_id)
-                        member_ids = [member.user_id for member in project_members]
-                        member_users = [Users.get_user_by_id(mid) for mid in member_ids]
-                        member_emails = [u.username for u in member_users if u is not None]
+                        member_emails = self._member_emails(current_task.project_id)
                         if member_emails:
                             EmailService.notify_task_completed(
                                 member_emails,
@@ -193,14 +381,58 @@ class TasksEndpoint(BaseEndpoint):
                                 project.name,
                                 userinfo.name or userinfo.username
                             )
-                except Exception as e:
-                    print(f"Error sending task completed notification: {e}")
+                except Exception:
+                    logger.exception("Error sending task completed notification", extra={"task_id": task_id})
 
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
 
         return updated
 
+    async def move_task(
+        self,
+        background_tasks: BackgroundTasks,
+        task_id: str = Path(...),
+        move: TaskMove = Body(...),
+        userinfo=Depends(user_check)
+    ) -> Task:
+        """Reorder a task (drag and drop); only the moved task's rank is written."""
+        current_task = Tasks.get_task(task_id)
+        if not current_task:
+            raise HTTPException(status_code=404, detail="Task not found")
+        if not (userinfo.is_admin or
+                Projects.is_project_manager(userinfo.id, current_task.project_id) or
+                current_task.assigned_to_id == userinfo.id):
+            raise HTTPException(status_code=403, detail="Not enough permissions")
+        if move.after_id and move.before_id:
+            raise HTTPException(status_code=400, detail="Give either after_id or before_id")
+
+        if move.status is not None and move.status != current_task.status:
+            # The status change commits on its own, so a bad neighbour must fail before it
+            if move.after_id or move.before_id:
+                try:
+                    Tasks.check_move_anchor(task_id, move.after_id or move.before_id)
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+            # A change of column is a regular status update, with its checks and notifications
+            await self.update_task(
+                task_id=task_id, task=TaskUpdate(status=move.status), cascade=False, move_started=False,
+                userinfo=userinfo
+            )
+        try:
+            moved = Tasks.move_task(task_id, after_id=move.after_id, before_id=move.before_id)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not moved:
+            raise HTTPException(status_code=404, detail="Task not found")
+        self._rebalance_if_needed(moved, background_tasks)
+        return moved
+
+    def _rebalance_if_needed(self, task: Task, background_tasks: BackgroundTasks):
+        # Ranks grow when tasks keep landing in the same gap; respace them after responding
+        if len(task.rank) > TASK_RANK_MAX_LENGTH:
+            background_tasks.add_task(Tasks.rebalance_ranks, task.project_id)
+
     async def delete_task(
         self,
         task_id: str = Path(...),
@@ -218,6 +450,10 @@ class TasksEndpoint(BaseEndpoint):
                 detail="Only admins and project managers can delete tasks"
             )
 
-        if Tasks.delete_task(task_id):
+        try:
+            deleted = Tasks.delete_task(task_id)
+        except DatabaseError:
+            raise HTTPException(status_code=500, detail="Error deleting task")
+        if deleted:
             return DefaultResponse(code=200, result="Task deleted successfully")
         raise HTTPException(status_code=404, detail="Task not found")
@@ -5,10 +5,13 @@ from app.schemas.base import DefaultResponse
 from app.schemas.users import UserInDB, UserUpdate, UserRole, UserCreate
 from app.db.relational import Users, Projects
 from app.services.authentication import admin_user_check, user_check
+import logging
 import secrets
 import string
 from app.services.email_service import EmailService
 
+logger = logging.getLogger(__name__)
+
 
 class UsersEndpoint(BaseEndpoint):
     def __init__(self):
@@ -215,9 +218,9 @@ class UsersEndpoint(BaseEndpoint):
                 username=new_user.username,
                 password=password
             )
-        except Exception as e:
+        except Exception:
             # Log the error but don't fail the request
-            print(f"Error sending email: {str(e)}")
+            logger.exception("Error sending email", extra={"user_id": new_user.id})
 
         return new_user
 
@@ -258,9 +261,9 @@ class UsersEndpoint(BaseEndpoint):
                 username=user.username,
                 password=new_password
             )
-        except Exception as e:
+        except Exception:
             # Log the error but don't fail the request
-            print(f"Error sending reset email: {str(e)}")
+            logger.exception("Error sending reset email", extra={"user_id": user_id})
 
         return DefaultResponse(code=200, result="Password reset successfully and sent via email")
 
@@ -281,9 +284,9 @@ class UsersEndpoint(BaseEndpoint):
                     username=username,
                     password=new_password
                 )
-            except Exception as e:
+            except Exception:
                 email_errors += 1
-                print(f"Error sending reset email to {username}: {str(e)}")
+                logger.exception("Error sending reset email", extra={"user_id": user_id})
 
         total = len(results)
         if email_errors > 0:
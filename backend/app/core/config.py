@@ -21,3 +21,73 @@ EMAIL_FROM = config("EMAIL_FROM", default="")
 EMAIL_FROM_NAME = config("EMAIL_FROM_NAME", default=PROJECT_NAME)
 EMAIL_ENABLED = config("EMAIL_ENABLED", cast=bool, default=False)
 SERVER_URL = config("SERVER_URL", default="")
+
+# Slow Query Log (threshold in milliseconds, 0 disables it)
+SLOW_QUERY_THRESHOLD_MS = config("SLOW_QUERY_THRESHOLD_MS", cast=float, default=0)
+SLOW_QUERY_LOG_PATH = config("SLOW_QUERY_LOG_PATH", default="./data/slow_queries.log")
+SLOW_QUERY_LOG_MAX_BYTES = config("SLOW_QUERY_LOG_MAX_BYTES", cast=int, default=10 * 1024 * 1024)
+SLOW_QUERY_LOG_BACKUP_COUNT = config("SLOW_QUERY_LOG_BACKUP_COUNT", cast=int, default=5)
+
+# On-demand request profiling (admins send an X-Profile header or ?profile=1)
+PROFILE_DIR = config("PROFILE_DIR", default="./data/profiles")
+PROFILE_SAMPLE_INTERVAL_MS = config("PROFILE_SAMPLE_INTERVAL_MS", cast=float, default=1.0)
+PROFILE_MAX_STORED = config("PROFILE_MAX_STORED", cast=int, default=50)
+
+# Memory profiling (tracemalloc is only active after an admin starts it)
+MEMORY_TRACE_FRAMES = config("MEMORY_TRACE_FRAMES", cast=int, default=25)
+MEMORY_SAMPLE_RATE = config("MEMORY_SAMPLE_RATE", cast=float, default=0.1)
+MEMORY_MAX_SNAPSHOTS = config("MEMORY_MAX_SNAPSHOTS", cast=int, default=10)
+
+# Logging (JSON lines on stdout, written by a background thread)
+LOG_LEVEL = config("LOG_LEVEL", default="INFO")
+LOG_JSON = config("LOG_JSON", cast=bool, default=True)
+LOG_DEBUG_SAMPLE_RATE = config("LOG_DEBUG_SAMPLE_RATE", cast=float, default=0.1)
+LOG_ACCESS = config("LOG_ACCESS", cast=bool, default=True)
+
+# Adds an X-DB-Query-Count header to every response (for load tests)
+EXPOSE_QUERY_COUNT = config("EXPOSE_QUERY_COUNT", cast=bool, default=False)
+
+# Gantt chart cache (per-worker LRU plus a table shared by all workers, 0 disables the latter)
+GANTT_CACHE_MAX_BYTES = config("GANTT_CACHE_MAX_BYTES", cast=int, default=64 * 1024 * 1024)
+GANTT_CACHE_SHARED_MAX_BYTES = config("GANTT_CACHE_SHARED_MAX_BYTES", cast=int, default=256 * 1024 * 1024)
+
+# Worker processes for CPU-bound scheduling computations (levelling, forecasts)
+COMPUTE_WORKERS = config("COMPUTE_WORKERS", cast=int, default=1)
+
+# Resource levelling (tasks per person per day)
+LEVELLING_CAPACITY = config("LEVELLING_CAPACITY", cast=float, default=1.0)
+LEVELLING_MAX_DAYS = config("LEVELLING_MAX_DAYS", cast=int, default=3660)
+
+# Deadline forecasts (Monte Carlo iterations, completed tasks needed before
+# a project's own history is used instead of everyone's)
+FORECAST_ITERATIONS = config("FORECAST_ITERATIONS", cast=int, default=10000)
+FORECAST_MIN_HISTORY = config("FORECAST_MIN_HISTORY", cast=int, default=20)
+FORECAST_CACHE_MAX_BYTES = config("FORECAST_CACHE_MAX_BYTES", cast=int, default=4 * 1024 * 1024)
+FORECAST_CACHE_SHARED_MAX_BYTES = config("FORECAST_CACHE_SHARED_MAX_BYTES", cast=int, default=16 * 1024 * 1024)
+
+# Deepest subtask level allowed (0 = top-level tasks only)
+TASK_MAX_DEPTH = config("TASK_MAX_DEPTH", cast=int, default=10)
+
+# Manual task order: rebalance a project once a move produces a longer rank key
+TASK_RANK_MAX_LENGTH = config("TASK_RANK_MAX_LENGTH", cast=int, default=12)
+
+# Delta sync: days a deleted row's tombstone is kept (older cursors get a full resync)
+SYNC_TOMBSTONE_DAYS = config("SYNC_TOMBSTONE_DAYS", cast=int, default=30)
+
+# Change event streams: seconds between each worker's look at the change log,
+# events queued per client before it is told to resync, open streams per user
+# across all workers, and seconds between keep-alive comments (and between
+# each worker's refresh of its streams in the shared count)
+SYNC_STREAM_POLL_INTERVAL = config("SYNC_STREAM_POLL_INTERVAL", cast=float, default=0.5)
+SYNC_STREAM_QUEUE_SIZE = config("SYNC_STREAM_QUEUE_SIZE", cast=int, default=256)
+SYNC_STREAM_MAX_PER_USER = config("SYNC_STREAM_MAX_PER_USER", cast=int, default=5)
+SYNC_STREAM_HEARTBEAT = config("SYNC_STREAM_HEARTBEAT", cast=float, default=15.0)
+
+# Most creates, updates and deletes accepted in one POST /tasks/batch
+TASK_BATCH_MAX_SIZE = config("TASK_BATCH_MAX_SIZE", cast=int, default=1000)
+
+# Project import/export: largest upload accepted, rows staged or written per
+# import transaction, and tasks read per query while exporting
+PROJECT_IMPORT_MAX_BYTES = config("PROJECT_IMPORT_MAX_BYTES", cast=int, default=256 * 1024 * 1024)
+PROJECT_IMPORT_BATCH_SIZE = config("PROJECT_IMPORT_BATCH_SIZE", cast=int, default=2000)
+PROJECT_EXPORT_PAGE_SIZE = config("PROJECT_EXPORT_PAGE_SIZE", cast=int, default=500)
@@ -0,0 +1,25 @@
+import base64
+import binascii
+import json
+from typing import Optional
+from fastapi import HTTPException
+
+
+def encode_cursor(key: Optional[tuple]) -> Optional[str]:
+    """Opaque page cursor for a keyset position (None: no further page)."""
+    if key is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str], parts: int = 2) -> Optional[tuple]:
+    """Keyset position of a cursor from `encode_cursor`; 400 if it was tampered with."""
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, binascii.Error):
+        key = None
+    if not isinstance(key, list) or len(key) != parts or not all(isinstance(part, str) for part in key):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return tuple(key)
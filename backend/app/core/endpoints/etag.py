@@ -0,0 +1,33 @@
+import hashlib
+from typing import Union
+from fastapi import Request, Response
+
+
+def make_etag(resource: str, project_id: str, version: Union[int, str], variant: str = "") -> str:
+    """Strong ETag for a project-scoped resource at a given change version.
+
+    `variant` separates representations of the same resource that differ per
+    caller (e.g. the task list a non-admin sees is filtered to their own tasks).
+    """
+    digest = hashlib.sha1(f"{resource}:{project_id}:{version}:{variant}".encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match header lists `etag` (or is `*`)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    candidates = [value.strip().removeprefix("W/") for value in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    # Let browsers keep the body but revalidate it on every use
+    response.headers["Cache-Control"] = "private, no-cache"
@@ -0,0 +1,223 @@
+import atexit
+import contextvars
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from app.core import config
+
+REQUEST_ID_HEADER = b"x-request-id"
+QUERY_COUNT_HEADER = b"x-db-query-count"
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+request_start_var = contextvars.ContextVar("request_start", default=None)
+# One-element list incremented by the database for every statement of the request
+query_count_var = contextvars.ContextVar("query_count", default=None)
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listeners = []
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the request id and elapsed request time of the caller."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        start = request_start_var.get()
+        record.elapsed_ms = round((time.perf_counter() - start) * 1000, 3) if start is not None else None
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keeps only a random fraction of DEBUG records so verbose logging stays affordable."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "pid": record.process,
+            "request_id": getattr(record, "request_id", None),
+            "elapsed_ms": getattr(record, "elapsed_ms", None),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _Flush:
+    """Queue marker: the listener sets `event` once it reaches it."""
+
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+
+class _Listener(QueueListener):
+    def handle(self, record):
+        if isinstance(record, _Flush):
+            record.event.set()
+        else:
+            super().handle(record)
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    Queue handler that resolves everything depending on the calling context
+    (message arguments, traceback) before enqueueing, and leaves formatting
+    and I/O to the listener thread.
+    """
+
+    listener = None
+
+    def drain(self, timeout: float = 5.0):
+        """Block until every record queued so far has been written, or `timeout` passes."""
+        if self.listener is not None and self.listener._thread is not None:
+            flushed = threading.Event()
+            self.queue.put_nowait(_Flush(flushed))
+            flushed.wait(timeout)
+
+    def close(self):
+        if self.listener is not None:
+            if self.listener._thread is not None:
+                self.listener.stop()
+            if self.listener in _listeners:
+                _listeners.remove(self.listener)
+        super().close()
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def queued(*handlers: logging.Handler) -> QueueHandler:
+    """Wrap handlers so records are written by a background listener thread."""
+    log_queue = queue.SimpleQueue()
+    listener = _Listener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+    handler = ContextQueueHandler(log_queue)
+    handler.listener = listener
+    handler.addFilter(RequestContextFilter())
+    return handler
+
+
+def _stop_listeners():
+    while _listeners:
+        _listeners.pop().stop()
+
+
+def setup_logging():
+    root = logging.getLogger()
+    if any(isinstance(h, ContextQueueHandler) for h in root.handlers):
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    if config.LOG_JSON:
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s [%(process)d] [%(request_id)s] %(name)s: %(message)s"
+        ))
+
+    handler = queued(stream)
+    handler.addFilter(DebugSamplingFilter(config.LOG_DEBUG_SAMPLE_RATE))
+    root.addHandler(handler)
+    root.setLevel(config.LOG_LEVEL.upper())
+    # peewee logs every statement at DEBUG, which is far too verbose here
+    logging.getLogger("peewee").setLevel(logging.INFO)
+
+
+atexit.register(_stop_listeners)
+
+access_logger = logging.getLogger("app.access")
+
+
+class RequestContextMiddleware:
+    """
+    Assigns each request a correlation id (reusing a sane incoming X-Request-ID),
+    exposes it to log records through context variables, echoes it back in the
+    response and writes one access record with the request duration and the
+    number of SQL statements it ran.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                candidate = value.decode("latin-1")
+                if _REQUEST_ID_RE.match(candidate):
+                    request_id = candidate
+                break
+        request_id = request_id or uuid.uuid4().hex
+
+        id_token = request_id_var.set(request_id)
+        start_token = request_start_var.set(time.perf_counter())
+        query_count = [0]
+        count_token = query_count_var.set(query_count)
+        status_code = 500
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER, request_id.encode()))
+                if config.EXPOSE_QUERY_COUNT:
+                    headers.append((QUERY_COUNT_HEADER, str(query_count[0]).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            if config.LOG_ACCESS:
+                access_logger.info(
+                    "%s %s %s", scope["method"], scope["path"], status_code,
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status_code,
+                        "db_queries": query_count[0],
+                    }
+                )
+            query_count_var.reset(count_token)
+            request_start_var.reset(start_token)
+            request_id_var.reset(id_token)
@@ -1,10 +1,36 @@
+import time
 from peewee import SqliteDatabase
-from app.core.config import SQLITE_PATH
+from app.core.config import (
+    SQLITE_PATH,
+    SLOW_QUERY_THRESHOLD_MS,
+    SLOW_QUERY_LOG_PATH,
+    SLOW_QUERY_LOG_MAX_BYTES,
+    SLOW_QUERY_LOG_BACKUP_COUNT,
+)
+from app.core.structured_logging import query_count_var
 from contextlib import contextmanager
+from .slow_query import SlowQueryLog
+
+
+class ProfiledSqliteDatabase(SqliteDatabase):
+    # Called as hook(db, sql, params, elapsed_ms) after every statement when set
+    slow_query_hook = None
+
+    def execute_sql(self, sql, params=None, commit=None):
+        query_count = query_count_var.get()
+        if query_count is not None:
+            query_count[0] += 1
+        hook = self.slow_query_hook
+        if hook is None:
+            return super().execute_sql(sql, params, commit)
+        start = time.perf_counter()
+        cursor = super().execute_sql(sql, params, commit)
+        hook(self, sql, params, (time.perf_counter() - start) * 1000)
+        return cursor
 
 
 def get_sqlite_db():
-    db = SqliteDatabase(
+    db = ProfiledSqliteDatabase(
         SQLITE_PATH,
         pragmas={
             'journal_mode': 'wal',     # Enable WAL mode
@@ -19,6 +45,17 @@ def get_sqlite_db():
 
 DB = get_sqlite_db()
 
+# Slow query log, only installed when a threshold is configured
+SlowQueries = None
+if SLOW_QUERY_THRESHOLD_MS > 0:
+    SlowQueries = SlowQueryLog(
+        SLOW_QUERY_LOG_PATH,
+        threshold_ms=SLOW_QUERY_THRESHOLD_MS,
+        max_bytes=SLOW_QUERY_LOG_MAX_BYTES,
+        backup_count=SLOW_QUERY_LOG_BACKUP_COUNT,
+    )
+    SlowQueries.install(DB)
+
 
 @contextmanager
 def get_db():
@@ -1,30 +1,58 @@
 from datetime import datetime, timedelta
 import bcrypt
 import hashlib
+import logging
 import re
+import time
 import uuid
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from playhouse.shortcuts import model_to_dict
-from peewee import BooleanField
+from peewee import BooleanField, IntegerField, SQL, Case, fn
 
 from app.models.user import User
 from app.schemas.users import UserRole, UserInDB
 from .database import DB, get_db
 from app.models.auth_token import AuthToken
-from app.core.config import AUTH_TOKEN_LIFETIME
-from app.models.project import Project as ProjectModel, ProjectMember as ProjectMemberModel
-from app.models.task import Task as TaskModel
+from app.core.config import AUTH_TOKEN_LIFETIME, SYNC_TOMBSTONE_DAYS, TASK_MAX_DEPTH
+from app.models.project import (
+    Project as ProjectModel,
+    ProjectMember as ProjectMemberModel,
+    ProjectImport as ProjectImportModel
+)
+from app.models.task import (
+    Task as TaskModel,
+    TaskClosure as TaskClosureModel,
+    TaskDependency as TaskDependencyModel,
+    TaskStatusTransition as TaskStatusTransitionModel
+)
+from app.models.analytics import ProjectStatusDay as ProjectStatusDayModel, RollupWatermark
+from app.models.sync import ChangeLog as ChangeLogModel, EventStream as EventStreamModel
 from app.schemas.project import (
     ProjectCreate,
     ProjectUpdate,
     Project as ProjectSchema,
     ProjectMember as ProjectMemberSchema,
-    ProjectMemberBase
+    ProjectMemberBase,
+    ProjectImport as ProjectImportSchema
+)
+from app.schemas.task import (
+    TaskCreate,
+    TaskUpdate,
+    Task as TaskSchema,
+    MyTask as MyTaskSchema,
+    BatchTaskCreate,
+    BatchTaskUpdate,
+    TaskDependencyCreate,
+    TaskDependency as TaskDependencySchema,
+    TaskUpdateResult
 )
-from app.schemas.task import TaskCreate, TaskUpdate, Task as TaskSchema
+from app.services.scheduling import ScheduleEdge, from_julian_day, propagate
+from app.services.ranking import keys_after, rank_between, sequence_key, spaced_keys
 from app.models.comment import Comment as CommentModel
 from app.schemas.comment import CommentCreate, Comment as CommentSchema
 
+logger = logging.getLogger(__name__)
+
 
 class UsersTable:
     def __init__(self):
@@ -98,8 +126,8 @@ class UsersTable:
             )
 
             return UserInDB(**user.to_dict())
-        except Exception as e:
-            print(f"Error creating user: {e}")
+        except Exception:
+            logger.exception("Error creating user", extra={"username": username})
             return None
 
     def get_user_by_id(self, id: str) -> Optional[UserInDB]:
@@ -129,8 +157,8 @@ class UsersTable:
             if not user.is_active:
                 return None
             return UserInDB(**user.to_dict())
-        except Exception as e:
-            print(f"Error getting user by token: {e}")
+        except Exception:
+            logger.exception("Error getting user by token")
             return None
 
     def is_admin(self, token: str) -> bool:
@@ -208,8 +236,10 @@ class UsersTable:
 
             return UserInDB(**user.to_dict()), token
 
-        except Exception as e:
-            print(f"Error in login: {e}")
+        except User.DoesNotExist:
+            return None
+        except Exception:
+            logger.exception("Error in login", extra={"username": username})
             return None
 
     def get_users(self, skip: int = 0, limit: int = 50) -> List[UserInDB]:
@@ -249,8 +279,8 @@ class UsersTable:
 
             user = User.get(User.id == id)
             return UserInDB.model_validate(user)
-        except Exception as e:
-            print(f"Error updating user: {e}")
+        except Exception:
+            logger.exception("Error updating user", extra={"user_id": id})
             return None
 
     def delete_user_by_id(self, id: str) -> bool:
@@ -263,8 +293,8 @@ class UsersTable:
             query.execute()
 
             return True
-        except Exception as e:
-            print(f"Error deleting user: {e}")
+        except Exception:
+            logger.exception("Error deleting user", extra={"user_id": id})
             return False
 
     def update_user_role(self, user_id: str, new_role: UserRole) -> Optional[UserInDB]:
@@ -347,8 +377,8 @@ class UsersTable:
             )
 
             return token
-        except Exception as e:
-            print(f"Error creating auth token: {e}")
+        except Exception:
+            logger.exception("Error creating auth token", extra={"user_id": user_id})
             return None
 
     def get_user_by_email(self, email: str) -> Optional[UserInDB]:
@@ -359,11 +389,44 @@ class UsersTable:
         except User.DoesNotExist:
             return None
 
+    def get_usernames(self, user_ids: List[str]) -> dict:
+        """Map user ids to usernames (email addresses); unknown ids are left out."""
+        if not user_ids:
+            return {}
+        return dict(User.select(User.id, User.username).where(User.id.in_(list(user_ids))).tuples())
+
 
 class ProjectsTable:
     def __init__(self):
         with get_db():
-            DB.create_tables([ProjectModel, ProjectMemberModel])
+            DB.create_tables([ProjectModel, ProjectMemberModel, ProjectImportModel])
+            # Migration: add version column if missing
+            migrator = Users._get_migrator()
+            if migrator:
+                try:
+                    from playhouse.migrate import migrate as run_migrate
+                    run_migrate(
+                        migrator.add_column('project', 'version', IntegerField(default=0))
+                    )
+                except Exception:
+                    # Column already exists or migration not needed
+                    pass
+
+    def bump_version(self, project_id: str):
+        """Mark a project as changed, invalidating its ETags."""
+        ProjectModel.update(version=ProjectModel.version + 1).where(
+            ProjectModel.id == project_id
+        ).execute()
+
+    def get_project_version(self, project_id: str) -> Optional[int]:
+        """Return the project's change version without loading the project or its tasks."""
+        row = (
+            ProjectModel.select(ProjectModel.version)
+            .where(ProjectModel.id == project_id)
+            .tuples()
+            .first()
+        )
+        return row[0] if row else None
 
     def create_project(self, project: ProjectCreate, creator_id: str) -> ProjectSchema:
         project_id = str(uuid.uuid4())
@@ -409,7 +472,12 @@ class ProjectsTable:
             if project_update.status:
                 project.status = project_update.status
             project.updated_at = datetime.now()
-            project.save()
+            # Leave version out of the write so concurrent bumps are not overwritten
+            project.save(only=[
+                ProjectModel.name, ProjectModel.description, ProjectModel.start_date,
+                ProjectModel.deadline, ProjectModel.status, ProjectModel.updated_at
+            ])
+            self.bump_version(project_id)
             return ProjectSchema.model_validate({
                 "id": project.id,
                 "name": project.name,
@@ -429,7 +497,8 @@ class ProjectsTable:
             project = ProjectModel.get(ProjectModel.id == project_id)
             project.status = status
             project.updated_at = datetime.now()
-            project.save()
+            project.save(only=[ProjectModel.status, ProjectModel.updated_at])
+            self.bump_version(project_id)
             return True
         except ProjectModel.DoesNotExist:
             return False
@@ -437,8 +506,9 @@ class ProjectsTable:
     def delete_project(self, project_id: str) -> bool:
         try:
             # Delete associated comments first
-            for task in TaskModel.select().where(TaskModel.project_id == project_id):
-                CommentModel.delete().where(CommentModel.task_id == task.id).execute()
+            CommentModel.delete().where(CommentModel.task_id.in_(
+                TaskModel.select(TaskModel.id).where(TaskModel.project_id == project_id)
+            )).execute()
             # Delete associated tasks
             TaskModel.delete().where(TaskModel.project_id == project_id).execute()
             # Delete project members
@@ -446,8 +516,8 @@ class ProjectsTable:
             # Delete project
             ProjectModel.delete().where(ProjectModel.id == project_id).execute()
             return True
-        except Exception as e:
-            print(f"Error deleting project: {e}")
+        except Exception:
+            logger.exception("Error deleting project", extra={"project_id": project_id})
             return False
 
     def get_all_projects(self) -> List[ProjectSchema]:
@@ -523,6 +593,33 @@ class ProjectsTable:
         except ProjectModel.DoesNotExist:
             return None
 
+    def get_visible_project_versions(self, user_id: str, is_admin: bool) -> List[tuple]:
+        """(id, version) of every project the user can see, ordered by id."""
+        query = ProjectModel.select(ProjectModel.id, ProjectModel.version)
+        if not is_admin:
+            query = query.where(ProjectModel.id.in_(
+                ProjectMemberModel.select(ProjectMemberModel.project).where(ProjectMemberModel.user == user_id)
+            ))
+        return list(query.order_by(ProjectModel.id).tuples())
+
+    def get_project_deadlines(self, project_ids: List[str]) -> dict:
+        """{project id: deadline as a julian day number}."""
+        if not project_ids:
+            return {}
+        return dict(
+            ProjectModel.select(ProjectModel.id, fn.julianday(ProjectModel.deadline))
+            .where(ProjectModel.id.in_(project_ids))
+            .tuples()
+        )
+
+    def get_projects_by_ids(self, project_ids: List[str]) -> List[ProjectSchema]:
+        if not project_ids:
+            return []
+        return [
+            ProjectSchema.model_validate(project.to_dict())
+            for project in ProjectModel.select().where(ProjectModel.id.in_(project_ids))
+        ]
+
     def is_project_manager(self, user_id: str, project_id: str) -> bool:
         try:
             member = ProjectMemberModel.get(
@@ -563,6 +660,7 @@ class ProjectsTable:
             role=member.role,
             created_at=datetime.now()
         )
+        self.bump_version(project_id)
         return ProjectMemberSchema.model_validate({
             "id": member_db.id,
             "project_id": member_db.project_id,
@@ -577,9 +675,11 @@ class ProjectsTable:
                 (ProjectMemberModel.project_id == project_id) &
                 (ProjectMemberModel.user_id == user_id)
             ).execute()
+            if deleted:
+                self.bump_version(project_id)
             return deleted > 0
-        except Exception as e:
-            print(f"Error removing project member: {e}")
+        except Exception:
+            logger.exception("Error removing project member", extra={"project_id": project_id, "user_id": user_id})
             return False
 
     def is_project_member(self, user_id: str, project_id: str) -> bool:
@@ -606,27 +706,308 @@ class ProjectsTable:
         users = User.select().where(User.id.in_(shared_user_ids))
         return [UserInDB.model_validate(u) for u in users]
 
+    def create_imported_project(self, project: dict, members: List[tuple], creator_id: str) -> str:
+        """Create an imported project and its members in one transaction.
+
+        `project` holds the Project columns to set; `members` are (user id,
+        role) pairs. The creator becomes project manager as with any new
+        project. Returns the project id.
+        """
+        project_id = str(uuid.uuid4())
+        now = datetime.now()
+        roles = {user_id: role for user_id, role in members}
+        roles[creator_id] = 'project_manager'
+        with DB.atomic():
+            ProjectModel.create(id=project_id, created_at=now, updated_at=now, **project)
+            ProjectMemberModel.insert_many([
+                {
+                    "id": str(uuid.uuid4()),
+                    "project": project_id,
+                    "user": user_id,
+                    "role": role,
+                    "created_at": now
+                }
+                for user_id, role in roles.items()
+            ]).execute()
+        return project_id
+
+    def create_import(self, user_id: str, format: str, size: int) -> ProjectImportSchema:
+        job = ProjectImportModel.create(
+            id=str(uuid.uuid4()), user_id=user_id, format=format, bytes_total=size
+        )
+        return ProjectImportSchema.model_validate(job.to_dict())
+
+    def update_import(self, import_id: str, **fields):
+        """Record an import's progress or outcome."""
+        ProjectImportModel.update(updated_at=datetime.now(), **fields).where(
+            ProjectImportModel.id == import_id
+        ).execute()
+
+    def get_import(self, import_id: str, user_id: Optional[str] = None) -> Optional[ProjectImportSchema]:
+        """An import, if it exists and (with `user_id`) was started by that user."""
+        query = ProjectImportModel.select().where(ProjectImportModel.id == import_id)
+        if user_id is not None:
+            query = query.where(ProjectImportModel.user_id == user_id)
+        job = query.first()
+        return ProjectImportSchema.model_validate(job.to_dict()) if job else None
+
 
 class TasksTable:
+    # Day bounds of a task, tolerant of unparseable dates and of deadlines before start dates
+    _INTERVAL_START = "MIN(COALESCE(julianday({0}.start_date), 0), COALESCE(julianday({0}.deadline), 0))"
+    _INTERVAL_END = "MAX(COALESCE(julianday({0}.start_date), 0), COALESCE(julianday({0}.deadline), 0))"
+
     def __init__(self):
+        self.interval_index = False
         with get_db():
+            # Before create_tables, which would otherwise fail indexing the missing column
+            unranked = DB.table_exists(TaskModel._meta.table_name) and 'rank' not in {
+                column.name for column in DB.get_columns(TaskModel._meta.table_name)
+            }
+            if unranked:
+                DB.execute_sql("ALTER TABLE task ADD COLUMN rank VARCHAR(255) NOT NULL DEFAULT ''")
             DB.create_tables([TaskModel])
+            self.create_interval_index()
+            self.create_hierarchy_index()
+            if unranked:
+                # Existing tasks start in deadline order
+                for (project_id,) in TaskModel.select(TaskModel.project_id).distinct().tuples():
+                    self.rebalance_ranks(project_id)
+
+    def create_interval_index(self):
+        """R*Tree over (task days, project) kept in sync with the task table by triggers.
+
+        Rows are keyed by task rowid; the project dimension holds the project's
+        rowid so one lookup filters by project and time window together.
+        """
+        try:
+            exists = DB.execute_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'task_interval'"
+            ).fetchone()
+            with DB.atomic():
+                DB.execute_sql(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS task_interval "
+                    "USING rtree(id, start_day, end_day, project_lo, project_hi)"
+                )
+                row = "new.rowid, {start}, {end}, p.rowid, p.rowid".format(
+                    start=self._INTERVAL_START.format("new"), end=self._INTERVAL_END.format("new")
+                )
+                DB.execute_sql(
+                    "CREATE TRIGGER IF NOT EXISTS task_interval_insert AFTER INSERT ON task BEGIN "
+                    f"INSERT OR REPLACE INTO task_interval SELECT {row} FROM project p WHERE p.id = new.project_id; "
+                    "END"
+                )
+                DB.execute_sql(
+                    "CREATE TRIGGER IF NOT EXISTS task_interval_update "
+                    "AFTER UPDATE OF start_date, deadline, project_id ON task BEGIN "
+                    "DELETE FROM task_interval WHERE id = old.rowid; "
+                    f"INSERT INTO task_interval SELECT {row} FROM project p WHERE p.id = new.project_id; "
+                    "END"
+                )
+                DB.execute_sql(
+                    "CREATE TRIGGER IF NOT EXISTS task_interval_delete AFTER DELETE ON task BEGIN "
+                    "DELETE FROM task_interval WHERE id = old.rowid; "
+                    "END"
+                )
+                if not exists and DB.table_exists('project'):
+                    # Backfill tasks written before the index existed
+                    DB.execute_sql(
+                        "INSERT OR REPLACE INTO task_interval "
+                        "SELECT t.rowid, {start}, {end}, p.rowid, p.rowid "
+                        "FROM task t JOIN project p ON p.id = t.project_id".format(
+                            start=self._INTERVAL_START.format("t"), end=self._INTERVAL_END.format("t")
+                        )
+                    )
+            self.interval_index = True
+        except Exception:
+            # SQLite built without R*Tree: window queries fall back to a scan
+            logger.warning("Task interval index unavailable", exc_info=True)
+            self.interval_index = False
+
+    # A leaf task's weight in its ancestors' progress: its length in days (at
+    # least one) and the part of it done, with in-progress tasks counting half
+    _LEAF_WEIGHT = "MAX(julianday({0}.deadline) - julianday({0}.start_date), 1.0)"
+    _LEAF_DONE = (
+        "MAX(julianday({0}.deadline) - julianday({0}.start_date), 1.0) * "
+        "CASE {0}.status WHEN 'completed' THEN 1.0 WHEN 'in_progress' THEN 0.5 ELSE 0.0 END"
+    )
+
+    def create_hierarchy_index(self):
+        """Closure table of the task hierarchy and the subtree progress rollup, kept
+        in sync with the task table by triggers.
+
+        Subtree and ancestor reads become a single indexed lookup; moving a
+        task rewrites only the pairs linking its subtree to its old ancestors.
+        Progress is held as running totals on every task, so a status or date
+        change only adds its difference along the task's ancestor chain.
+        """
+        exists = DB.table_exists(TaskClosureModel._meta.table_name)
+        columns = {column.name for column in DB.get_columns(TaskModel._meta.table_name)}
+        missing = [name for name in ('progress_weight', 'progress_done') if name not in columns]
+        weight, done = self._LEAF_WEIGHT.format, self._LEAF_DONE.format
+        # Totals a parent holds while it has no subtasks, once its last child is gone
+        own_if_childless = (
+            "COALESCE((SELECT {0} FROM task p WHERE p.id = {1} "
+            "AND NOT EXISTS (SELECT 1 FROM task c WHERE c.parent_task_id = p.id)), 0)"
+        )
+        # ...and while `child` is its only subtask, to take out when the child arrives
+        own_if_only_child = (
+            "COALESCE((SELECT {0} FROM task p WHERE p.id = {1} "
+            "AND NOT EXISTS (SELECT 1 FROM task c WHERE c.parent_task_id = p.id AND c.id != {2})), 0)"
+        )
+        with DB.atomic():
+            for name in missing:
+                # Plain ALTER TABLE: the migrator would rebuild the table and drop its triggers
+                DB.execute_sql(f"ALTER TABLE task ADD COLUMN {name} REAL NOT NULL DEFAULT 0")
+            DB.create_tables([TaskClosureModel])
+            DB.execute_sql(
+                "CREATE TRIGGER IF NOT EXISTS task_closure_insert AFTER INSERT ON task BEGIN "
+                "INSERT INTO taskclosure (ancestor, descendant, depth) "
+                "SELECT new.id, new.id, 0 UNION ALL "
+                "SELECT ancestor, new.id, depth + 1 FROM taskclosure WHERE descendant = new.parent_task_id; "
+                "END"
+            )
+            DB.execute_sql(
+                "CREATE TRIGGER IF NOT EXISTS task_closure_cycle BEFORE UPDATE OF parent_task_id ON task "
+                "WHEN EXISTS (SELECT 1 FROM taskclosure WHERE ancestor = new.id AND descendant = new.parent_task_id) "
+                "BEGIN SELECT RAISE(ABORT, 'task hierarchy cycle'); END"
+            )
+            # Superseded by the task_hierarchy_* triggers, which also keep the progress
+            # totals right while a subtree is moved or deleted
+            DB.execute_sql("DROP TRIGGER IF EXISTS task_closure_move")
+            DB.execute_sql("DROP TRIGGER IF EXISTS task_closure_delete")
+            DB.execute_sql(
+                "CREATE TRIGGER IF NOT EXISTS task_hierarchy_move AFTER UPDATE OF parent_task_id ON task "
+                "WHEN old.parent_task_id IS NOT new.parent_task_id BEGIN "
+                "UPDATE task SET "
+                f"progress_weight = progress_weight - (SELECT progress_weight FROM task WHERE id = new.id) "
+                f"+ {own_if_childless.format(weight('p'), 'old.parent_task_id')}, "
+                f"progress_done = progress_done - (SELECT progress_done FROM task WHERE id = new.id) "
+                f"+ {own_if_childless.format(done('p'), 'old.parent_task_id')} "
+                "WHERE id IN (SELECT ancestor FROM taskclosure WHERE descendant = old.parent_task_id); "
+                "UPDATE task SET "
+                f"progress_weight = progress_weight + (SELECT progress_weight FROM task WHERE id = new.id) "
+                f"- {own_if_only_child.format(weight('p'), 'new.parent_task_id', 'new.id')}, "
+                f"progress_done = progress_done + (SELECT progress_done FROM task WHERE id = new.id) "
+                f"- {own_if_only_child.format(done('p'), 'new.parent_task_id', 'new.id')} "
+                "WHERE id IN (SELECT ancestor FROM taskclosure WHERE descendant = new.parent_task_id); "
+                "DELETE FROM taskclosure "
+                "WHERE descendant IN (SELECT descendant FROM taskclosure WHERE ancestor = new.id) "
+                "AND ancestor NOT IN (SELECT descendant FROM taskclosure WHERE ancestor = new.id); "
+                "INSERT INTO taskclosure (ancestor, descendant, depth) "
+                "SELECT a.ancestor, d.descendant, a.depth + d.depth + 1 FROM taskclosure a, taskclosure d "
+                "WHERE a.descendant = new.parent_task_id AND d.ancestor = new.id; "
+                "END"
+            )
+            DB.execute_sql(
+                "CREATE TRIGGER IF NOT EXISTS task_hierarchy_delete AFTER DELETE ON task BEGIN "
+                "DELETE FROM taskclosure "
+                "WHERE descendant IN (SELECT descendant FROM taskclosure WHERE ancestor = old.id) "
+                "AND ancestor NOT IN (SELECT descendant FROM taskclosure WHERE ancestor = old.id); "
+                "DELETE FROM taskclosure WHERE ancestor = old.id OR descendant = old.id; "
+                "END"
+            )
+            DB.execute_sql(
+                "CREATE TRIGGER IF NOT EXISTS task_progress_insert AFTER INSERT ON task BEGIN "
+                f"UPDATE task SET progress_weight = {weight('new')}, progress_done = {done('new')} "
+                "WHERE id = new.id; "
+                "UPDATE task SET "
+                f"progress_weight = progress_weight + {weight('new')} "
+                f"- {own_if_only_child.format(weight('p'), 'new.parent_task_id', 'new.id')}, "
+                f"progress_done = progress_done + {done('new')} "
+                f"- {own_if_only_child.format(done('p'), 'new.parent_task_id', 'new.id')} "
+                "WHERE id IN (SELECT ancestor FROM taskclosure WHERE descendant = new.parent_task_id); "
+                "END"
+            )
+            DB.execute_sql(
+                "CREATE TRIGGER IF NOT EXISTS task_progress_update "
+                "AFTER UPDATE OF status, start_date, deadline ON task "
+                "WHEN NOT EXISTS (SELECT 1 FROM task WHERE parent_task_id = new.id) BEGIN "
+                "UPDATE task SET "
+                f"progress_weight = progress_weight + {weight('new')} - {weight('old')}, "
+                f"progress_done = progress_done + {done('new')} - {done('old')} "
+                "WHERE id IN (SELECT ancestor FROM taskclosure WHERE descendant = new.id); "
+                "END"
+            )
+            DB.execute_sql(
+                "CREATE TRIGGER IF NOT EXISTS task_progress_delete AFTER DELETE ON task BEGIN "
+                "UPDATE task SET "
+                f"progress_weight = progress_weight - old.progress_weight "
+                f"+ {own_if_childless.format(weight('p'), 'old.parent_task_id')}, "
+                f"progress_done = progress_done - old.progress_done "
+                f"+ {own_if_childless.format(done('p'), 'old.parent_task_id')} "
+                "WHERE id IN (SELECT ancestor FROM taskclosure WHERE descendant = old.parent_task_id); "
+                "END"
+            )
+            if not exists:
+                # Backfill tasks written before the index existed; the depth guard
+                # stops at any cycle earlier versions allowed to be saved
+                DB.execute_sql(
+                    "INSERT OR IGNORE INTO taskclosure (ancestor, descendant, depth) "
+                    "WITH RECURSIVE pairs(ancestor, descendant, depth) AS ("
+                    " SELECT id, id, 0 FROM task"
+                    " UNION ALL"
+                    " SELECT p.ancestor, t.id, p.depth + 1 FROM pairs p"
+                    " JOIN task t ON t.parent_task_id = p.descendant WHERE p.depth < 64"
+                    ") SELECT ancestor, descendant, MIN(depth) FROM pairs GROUP BY ancestor, descendant"
+                )
+            if missing or not exists:
+                # Totals of the tasks written before the rollup existed, from their leaves
+                leaves = (
+                    "FROM taskclosure c JOIN task l ON l.id = c.descendant WHERE c.ancestor = task.id "
+                    "AND NOT EXISTS (SELECT 1 FROM task k WHERE k.parent_task_id = l.id)"
+                )
+                DB.execute_sql(
+                    f"UPDATE task SET progress_weight = (SELECT COALESCE(SUM({weight('l')}), 0) {leaves}), "
+                    f"progress_done = (SELECT COALESCE(SUM({done('l')}), 0) {leaves})"
+                )
+
+    def _check_parent(self, task_id: Optional[str], parent_id: str, project_id: str):
+        """Raise ValueError unless `parent_id` may take `task_id` (None for a new task) as a child."""
+        row = DB.execute_sql(
+            "SELECT t.project_id, (SELECT MAX(depth) FROM taskclosure WHERE descendant = t.id) "
+            "FROM task t WHERE t.id = ?",
+            (parent_id,)
+        ).fetchone()
+        if row is None:
+            raise ValueError("Parent task not found")
+        parent_project_id, parent_depth = row
+        if parent_project_id != project_id:
+            raise ValueError("Parent task belongs to another project")
+
+        height = 0
+        if task_id is not None:
+            if task_id == parent_id or TaskClosureModel.select().where(
+                (TaskClosureModel.ancestor == task_id) & (TaskClosureModel.descendant == parent_id)
+            ).exists():
+                raise ValueError("Cannot move a task under itself or one of its subtasks")
+            height = TaskClosureModel.select(fn.MAX(TaskClosureModel.depth)).where(
+                TaskClosureModel.ancestor == task_id
+            ).scalar() or 0
+        if (parent_depth or 0) + 1 + height > TASK_MAX_DEPTH:
+            raise ValueError(f"Subtasks cannot be nested more than {TASK_MAX_DEPTH} levels deep")
 
     def create_task(self, task: TaskCreate, created_by: str) -> TaskSchema:
         task_id = str(uuid.uuid4())
-        task_db = TaskModel.create(
-            id=task_id,
-            parent_task_id=task.parent_task_id,
-            project_id=task.project_id,
-            name=task.name,
-            description=task.description,
-            start_date=task.start_date,
-            deadline=task.deadline,
-            created_by_id=created_by,
-            assigned_to_id=task.assigned_to_id,
-            created_at=datetime.now(),
-            updated_at=datetime.now()
-        )
+        if task.parent_task_id:
+            self._check_parent(None, task.parent_task_id, task.project_id)
+        with DB.atomic():
+            task_db = TaskModel.create(
+                id=task_id,
+                rank=rank_between(self._last_rank(task.project_id), None),
+                parent_task_id=task.parent_task_id,
+                project_id=task.project_id,
+                name=task.name,
+                description=task.description,
+                start_date=task.start_date,
+                deadline=task.deadline,
+                created_by_id=created_by,
+                assigned_to_id=task.assigned_to_id,
+                created_at=datetime.now(),
+                updated_at=datetime.now()
+            )
+            StatusHistory.record([(task_id, task.project_id, None, task_db.status)])
+            Projects.bump_version(task.project_id)
         return TaskSchema.model_validate({
             "id": task_db.id,
             "name": task_db.name,
@@ -639,30 +1020,83 @@ class TasksTable:
             "status": task_db.status,
             "created_at": task_db.created_at,
             "updated_at": task_db.updated_at,
+            "progress": task_db.progress,
+            "rank": task_db.rank,
             "parent_task_id": task_db.parent_task_id.id if task_db.parent_task_id else None,
             "subtasks": []
         })
 
-    def update_task(self, task_id: str, task_update: TaskUpdate) -> Optional[TaskSchema]:
+    def _check_completable(self, task_ids: List[str]):
+        """Raise ValueError if any of the tasks has a subtask, at any depth, not completed."""
+        incomplete_subtasks = (
+            TaskModel.select()
+            .join(TaskClosureModel, on=(TaskClosureModel.descendant == TaskModel.id))
+            .where(
+                TaskClosureModel.ancestor.in_(task_ids) &
+                (TaskClosureModel.depth > 0) &
+                (TaskModel.status != 'completed')
+            )
+            .exists()
+        )
+        if incomplete_subtasks:
+            raise ValueError("Cannot complete task: there are incomplete subtasks")
+
+    def _apply_update(self, task, update_data: dict, check_completion: bool = True) -> List[tuple]:
+        """Validate and save the changes to one task.
+
+        Returns its status log rows for the caller to record. Without
+        `check_completion` the caller checks completed tasks' subtasks itself.
+        """
+        if check_completion and update_data.get('status') == 'completed':
+            self._check_completable([task.id])
+
+        new_parent_id = update_data.get('parent_task_id')
+        if new_parent_id and new_parent_id != task.parent_task_id_id:
+            self._check_parent(task.id, new_parent_id, update_data.get('project_id', task.project_id))
+
+        old_status, old_project_id = task.status, task.project_id
+        for field, value in update_data.items():
+            setattr(task, field, value)
+
+        task.updated_at = datetime.now()
+        # Only the edited columns: the progress rollup is written by triggers
+        task.save(only=list(task.dirty_fields))
+        if task.project_id != old_project_id:
+            return [
+                (task.id, old_project_id, old_status, None),
+                (task.id, task.project_id, None, task.status)
+            ]
+        if task.status != old_status:
+            return [(task.id, task.project_id, old_status, task.status)]
+        return []
+
+    def update_task(
+        self, task_id: str, task_update: TaskUpdate, cascade: bool = False, move_started: bool = False
+    ) -> Optional[TaskUpdateResult]:
+        """Update a task; with `cascade`, date changes also push its open successors later.
+
+        The task and every shifted successor are written in one transaction.
+        """
         try:
-            task = TaskModel.get(TaskModel.id == task_id)
-            update_data = task_update.model_dump(exclude_unset=True)
-
-            # Check if trying to set status to completed
-            if update_data.get('status') == 'completed':
-                # Check if all subtasks are completed
-                incomplete_subtasks = task.get_subtasks().where(
-                    TaskModel.status != 'completed'
-                ).count()
-                if incomplete_subtasks > 0:
-                    raise ValueError("Cannot complete task: there are incomplete subtasks")
-
-            for field, value in update_data.items():
-                setattr(task, field, value)
-
-            task.updated_at = datetime.now()
-            task.save()
-            return TaskSchema.model_validate({
+            with DB.atomic():
+                task = TaskModel.get(TaskModel.id == task_id)
+                update_data = task_update.model_dump(exclude_unset=True)
+                transitions = self._apply_update(task, update_data)
+                if transitions:
+                    StatusHistory.record(transitions)
+
+                shifted_task_ids = []
+                if cascade and ('start_date' in update_data or 'deadline' in update_data):
+                    shifted_task_ids = self._shift_successors(task, move_started)
+                Projects.bump_version(task.project_id)
+                task.progress_weight, task.progress_done = (
+                    TaskModel.select(TaskModel.progress_weight, TaskModel.progress_done)
+                    .where(TaskModel.id == task.id)
+                    .tuples()
+                    .get()
+                )
+
+            return TaskUpdateResult.model_validate({
                 "id": task.id,
                 "name": task.name,
                 "description": task.description,
@@ -674,23 +1108,445 @@ class TasksTable:
                 "status": task.status,
                 "created_at": task.created_at,
                 "updated_at": task.updated_at,
+                "progress": task.progress,
+                "rank": task.rank,
                 "parent_task_id": task.parent_task_id.id if task.parent_task_id else None,
                 "subtasks": [
                     {
                         **st.to_dict(),
                         "parent_task_id": st.parent_task_id.id if st.parent_task_id else None
                     } for st in task.get_subtasks()
-                ]
+                ],
+                "shifted_task_ids": shifted_task_ids
             })
         except TaskModel.DoesNotExist:
             return None
 
+    # Rows per multi-row INSERT of new tasks (15 bound variables each)
+    INSERT_CHUNK_SIZE = 1000
+
+    def get_task_heads(self, task_ids: List[str]) -> dict:
+        """{id: (project id, assignee id, status, name)} of the tasks that exist, in one query."""
+        if not task_ids:
+            return {}
+        return {
+            row[0]: row[1:]
+            for row in TaskModel.select(
+                TaskModel.id, TaskModel.project_id, TaskModel.assigned_to_id, TaskModel.status, TaskModel.name
+            )
+            .where(TaskModel.id.in_(list(set(task_ids))))
+            .tuples()
+        }
+
+    def _order_creates(self, creates: List[BatchTaskCreate]) -> tuple:
+        """Creates ordered parents first, the {ref: index} map and each one's depth.
+
+        A parent given by temporary id must be created in the same batch and
+        project; one given by task id must exist there already. Raises
+        ValueError otherwise, and for cycles or nesting past TASK_MAX_DEPTH.
+        """
+        by_ref = {}
+        for i, create in enumerate(creates):
+            if create.ref is not None:
+                if create.ref in by_ref:
+                    raise ValueError(f"Temporary id '{create.ref}' is used twice")
+                by_ref[create.ref] = i
+
+        existing = {
+            create.parent_task_id for create in creates
+            if create.parent_task_id and create.parent_task_id not in by_ref
+        }
+        parents = {}
+        if existing:
+            placeholders = ", ".join("?" * len(existing))
+            parents = {
+                row[0]: (row[1], row[2] or 0)
+                for row in DB.execute_sql(
+                    "SELECT t.id, t.project_id, (SELECT MAX(depth) FROM taskclosure WHERE descendant = t.id) "
+                    f"FROM task t WHERE t.id IN ({placeholders})",
+                    list(existing)
+                ).fetchall()
+            }
+
+        depth, order, pending = {}, [], list(range(len(creates)))
+        while pending:
+            waiting = []
+            for i in pending:
+                create = creates[i]
+                parent_id = create.parent_task_id
+                if not parent_id:
+                    depth[i] = 0
+                elif parent_id in by_ref:
+                    parent = by_ref[parent_id]
+                    if parent not in depth:
+                        waiting.append(i)
+                        continue
+                    if creates[parent].project_id != create.project_id:
+                        raise ValueError("Parent task belongs to another project")
+                    depth[i] = depth[parent] + 1
+                elif parent_id not in parents:
+                    raise ValueError("Parent task not found")
+                elif parents[parent_id][0] != create.project_id:
+                    raise ValueError("Parent task belongs to another project")
+                else:
+                    depth[i] = parents[parent_id][1] + 1
+                if depth[i] > TASK_MAX_DEPTH:
+                    raise ValueError(f"Subtasks cannot be nested more than {TASK_MAX_DEPTH} levels deep")
+                order.append(i)
+            if len(waiting) == len(pending):
+                raise ValueError("Temporary ids of the batch form a cycle")
+            pending = waiting
+        return order, by_ref
+
+    def apply_batch(
+        self,
+        creates: List[BatchTaskCreate],
+        updates: List[BatchTaskUpdate],
+        deletes: List[str],
+        created_by: str
+    ) -> dict:
+        """Create, update and delete many tasks in one transaction.
+
+        New tasks go in with multi-row INSERTs, parents before children, and
+        are ranked after each project's last task in the order given. Every
+        parent_task_id may name a task created by the batch through its
+        temporary id. Status changes are logged in one write and each project
+        is bumped once. Raises ValueError, writing nothing, if any operation
+        is invalid. Returns the created and updated tasks as stored, the
+        temporary id map and the ids of all deleted tasks.
+        """
+        order, by_ref = self._order_creates(creates)
+        new_ids = [str(uuid.uuid4()) for _ in creates]
+        ids = {ref: new_ids[i] for ref, i in by_ref.items()}
+
+        def resolve(parent_id):
+            return ids.get(parent_id, parent_id) if parent_id else None
+
+        with DB.atomic():
+            now = datetime.now()
+            ranks, project_ids = {}, set()
+            for project_id in {create.project_id for create in creates}:
+                indexes = [i for i, create in enumerate(creates) if create.project_id == project_id]
+                ranks.update(zip(indexes, keys_after(self._last_rank(project_id), len(indexes))))
+            rows = [
+                {
+                    "id": new_ids[i],
+                    "rank": ranks[i],
+                    "parent_task_id": resolve(creates[i].parent_task_id),
+                    "project_id": creates[i].project_id,
+                    "name": creates[i].name,
+                    "description": creates[i].description,
+                    "start_date": creates[i].start_date,
+                    "deadline": creates[i].deadline,
+                    "created_by_id": created_by,
+                    "assigned_to_id": creates[i].assigned_to_id,
+                    "status": "pending",
+                    "created_at": now,
+                    "updated_at": now
+                }
+                for i in order
+            ]
+            for i in range(0, len(rows), self.INSERT_CHUNK_SIZE):
+                TaskModel.insert_many(rows[i:i + self.INSERT_CHUNK_SIZE]).execute()
+            transitions = [(row["id"], row["project_id"], None, "pending") for row in rows]
+            project_ids.update(row["project_id"] for row in rows)
+
+            tasks = {
+                task.id: task
+                for task in TaskModel.select().where(TaskModel.id.in_([update.id for update in updates]))
+            }
+            completed = []
+            for update in updates:
+                task = tasks.get(update.id)
+                if task is None:
+                    raise ValueError(f"Task {update.id} not found")
+                update_data = update.model_dump(exclude_unset=True, exclude={"id"})
+                if "parent_task_id" in update_data:
+                    update_data["parent_task_id"] = resolve(update_data["parent_task_id"])
+                transitions += self._apply_update(task, update_data, check_completion=False)
+                project_ids.add(task.project_id)
+                if update_data.get("status") == "completed":
+                    completed.append(task.id)
+            # Checked once all updates are in, so their order within the batch does not matter
+            if completed:
+                self._check_completable(completed)
+
+            subtree = self._delete_subtrees(deletes) if deletes else []
+            transitions += [(task_id, project_id, status, None) for task_id, project_id, status in subtree]
+            project_ids.update(row[1] for row in subtree)
+
+            if transitions:
+                StatusHistory.record(transitions)
+            for project_id in project_ids:
+                Projects.bump_version(project_id)
+
+            deleted = {row[0] for row in subtree}
+            changed = [task_id for task_id in new_ids + list(tasks) if task_id not in deleted]
+            stored = {
+                t.id: self._flat_task(t)
+                for t in TaskModel.select().where(TaskModel.id.in_(changed))
+            }
+
+        return {
+            "created": [stored[task_id] for task_id in new_ids if task_id in stored],
+            "ids": ids,
+            "updated": [stored[update.id] for update in updates if update.id in stored],
+            "deleted": [row[0] for row in subtree]
+        }
+
+    def _last_rank(self, project_id: str) -> Optional[str]:
+        return TaskModel.select(fn.MAX(TaskModel.rank)).where(TaskModel.project_id == project_id).scalar() or None
+
+    def check_move_anchor(self, task_id: str, anchor_id: str):
+        """Raise ValueError unless `anchor_id` is another task of `task_id`'s project."""
+        project_id = self.get_task_project_id(task_id)
+        if anchor_id == task_id or project_id is None or self.get_task_project_id(anchor_id) != project_id:
+            raise ValueError("The neighbouring task must be another task of the same project")
+
+    def move_task(
+        self,
+        task_id: str,
+        after_id: Optional[str] = None,
+        before_id: Optional[str] = None
+    ) -> Optional[TaskSchema]:
+        """Place a task right after `after_id` or right before `before_id` (or last).
+
+        Neighbours are taken in the whole project's order, so the task lands next
+        to the given one in any filtered view, such as a board column. Only the
+        task's own rank is written: not even its `updated_at` changes.
+        """
+        with DB.atomic():
+            task = TaskModel.get_or_none(TaskModel.id == task_id)
+            if task is None:
+                return None
+
+            others = (TaskModel.project_id == task.project_id) & (TaskModel.id != task_id)
+
+            def nearest(order, condition=None):
+                # Walks the (project_id, rank) index from one end and stops at the first row
+                return (
+                    TaskModel.select(TaskModel.rank)
+                    .where(others if condition is None else others & condition)
+                    .order_by(order).limit(1).scalar()
+                )
+
+            anchor_id = after_id or before_id
+            if anchor_id is None:
+                low, high = nearest(TaskModel.rank.desc()), None
+            else:
+                anchor = TaskModel.get_or_none((TaskModel.id == anchor_id) & others)
+                if anchor is None:
+                    raise ValueError("The neighbouring task must be another task of the same project")
+                if after_id:
+                    low, high = anchor.rank, nearest(TaskModel.rank, TaskModel.rank > anchor.rank)
+                else:
+                    low, high = nearest(TaskModel.rank.desc(), TaskModel.rank < anchor.rank), anchor.rank
+            # Unranked tasks ('') sort first; ranking after them needs no lower bound
+            rank = rank_between(low or None, high or None)
+            TaskModel.update(rank=rank).where(TaskModel.id == task_id).execute()
+            Projects.bump_version(task.project_id)
+        return self.get_task(task_id)
+
+    def rebalance_ranks(self, project_id: str) -> int:
+        """Give a project's tasks short, evenly spaced ranks in their current order."""
+        with DB.atomic('IMMEDIATE'):
+            ids = [
+                task_id for (task_id,) in TaskModel.select(TaskModel.id)
+                .where(TaskModel.project_id == project_id)
+                .order_by(TaskModel.rank, TaskModel.deadline, TaskModel.id)
+                .tuples()
+            ]
+            items = list(zip(ids, spaced_keys(len(ids))))
+            for i in range(0, len(items), self.SHIFT_CHUNK_SIZE):
+                chunk = items[i:i + self.SHIFT_CHUNK_SIZE]
+                TaskModel.update(rank=Case(TaskModel.id, chunk)).where(
+                    TaskModel.id.in_([task_id for task_id, _ in chunk])
+                ).execute()
+            Projects.bump_version(project_id)
+        return len(items)
+
+    # Rows per UPDATE when writing shifted dates (5 bound variables each)
+    SHIFT_CHUNK_SIZE = 500
+
+    def _shift_successors(self, task, move_started: bool = False) -> List[str]:
+        """Move the tasks downstream of `task` so its dependency links hold again.
+
+        Completed tasks keep their dates, as do started ones unless `move_started`.
+        """
+        edges = [ScheduleEdge(*row) for row in Dependencies.get_edges([task.project_id])]
+        if not edges:
+            return []
+        fixed_statuses = ('completed',) if move_started else ('completed', 'in_progress')
+        dates, fixed = {}, set()
+        for task_id, start, end, status in TaskModel.select(
+            TaskModel.id, TaskModel.start_date, TaskModel.deadline, TaskModel.status
+        ).where(TaskModel.project_id == task.project_id).tuples():
+            dates[task_id] = (start, end)
+            if status in fixed_statuses:
+                fixed.add(task_id)
+        shifted = propagate(dates, edges, task.id, fixed)
+        self._write_dates(shifted)
+        return list(shifted)
+
+    def _write_dates(self, dates: dict):
+        """Write {task id: (start, deadline)}: one UPDATE ... CASE per chunk, not per task."""
+        now = datetime.now()
+        items = list(dates.items())
+        for i in range(0, len(items), self.SHIFT_CHUNK_SIZE):
+            chunk = items[i:i + self.SHIFT_CHUNK_SIZE]
+            TaskModel.update(
+                start_date=Case(TaskModel.id, [(task_id, str(start)) for task_id, (start, _) in chunk]),
+                deadline=Case(TaskModel.id, [(task_id, str(end)) for task_id, (_, end) in chunk]),
+                updated_at=now
+            ).where(TaskModel.id.in_([task_id for task_id, _ in chunk])).execute()
+
+    def set_task_dates(self, dates: dict) -> List[str]:
+        """Bulk-reschedule tasks in one transaction, bumping each affected project once."""
+        if not dates:
+            return []
+        with DB.atomic():
+            project_ids = set()
+            task_ids = list(dates)
+            for i in range(0, len(task_ids), self.SHIFT_CHUNK_SIZE):
+                project_ids.update(
+                    TaskModel.select(TaskModel.project_id)
+                    .where(TaskModel.id.in_(task_ids[i:i + self.SHIFT_CHUNK_SIZE]))
+                    .distinct()
+                    .scalars()
+                )
+            self._write_dates(dates)
+            for project_id in project_ids:
+                Projects.bump_version(project_id)
+        return sorted(project_ids)
+
+    def get_workload_snapshot(self, project_ids: List[str]) -> List[dict]:
+        """Open assigned tasks of everyone assigned to work in the given projects.
+
+        Includes those people's tasks in other projects, since they share the
+        same hours. Dates are returned raw and as julian day numbers.
+        """
+        if not project_ids:
+            return []
+        placeholders = ", ".join("?" * len(project_ids))
+        cursor = DB.execute_sql(
+            "SELECT id, project_id, assigned_to_id, status, start_date, deadline, "
+            "julianday(start_date), julianday(deadline) FROM task "
+            "WHERE status != 'completed' AND start_date IS NOT NULL AND deadline IS NOT NULL "
+            "AND assigned_to_id IN ("
+            f" SELECT assigned_to_id FROM task WHERE project_id IN ({placeholders})"
+            " AND assigned_to_id IS NOT NULL AND status != 'completed')",
+            list(project_ids)
+        )
+        return [
+            {
+                "id": row[0], "project_id": row[1], "assignee": row[2], "status": row[3],
+                "start_date": row[4], "deadline": row[5], "start": row[6], "end": row[7]
+            }
+            for row in cursor.fetchall()
+            if row[6] is not None and row[7] is not None
+        ]
+
+    def get_open_task_spans(self, project_id: str) -> List[dict]:
+        """Open leaf tasks of a project with their dates as julian day numbers.
+
+        Parent tasks are left out since their span is that of their subtasks.
+        """
+        cursor = DB.execute_sql(
+            "SELECT id, status, julianday(start_date), julianday(deadline) FROM task "
+            "WHERE project_id = ? AND status != 'completed' "
+            "AND start_date IS NOT NULL AND deadline IS NOT NULL "
+            "AND id NOT IN (SELECT parent_task_id FROM task WHERE parent_task_id IS NOT NULL)",
+            (project_id,)
+        )
+        return [
+            {"id": row[0], "started": row[1] == "in_progress", "start": row[2], "end": row[3]}
+            for row in cursor.fetchall()
+            if row[2] is not None and row[3] is not None
+        ]
+
+    def get_overrun_history(self, project_id: Optional[str] = None, limit: int = 5000) -> List[float]:
+        """Actual / planned duration of the most recently completed tasks.
+
+        A task's completion time is its last transition into 'completed' in
+        the status log, so later edits to a finished task do not move it.
+        Tasks planned to take under an hour are skipped, their ratios are
+        mostly noise.
+        """
+        sql = (
+            "SELECT (done - julianday(start_date)) / (julianday(deadline) - julianday(start_date)) FROM ("
+            " SELECT t.start_date, t.deadline, ("
+            "  SELECT MAX(julianday(s.changed_at)) FROM taskstatustransition s"
+            "  WHERE s.task_id = t.id AND s.to_status = 'completed'"
+            " ) AS done FROM task t"
+            " WHERE t.status = 'completed' AND julianday(t.deadline) - julianday(t.start_date) > 1.0 / 24"
+        )
+        params = []
+        if project_id is not None:
+            sql += " AND t.project_id = ?"
+            params.append(project_id)
+        sql += ") WHERE done IS NOT NULL ORDER BY done DESC LIMIT ?"
+        params.append(limit)
+        return [row[0] for row in DB.execute_sql(sql, params).fetchall() if row[0] is not None]
+
     def delete_task(self, task_id: str) -> bool:
+        """Delete a task together with all its subtasks, at any depth.
+
+        Returns False if there is no such task. Database errors are logged
+        and raised, with nothing deleted.
+        """
         try:
-            TaskModel.delete().where(TaskModel.id == task_id).execute()
+            with DB.atomic():
+                subtree = self._delete_subtrees([task_id])
+                if not subtree:
+                    return False
+                StatusHistory.record([(tid, pid, status, None) for tid, pid, status in subtree])
+                for project_id in {row[1] for row in subtree}:
+                    Projects.bump_version(project_id)
             return True
-        except:
-            return False
+        except Exception:
+            logger.exception("Error deleting task", extra={"task_id": task_id})
+            raise
+
+    def _delete_subtrees(self, task_ids: List[str]) -> List[tuple]:
+        """Delete the tasks and all their subtasks; returns (id, project id, status) of each."""
+        subtree = list(
+            TaskModel.select(TaskModel.id, TaskModel.project_id, TaskModel.status)
+            .join(TaskClosureModel, on=(TaskClosureModel.descendant == TaskModel.id))
+            .where(TaskClosureModel.ancestor.in_(task_ids))
+            .group_by(TaskModel.id)
+            .order_by(fn.MAX(TaskClosureModel.depth).desc())
+            .tuples()
+        )
+        # Deepest first, so no chunk removes a parent before its children
+        for i in range(0, len(subtree), self.SHIFT_CHUNK_SIZE):
+            chunk = [row[0] for row in subtree[i:i + self.SHIFT_CHUNK_SIZE]]
+            TaskModel.delete().where(TaskModel.id.in_(chunk)).execute()
+        return subtree
+
+    def get_subtree(self, task_id: str) -> Optional[TaskSchema]:
+        """A task with every descendant nested under `subtasks`, read in one query."""
+        nodes = {}
+        for t in (
+            TaskModel.select()
+            .join(TaskClosureModel, on=(TaskClosureModel.descendant == TaskModel.id))
+            .where(TaskClosureModel.ancestor == task_id)
+            .order_by(TaskClosureModel.depth, TaskModel.start_date, TaskModel.id)
+        ):
+            node = self._flat_task(t)
+            nodes[node.id] = node
+            if node.id != task_id and node.parent_task_id in nodes:
+                nodes[node.parent_task_id].subtasks.append(node)
+        return nodes.get(task_id)
+
+    def get_ancestors(self, task_id: str) -> List[TaskSchema]:
+        """Ancestors of a task, top-level task first, in one query."""
+        return [
+            self._flat_task(t)
+            for t in TaskModel.select()
+            .join(TaskClosureModel, on=(TaskClosureModel.ancestor == TaskModel.id))
+            .where((TaskClosureModel.descendant == task_id) & (TaskClosureModel.depth > 0))
+            .order_by(TaskClosureModel.depth.desc())
+        ]
 
     def get_task(self, task_id: str) -> Optional[TaskSchema]:
         try:
@@ -707,6 +1563,8 @@ class TasksTable:
                 "status": task.status,
                 "created_at": task.created_at,
                 "updated_at": task.updated_at,
+                "progress": task.progress,
+                "rank": task.rank,
                 "parent_task_id": task.parent_task_id.id if task.parent_task_id else None
             }
             subtasks = [
@@ -721,6 +1579,24 @@ class TasksTable:
         except TaskModel.DoesNotExist:
             return None
 
+    def get_task_project_id(self, task_id: str) -> Optional[str]:
+        """Project of a task, without loading the task or its subtasks."""
+        return TaskModel.select(TaskModel.project_id).where(TaskModel.id == task_id).scalar()
+
+    def get_task_dates(self, task_ids: List[str]) -> dict:
+        """{id: (project id, start date, deadline)} of the tasks that exist, dates as stored."""
+        result = {}
+        for i in range(0, len(task_ids), self.SHIFT_CHUNK_SIZE):
+            result.update(
+                (task_id, (project_id, start, deadline))
+                for task_id, project_id, start, deadline in TaskModel.select(
+                    TaskModel.id, TaskModel.project_id, TaskModel.start_date, TaskModel.deadline
+                )
+                .where(TaskModel.id.in_(task_ids[i:i + self.SHIFT_CHUNK_SIZE]))
+                .tuples()
+            )
+        return result
+
     def get_user_task(self, user_id: str, task_id: str) -> Optional[TaskSchema]:
         try:
             task = TaskModel.get(
@@ -739,6 +1615,8 @@ class TasksTable:
                 "status": task.status,
                 "created_at": task.created_at,
                 "updated_at": task.updated_at,
+                "progress": task.progress,
+                "rank": task.rank,
                 "parent_task_id": task.parent_task_id.id if task.parent_task_id else None
             })
         except TaskModel.DoesNotExist:
@@ -759,6 +1637,8 @@ class TasksTable:
                 "status": t.status,
                 "created_at": t.created_at,
                 "updated_at": t.updated_at,
+                "progress": t.progress,
+                "rank": t.rank,
                 "subtasks": [
                     {
                         **st.to_dict(),
@@ -783,6 +1663,8 @@ class TasksTable:
                 "status": t.status,
                 "created_at": t.created_at,
                 "updated_at": t.updated_at,
+                "progress": t.progress,
+                "rank": t.rank,
                 "parent_task_id": t.parent_task_id.id if t.parent_task_id else None,
                 "subtasks": []
             })
@@ -791,10 +1673,129 @@ class TasksTable:
                  (TaskModel.created_by_id == user_id)) &
                 ((TaskModel.project_id == project_id) &
                  (TaskModel.parent_task_id.is_null()))
-            )
+            ).order_by(TaskModel.rank, TaskModel.id)
         ]
 
+    def get_my_tasks(
+        self,
+        user_id: str,
+        is_admin: bool = False,
+        statuses: Optional[List[str]] = None,
+        due_after: Optional[datetime] = None,
+        due_before: Optional[datetime] = None,
+        after: Optional[tuple] = None,
+        limit: int = 50
+    ) -> tuple:
+        """Tasks assigned to or created by a user in any of their projects, by deadline.
+
+        Keyset-paginated on (deadline, id): `after` is the key of the last task
+        already seen. Each side of the OR walks its own (user, deadline, id)
+        index and stops after `limit` rows, so a page costs the same however
+        many tasks the user has. Returns the page and the key to continue from,
+        or None when there is nothing more.
+        """
+        conditions, params = [], []
+        if after is not None:
+            conditions.append("(deadline, id) > (?, ?)")
+            params.extend(after)
+        if statuses:
+            conditions.append(f"status IN ({', '.join('?' * len(statuses))})")
+            params.extend(statuses)
+        if due_after is not None:
+            conditions.append("julianday(deadline) >= julianday(?)")
+            params.append(due_after.isoformat())
+        if due_before is not None:
+            conditions.append("julianday(deadline) < julianday(?)")
+            params.append(due_before.isoformat())
+        if not is_admin:
+            conditions.append("project_id IN (SELECT project_id FROM projectmember WHERE user_id = ?)")
+            params.append(user_id)
+        where = "".join(f" AND {condition}" for condition in conditions)
+
+        branch = (
+            "SELECT * FROM (SELECT id, deadline FROM task WHERE {0} = ?" + where +
+            " ORDER BY deadline, id LIMIT ?)"
+        )
+        rows = list(TaskModel.raw(
+            "SELECT t.*, m.deadline AS sort_deadline, p.name AS project_name FROM ("
+            f"{branch.format('assigned_to_id')} UNION {branch.format('created_by_id')}"
+            ") m JOIN task t ON t.id = m.id JOIN project p ON p.id = t.project_id "
+            "ORDER BY m.deadline, m.id LIMIT ?",
+            user_id, *params, limit + 1, user_id, *params, limit + 1, limit + 1
+        ))
+        page = [
+            MyTaskSchema.model_validate({
+                **self._flat_task(t).model_dump(), "project_name": t.project_name
+            })
+            for t in rows[:limit]
+        ]
+        next_key = (rows[limit - 1].sort_deadline, rows[limit - 1].id) if len(rows) > limit else None
+        return page, next_key
+
+    def get_board(
+        self,
+        project_id: str,
+        user_id: Optional[str] = None,
+        status: Optional[str] = None,
+        after: Optional[tuple] = None,
+        limit: int = 20
+    ) -> dict:
+        """The first `limit` cards of each status column of a project, in rank order, with
+        column totals.
+
+        One windowed query: each column is numbered in card order and only the
+        cards of each page (plus one to tell whether another page follows) leave
+        the database. `status` and `after` (the key of the last card seen) page
+        through a single column. `user_id` limits the board to the tasks that
+        user is assigned to or created. Returns {status: (total, cards, next key)}.
+        """
+        conditions, params = ["project_id = ?"], [project_id]
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if user_id is not None:
+            conditions.append("(assigned_to_id = ? OR created_by_id = ?)")
+            params.extend([user_id, user_id])
+        # Rows before the cursor still count toward the total; the first row of a
+        # column stays in the result so an exhausted column keeps its total
+        on_page = "(rank, id) > (?, ?)" if after is not None else "1"
+        cursor_params = list(after) if after is not None else []
+        rows = TaskModel.raw(
+            "SELECT * FROM ("
+            " SELECT t.*,"
+            f" {on_page} AS on_page,"
+            " COUNT(*) OVER (PARTITION BY status) AS column_total,"
+            f" ROW_NUMBER() OVER (PARTITION BY status, {on_page} ORDER BY rank, id) AS position"
+            f" FROM task t WHERE {' AND '.join(conditions)}"
+            ") WHERE (on_page AND position <= ?) OR position = 1 "
+            "ORDER BY status, rank, id",
+            *cursor_params, *cursor_params, *params, limit + 1
+        )
+
+        columns = {}
+        for t in rows:
+            total, cards, _ = columns.setdefault(t.status, (t.column_total, [], None))
+            if t.on_page:
+                cards.append(t)
+        board = {}
+        for column_status, (total, cards, _) in columns.items():
+            next_key = None
+            if len(cards) > limit:
+                cards = cards[:limit]
+                next_key = (cards[-1].rank, cards[-1].id)
+            board[column_status] = (total, [self._flat_task(t) for t in cards], next_key)
+        return board
+
     def get_project_tasks(self, project_id: str) -> List[TaskSchema]:
+        """Top-level tasks of a project with their direct subtasks, in rank order."""
+        top_level = (TaskModel.project_id == project_id) & TaskModel.parent_task_id.is_null()
+        subtasks = {}
+        for st in (
+            TaskModel.select()
+            .where(TaskModel.parent_task_id.in_(TaskModel.select(TaskModel.id).where(top_level)))
+            .order_by(TaskModel.rank, TaskModel.id)
+        ):
+            subtasks.setdefault(st.parent_task_id_id, []).append(st)
         return [
             TaskSchema.model_validate({
                 "id": t.id,
@@ -808,20 +1809,323 @@ class TasksTable:
                 "status": t.status,
                 "created_at": t.created_at,
                 "updated_at": t.updated_at,
+                "progress": t.progress,
+                "rank": t.rank,
                 "parent_task_id": t.parent_task_id.id if t.parent_task_id else None,
                 "subtasks": [
-                    {
-                        **st.to_dict(),
-                        "parent_task_id": st.parent_task_id.id if st.parent_task_id else None
-                    } for st in t.get_subtasks()
+                    st.to_dict() for st in subtasks.get(t.id, [])
                 ]
             })
-            for t in TaskModel.select().where(
-                (TaskModel.project_id == project_id) &
-                (TaskModel.parent_task_id.is_null())  # Only get top-level tasks
+            for t in TaskModel.select().where(top_level).order_by(TaskModel.rank, TaskModel.id)
+        ]
+
+    def get_project_task_list(self, project_id: str) -> List[TaskSchema]:
+        """Every task of a project at any depth, as a flat list in rank order."""
+        query = TaskModel.select().where(TaskModel.project_id == project_id).order_by(TaskModel.rank, TaskModel.id)
+        return [self._flat_task(t) for t in query]
+
+    def count_project_tasks(self, project_id: str) -> int:
+        return TaskModel.select().where(TaskModel.project_id == project_id).count()
+
+    def iter_outline(self, project_id: str, page_size: int = 500) -> Iterator[tuple]:
+        """Yield (depth, row) for every task of a project in outline order.
+
+        Depth first with siblings in rank order: each task comes after its
+        parent and its subtree before its next sibling. Siblings are read a
+        page at a time along the current branch only, so memory is bounded by
+        page size times depth however large the project. Rows are dicts of
+        the task's columns as stored (dates stay text, for writers that only
+        copy them out) plus `has_children`, which spares a query per leaf.
+        Every page is its own query, so the generator may be resumed from
+        another thread.
+        """
+        def siblings(parent_id, after):
+            # Subtasks by their parent alone (always in its project): filtering on the
+            # project too would walk the whole project's rank index for every parent
+            if parent_id is None:
+                conditions, params = ["t.project_id = ?", "t.parent_task_id IS NULL"], [project_id]
+            else:
+                conditions, params = ["t.parent_task_id = ?"], [parent_id]
+            if after is not None:
+                # The plain bound lets the rank index start at the cursor
+                conditions.append("t.rank >= ? AND (t.rank, t.id) > (?, ?)")
+                params.extend((after[0], *after))
+            cursor = DB.execute_sql(
+                "SELECT t.*, EXISTS (SELECT 1 FROM task c WHERE c.parent_task_id = t.id) AS has_children "
+                f"FROM task t WHERE {' AND '.join(conditions)} ORDER BY t.rank, t.id LIMIT ?",
+                (*params, page_size)
+            )
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        # One frame per open level: its parent, the current page and the position in it
+        stack = [[None, siblings(None, None), 0]]
+        while stack:
+            frame = stack[-1]
+            parent_id, page, position = frame
+            if position == len(page):
+                if len(page) < page_size:
+                    stack.pop()
+                else:
+                    frame[1:] = [siblings(parent_id, (page[-1]["rank"], page[-1]["id"])), 0]
+                continue
+            task = page[position]
+            frame[2] = position + 1
+            yield len(stack) - 1, task
+            if task["has_children"]:
+                stack.append([task["id"], siblings(task["id"], None), 0])
+
+    def _window_bounds(self, window_start: Optional[datetime], window_end: Optional[datetime]) -> tuple:
+        low = window_start.isoformat(sep=" ") if window_start else "0000-01-01"
+        high = window_end.isoformat(sep=" ") if window_end else "9999-12-31"
+        return low, high
+
+    def _overlap_sql(self, alias: str) -> str:
+        """Predicate on `alias` overlapping [julianday(?), julianday(?)]."""
+        return "{end} >= julianday(?) AND {start} <= julianday(?)".format(
+            start=self._INTERVAL_START.format(alias), end=self._INTERVAL_END.format(alias)
+        )
+
+    def _flat_task(self, t) -> TaskSchema:
+        return TaskSchema.model_validate({
+            "id": t.id,
+            "name": t.name,
+            "description": t.description,
+            "project_id": t.project_id,
+            "start_date": t.start_date,
+            "deadline": t.deadline,
+            "assigned_to_id": t.assigned_to_id,
+            "created_by_id": t.created_by_id,
+            "status": t.status,
+            "created_at": t.created_at,
+            "updated_at": t.updated_at,
+            "progress": t.progress,
+            "rank": t.rank,
+            "parent_task_id": t.parent_task_id_id,
+            "subtasks": []
+        })
+
+    def get_project_tasks_in_window(
+        self, project_id: str, window_start: Optional[datetime], window_end: Optional[datetime]
+    ) -> List[TaskSchema]:
+        """Tasks of a project overlapping [window_start, window_end], plus all their ancestors.
+
+        Returns a flat list (no nested subtasks); either bound may be open.
+        """
+        low, high = self._window_bounds(window_start, window_end)
+        if self.interval_index:
+            project_rowid = ProjectModel.select(SQL("rowid")).where(ProjectModel.id == project_id).scalar()
+            if project_rowid is None:
+                return []
+            hits = (
+                "SELECT t.id FROM task_interval i JOIN task t ON t.rowid = i.id "
+                "WHERE i.end_day >= julianday(?) AND i.start_day <= julianday(?) "
+                "AND i.project_lo <= ? AND i.project_hi >= ? "
+                f"AND t.project_id = ? AND {self._overlap_sql('t')}"
+            )
+            params = [low, high, project_rowid, project_rowid, project_id, low, high]
+        else:
+            hits = f"SELECT t.id FROM task t WHERE t.project_id = ? AND {self._overlap_sql('t')}"
+            params = [project_id, low, high]
+
+        query = TaskModel.raw(
+            "SELECT * FROM task WHERE id IN ("
+            f" SELECT c.ancestor FROM taskclosure c WHERE c.descendant IN ({hits})"
+            ")",
+            *params
+        )
+        return [self._flat_task(t) for t in query]
+
+    def get_top_level_tasks(
+        self,
+        project_ids: List[str],
+        window_start: Optional[datetime] = None,
+        window_end: Optional[datetime] = None
+    ) -> List[TaskSchema]:
+        """Top-level tasks of several projects in one query, optionally limited to a window."""
+        if not project_ids:
+            return []
+        sql = (
+            "SELECT t.* FROM task t WHERE t.parent_task_id IS NULL "
+            f"AND t.project_id IN ({', '.join('?' * len(project_ids))})"
+        )
+        params = list(project_ids)
+        if window_start is not None or window_end is not None:
+            low, high = self._window_bounds(window_start, window_end)
+            if self.interval_index:
+                sql += (
+                    " AND t.rowid IN (SELECT id FROM task_interval"
+                    " WHERE end_day >= julianday(?) AND start_day <= julianday(?))"
+                )
+                params += [low, high]
+            sql += f" AND {self._overlap_sql('t')}"
+            params += [low, high]
+        return [self._flat_task(t) for t in TaskModel.raw(sql, *params)]
+
+    def get_project_rollups(self, project_ids: List[str]) -> dict:
+        """Task span, status counts and progress totals per project, in one grouped query."""
+        if not project_ids:
+            return {}
+        top_level = TaskModel.parent_task_id.is_null()
+        rows = (
+            TaskModel.select(
+                TaskModel.project_id,
+                fn.MIN(fn.julianday(TaskModel.start_date)),
+                fn.MAX(fn.julianday(TaskModel.deadline)),
+                fn.COUNT(TaskModel.id),
+                fn.SUM(Case(None, [(TaskModel.status == 'completed', 1)], 0)),
+                fn.SUM(Case(None, [(TaskModel.status == 'in_progress', 1)], 0)),
+                fn.SUM(Case(None, [(top_level, TaskModel.progress_weight)], 0)),
+                fn.SUM(Case(None, [(top_level, TaskModel.progress_done)], 0))
+            )
+            .where(TaskModel.project_id.in_(project_ids))
+            .group_by(TaskModel.project_id)
+            .tuples()
+        )
+        return {
+            project_id: {
+                "start": from_julian_day(start),
+                "end": from_julian_day(end),
+                "total": total,
+                "completed": completed,
+                "in_progress": in_progress,
+                "progress_weight": weight,
+                "progress_done": done
+            }
+            for project_id, start, end, total, completed, in_progress, weight, done in rows
+        }
+
+    def get_project_schedule(self, project_id: str) -> List[tuple]:
+        """(id, start day, end day) of every task in a project, as julian day numbers."""
+        return list(
+            TaskModel.select(
+                TaskModel.id,
+                fn.julianday(TaskModel.start_date),
+                fn.julianday(TaskModel.deadline)
+            )
+            .where(TaskModel.project_id == project_id)
+            .tuples()
+        )
+
+
+class DependenciesTable:
+    def __init__(self):
+        with get_db():
+            DB.create_tables([TaskDependencyModel])
+
+    def get_project_dependencies(self, project_id: str) -> List[TaskDependencySchema]:
+        return [
+            TaskDependencySchema.model_validate(dependency.to_dict())
+            for dependency in TaskDependencyModel.select().where(
+                TaskDependencyModel.project_id == project_id
             )
         ]
 
+    def get_edges(self, project_ids: List[str]) -> List[tuple]:
+        """(predecessor id, successor id, type, lag days) of every link in the given projects."""
+        if not project_ids:
+            return []
+        return list(
+            TaskDependencyModel.select(
+                TaskDependencyModel.predecessor,
+                TaskDependencyModel.successor,
+                TaskDependencyModel.type,
+                TaskDependencyModel.lag_days
+            )
+            .where(TaskDependencyModel.project_id.in_(project_ids))
+            .tuples()
+        )
+
+    def get_edges_into(self, task_ids: List[str]) -> List[tuple]:
+        """(predecessor id, successor id, type, lag days) of every link into the given tasks."""
+        if not task_ids:
+            return []
+        return list(
+            TaskDependencyModel.select(
+                TaskDependencyModel.predecessor,
+                TaskDependencyModel.successor,
+                TaskDependencyModel.type,
+                TaskDependencyModel.lag_days
+            )
+            .where(TaskDependencyModel.successor.in_(task_ids))
+            .order_by(TaskDependencyModel.successor, TaskDependencyModel.created_at)
+            .tuples()
+        )
+
+    def get_dependency(self, dependency_id: str) -> Optional[TaskDependencySchema]:
+        try:
+            dependency = TaskDependencyModel.get(TaskDependencyModel.id == dependency_id)
+            return TaskDependencySchema.model_validate(dependency.to_dict())
+        except TaskDependencyModel.DoesNotExist:
+            return None
+
+    def add_dependency(self, dependency: TaskDependencyCreate) -> TaskDependencySchema:
+        if dependency.predecessor_id == dependency.successor_id:
+            raise ValueError("A task cannot depend on itself")
+
+        project_ids = dict(
+            TaskModel.select(TaskModel.id, TaskModel.project_id)
+            .where(TaskModel.id.in_([dependency.predecessor_id, dependency.successor_id]))
+            .tuples()
+        )
+        if len(project_ids) != 2:
+            raise ValueError("Task not found")
+        project_id = project_ids[dependency.predecessor_id]
+        if project_ids[dependency.successor_id] != project_id:
+            raise ValueError("Dependencies must link tasks of the same project")
+
+        with DB.atomic():
+            edges = list(
+                TaskDependencyModel.select(
+                    TaskDependencyModel.predecessor, TaskDependencyModel.successor
+                )
+                .where(TaskDependencyModel.project_id == project_id)
+                .tuples()
+            )
+            if (dependency.predecessor_id, dependency.successor_id) in edges:
+                raise ValueError("Dependency already exists")
+            if self._reaches(edges, dependency.successor_id, dependency.predecessor_id):
+                raise ValueError("Dependency would create a cycle")
+
+            dependency_db = TaskDependencyModel.create(
+                id=str(uuid.uuid4()),
+                project_id=project_id,
+                predecessor=dependency.predecessor_id,
+                successor=dependency.successor_id,
+                type=dependency.type,
+                lag_days=dependency.lag_days,
+                created_at=datetime.now()
+            )
+            Projects.bump_version(project_id)
+        return TaskDependencySchema.model_validate(dependency_db.to_dict())
+
+    def delete_dependency(self, dependency_id: str) -> bool:
+        try:
+            dependency = TaskDependencyModel.get(TaskDependencyModel.id == dependency_id)
+        except TaskDependencyModel.DoesNotExist:
+            return False
+        dependency.delete_instance()
+        Projects.bump_version(dependency.project_id)
+        return True
+
+    @staticmethod
+    def _reaches(edges, start: str, target: str) -> bool:
+        """Whether `target` is reachable from `start` following (predecessor, successor) edges."""
+        successors = {}
+        for predecessor, successor in edges:
+            successors.setdefault(predecessor, []).append(successor)
+        seen = {start}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            if node == target:
+                return True
+            for nxt in successors.get(node, ()):
+                if nxt not in seen:
+                    seen.add(nxt)
+                    stack.append(nxt)
+        return False
+
 
 class CommentsTable:
     def __init__(self):
@@ -846,6 +2150,15 @@ class CommentsTable:
             for comment in CommentModel.select().where(CommentModel.task_id == task_id)
         ]
 
+    def get_comments_for_tasks(self, task_ids: List[str]) -> List[CommentSchema]:
+        """Comments on any of the given tasks, each task's in the order written."""
+        return [
+            CommentSchema.model_validate(comment.to_dict())
+            for comment in CommentModel.select()
+            .where(CommentModel.task_id.in_(task_ids))
+            .order_by(CommentModel.task_id, CommentModel.created_at, CommentModel.id)
+        ]
+
     def get_comment(self, comment_id: str) -> Optional[CommentSchema]:
         try:
             comment = CommentModel.get(CommentModel.id == comment_id)
@@ -857,12 +2170,644 @@ class CommentsTable:
         try:
             deleted = CommentModel.delete().where(CommentModel.id == comment_id).execute()
             return deleted > 0
-        except Exception as e:
-            print(f"Error deleting comment: {e}")
+        except Exception:
+            logger.exception("Error deleting comment", extra={"comment_id": comment_id})
             return False
 
 
+class StatusHistoryTable:
+    ROLLUP = "project_status_day"
+
+    def __init__(self):
+        with get_db():
+            exists = DB.table_exists(TaskStatusTransitionModel._meta.table_name)
+            DB.create_tables([TaskStatusTransitionModel, ProjectStatusDayModel, RollupWatermark])
+            if not exists and DB.table_exists(TaskModel._meta.table_name):
+                self._backfill()
+
+    def _backfill(self):
+        """Seed the log from tasks written before it existed.
+
+        Each task gets a creation row and, unless still pending, one move to
+        its current status at its last update: the best the task table knows.
+        """
+        DB.execute_sql(
+            "INSERT INTO taskstatustransition (task_id, project_id, from_status, to_status, changed_at) "
+            "SELECT id, project_id, NULL, 'pending', created_at FROM task "
+            "UNION ALL "
+            "SELECT id, project_id, 'pending', status, updated_at FROM task WHERE status != 'pending'"
+        )
+
+    def record(self, transitions: List[tuple]):
+        """Append (task id, project id, from status, to status) rows.
+
+        Call inside the transaction that changes the tasks, so the log never
+        disagrees with the task table.
+        """
+        now = datetime.now()
+        TaskStatusTransitionModel.insert_many(
+            [(task_id, project_id, old, new, now) for task_id, project_id, old, new in transitions],
+            fields=[
+                TaskStatusTransitionModel.task_id,
+                TaskStatusTransitionModel.project_id,
+                TaskStatusTransitionModel.from_status,
+                TaskStatusTransitionModel.to_status,
+                TaskStatusTransitionModel.changed_at
+            ]
+        ).execute()
+
+    def _rollup_bounds(self) -> tuple:
+        """(watermark, highest log id): the rows past the watermark are not folded in yet."""
+        last_id = (
+            RollupWatermark.select(RollupWatermark.last_id)
+            .where(RollupWatermark.name == self.ROLLUP)
+            .scalar()
+        ) or 0
+        return last_id, TaskStatusTransitionModel.select(fn.MAX(TaskStatusTransitionModel.id)).scalar() or 0
+
+    def refresh_status_days(self) -> int:
+        """Fold log rows added since the last refresh into the daily buckets.
+
+        Incremental: only rows past the watermark are read, so the cost follows
+        the number of new transitions, not the size of the history. Returns the
+        number of rows folded in. The write lock is only taken when there is
+        something to fold, so reads with nothing new do not queue behind
+        writers.
+        """
+        last_id, high = self._rollup_bounds()
+        if high <= last_id:
+            return 0
+        with DB.atomic('IMMEDIATE'):
+            # Another worker may have folded the same rows while this one waited
+            last_id, high = self._rollup_bounds()
+            if high <= last_id:
+                return 0
+            DB.execute_sql(
+                "INSERT INTO projectstatusday (project_id, day, status, entered, exited) "
+                "SELECT project_id, day, status, SUM(entered), SUM(exited) FROM ("
+                " SELECT project_id, date(changed_at) AS day, to_status AS status, 1 AS entered, 0 AS exited"
+                " FROM taskstatustransition WHERE id > ? AND id <= ? AND to_status IS NOT NULL"
+                " UNION ALL"
+                " SELECT project_id, date(changed_at), from_status, 0, 1"
+                " FROM taskstatustransition WHERE id > ? AND id <= ? AND from_status IS NOT NULL"
+                ") WHERE true GROUP BY project_id, day, status "
+                "ON CONFLICT (project_id, day, status) DO UPDATE SET "
+                "entered = entered + excluded.entered, exited = exited + excluded.exited",
+                (last_id, high, last_id, high)
+            )
+            RollupWatermark.replace(name=self.ROLLUP, last_id=high).execute()
+        return high - last_id
+
+    def get_status_days(self, project_id: str) -> List[tuple]:
+        """(julian day, status, entered, exited) buckets of a project, oldest first."""
+        self.refresh_status_days()
+        return list(
+            ProjectStatusDayModel.select(
+                fn.julianday(ProjectStatusDayModel.day),
+                ProjectStatusDayModel.status,
+                ProjectStatusDayModel.entered,
+                ProjectStatusDayModel.exited
+            )
+            .where(ProjectStatusDayModel.project_id == project_id)
+            .order_by(ProjectStatusDayModel.day)
+            .tuples()
+        )
+
+    def get_completions(
+        self, project_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> List[tuple]:
+        """(created, first started, completed) julian days of tasks completed in the window.
+
+        A task counts as completed when its latest transition in the project
+        is into 'completed'; tasks reopened since are left out.
+        """
+        sql = (
+            "SELECT created, started, done FROM ("
+            " SELECT MIN(CASE WHEN from_status IS NULL THEN julianday(changed_at) END) AS created,"
+            "  MIN(CASE WHEN to_status = 'in_progress' THEN julianday(changed_at) END) AS started,"
+            "  MAX(CASE WHEN to_status = 'completed' THEN julianday(changed_at) END) AS done,"
+            "  MAX(CASE WHEN to_status IS NOT 'completed' THEN id END) AS last_other,"
+            "  MAX(CASE WHEN to_status = 'completed' THEN id END) AS last_done"
+            " FROM taskstatustransition WHERE project_id = ? GROUP BY task_id"
+            ") WHERE done IS NOT NULL AND (last_other IS NULL OR last_done > last_other)"
+        )
+        params = [project_id]
+        if start is not None:
+            sql += " AND done >= julianday(?)"
+            params.append(str(start))
+        if end is not None:
+            sql += " AND done < julianday(?)"
+            params.append(str(end))
+        return DB.execute_sql(sql, params).fetchall()
+
+
+class ChangeLogTable:
+    """Change sequence behind delta sync.
+
+    Triggers on the synced tables replace a row's entry in the change log
+    under a fresh sequence number on every insert, update and delete, so the
+    log holds one entry per row (deletes as tombstones) and "what changed
+    since N" is an index range scan, however the row was written.
+    """
+    PRUNED = "changelog_tombstones"
+    PRUNE_INTERVAL = 3600  # seconds between tombstone clean-ups per worker
+    # (entity, table, its project id, its user id, columns whose update counts)
+    SOURCES = (
+        # The version column changes with every task write; it is not synced
+        ("project", "project", "{0}.id", "NULL",
+         "name, description, start_date, deadline, status, is_active, updated_at"),
+        ("task", "task", "{0}.project_id", "NULL", None),
+        ("member", "projectmember", "{0}.project_id", "{0}.user_id", None),
+        ("comment", "comment", "(SELECT project_id FROM task WHERE id = {0}.task_id)", "NULL", None),
+    )
+
+    def __init__(self):
+        self._next_prune = 0.0
+        with get_db():
+            exists = DB.table_exists(ChangeLogModel._meta.table_name)
+            DB.create_tables([ChangeLogModel, EventStreamModel])
+            if all(DB.table_exists(table) for _, table, _, _, _ in self.SOURCES):
+                self.create_triggers()
+                if not exists:
+                    self._backfill()
+
+    def create_triggers(self):
+        entry = (
+            "REPLACE INTO changelog (entity, entity_id, project_id, user_id, deleted, changed_at) "
+            "VALUES ('{entity}', {row}.id, {project}, {user}, {deleted}, datetime('now', 'localtime'))"
+        )
+        with DB.atomic():
+            for entity, table, project, user, columns in self.SOURCES:
+                upsert = entry.format(
+                    entity=entity, row="new", project=project.format("new"), user=user.format("new"), deleted=0
+                )
+                # A deleted comment may have outlived its task: keep the project it was logged under
+                tombstone = entry.format(
+                    entity=entity, row="old", user=user.format("old"), deleted=1,
+                    project=f"COALESCE({project.format('old')}, (SELECT project_id FROM changelog "
+                            f"WHERE entity = '{entity}' AND entity_id = old.id))"
+                )
+                of_columns = f" OF {columns}" if columns else ""
+                DB.execute_sql(
+                    f"CREATE TRIGGER IF NOT EXISTS changelog_{table}_insert AFTER INSERT ON {table} "
+                    f"BEGIN {upsert}; END"
+                )
+                DB.execute_sql(
+                    f"CREATE TRIGGER IF NOT EXISTS changelog_{table}_update AFTER UPDATE{of_columns} ON {table} "
+                    f"BEGIN {upsert}; END"
+                )
+                DB.execute_sql(
+                    f"CREATE TRIGGER IF NOT EXISTS changelog_{table}_delete AFTER DELETE ON {table} "
+                    f"BEGIN {tombstone}; END"
+                )
+
+    def _backfill(self):
+        """Log every existing row once, so a first sync from zero sees all of them."""
+        DB.execute_sql(
+            "INSERT INTO changelog (entity, entity_id, project_id, user_id, deleted, changed_at) "
+            "SELECT 'project', id, id, NULL, 0, updated_at FROM project "
+            "UNION ALL SELECT 'member', id, project_id, user_id, 0, created_at FROM projectmember "
+            "UNION ALL SELECT 'task', id, project_id, NULL, 0, updated_at FROM task "
+            "UNION ALL SELECT 'comment', c.id, t.project_id, NULL, 0, c.updated_at "
+            "FROM comment c LEFT JOIN task t ON t.id = c.task_id"
+        )
+
+    def prune_tombstones(self) -> int:
+        """Drop tombstones older than SYNC_TOMBSTONE_DAYS.
+
+        The highest dropped sequence number is kept: a client whose cursor is
+        below it may have missed a delete and gets a full resync instead.
+        """
+        cutoff = datetime.now() - timedelta(days=SYNC_TOMBSTONE_DAYS)
+        expired = ChangeLogModel.deleted & (ChangeLogModel.changed_at < cutoff)
+        with DB.atomic('IMMEDIATE'):
+            high = ChangeLogModel.select(fn.MAX(ChangeLogModel.seq)).where(expired).scalar()
+            if high is None:
+                return 0
+            count = ChangeLogModel.delete().where(expired & (ChangeLogModel.seq <= high)).execute()
+            RollupWatermark.replace(name=self.PRUNED, last_id=max(high, self._pruned_seq())).execute()
+        return count
+
+    def _pruned_seq(self) -> int:
+        return (
+            RollupWatermark.select(RollupWatermark.last_id)
+            .where(RollupWatermark.name == self.PRUNED)
+            .scalar()
+        ) or 0
+
+    def last_seq(self) -> int:
+        return ChangeLogModel.select(fn.MAX(ChangeLogModel.seq)).scalar() or 0
+
+    def get_events(self, after: int, limit: int = 1000) -> List[tuple]:
+        """(seq, entity, id, project id, user id, deleted) of log entries past `after`, in order."""
+        return list(
+            ChangeLogModel.select(
+                ChangeLogModel.seq,
+                ChangeLogModel.entity,
+                ChangeLogModel.entity_id,
+                ChangeLogModel.project_id,
+                ChangeLogModel.user_id,
+                ChangeLogModel.deleted
+            )
+            .where(ChangeLogModel.seq > after)
+            .order_by(ChangeLogModel.seq)
+            .limit(limit)
+            .tuples()
+        )
+
+    def open_stream(self, user_id: str, limit: Optional[int], stale_after: float) -> Optional[str]:
+        """Register an event stream of the user; None if `limit` streams are already open.
+
+        Streams are counted across every worker. Rows not refreshed within
+        `stale_after` seconds were left by a worker that died, and no longer count.
+        """
+        with DB.atomic('IMMEDIATE'):
+            EventStreamModel.delete().where(
+                (EventStreamModel.user_id == user_id) &
+                (EventStreamModel.seen_at < datetime.now() - timedelta(seconds=stale_after))
+            ).execute()
+            if limit is not None and (
+                EventStreamModel.select().where(EventStreamModel.user_id == user_id).count() >= limit
+            ):
+                return None
+            stream_id = str(uuid.uuid4())
+            EventStreamModel.create(id=stream_id, user_id=user_id)
+        return stream_id
+
+    def touch_streams(self, stream_ids: List[str]):
+        """Mark a worker's open streams as still alive."""
+        if stream_ids:
+            EventStreamModel.update(seen_at=datetime.now()).where(EventStreamModel.id.in_(stream_ids)).execute()
+
+    def close_stream(self, stream_id: str):
+        EventStreamModel.delete().where(EventStreamModel.id == stream_id).execute()
+
+    def count_streams(self, user_id: str) -> int:
+        return EventStreamModel.select().where(EventStreamModel.user_id == user_id).count()
+
+    def get_changes(self, user_id: str, is_admin: bool, since: int = 0, limit: int = 500) -> dict:
+        """Rows changed after sequence number `since` in the projects the user can see.
+
+        Returns the current state of changed projects, tasks, members and
+        comments, (entity, id) tombstones of deleted ones, the sequence number
+        to continue from and whether more changes are waiting. Losing access to
+        a project shows as a tombstone of the project; gaining it brings the
+        whole project along, since its older rows lie before the cursor.
+        """
+        if time.monotonic() >= self._next_prune:
+            self._next_prune = time.monotonic() + self.PRUNE_INTERVAL
+            self.prune_tombstones()
+
+        # One read transaction, so the log and the rows it points at agree
+        with DB.atomic():
+            reset = 0 < since < self._pruned_seq()
+            if reset:
+                since = 0
+            high = self.last_seq()
+            query = ChangeLogModel.select().where(ChangeLogModel.seq > since)
+            if not is_admin:
+                member_of = ProjectMemberModel.select(ProjectMemberModel.project).where(
+                    ProjectMemberModel.user == user_id
+                )
+                # The user's own membership rows stay visible after removal, to report the loss
+                query = query.where(
+                    ChangeLogModel.project_id.in_(member_of) | (ChangeLogModel.user_id == user_id)
+                )
+            rows = list(query.order_by(ChangeLogModel.seq).limit(limit + 1))
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+
+            changed = {"project": set(), "task": set(), "member": set(), "comment": set()}
+            deleted, joined = [], set()
+            for row in rows:
+                own = not is_admin and row.entity == "member" and row.user_id == user_id
+                if not row.deleted:
+                    changed[row.entity].add(row.entity_id)
+                    if own and since:
+                        joined.add(row.project_id)
+                elif since:  # a first sync has nothing to delete
+                    deleted.append((row.entity, row.entity_id))
+                    if own:
+                        deleted.append(("project", row.project_id))
+
+            projects = ProjectModel.select().where(
+                ProjectModel.id.in_(list(changed["project"] | joined))
+            )
+            tasks = TaskModel.select().where(
+                TaskModel.id.in_(list(changed["task"])) | TaskModel.project_id.in_(list(joined))
+            )
+            members = ProjectMemberModel.select().where(
+                ProjectMemberModel.id.in_(list(changed["member"])) |
+                ProjectMemberModel.project.in_(list(joined))
+            )
+            comments = CommentModel.select().where(
+                CommentModel.id.in_(list(changed["comment"])) |
+                CommentModel.task_id.in_(
+                    TaskModel.select(TaskModel.id).where(TaskModel.project_id.in_(list(joined)))
+                )
+            )
+            return {
+                "projects": [ProjectSchema.model_validate(p.to_dict()) for p in projects],
+                "tasks": [TaskSchema.model_validate(t.to_dict()) for t in tasks],
+                "members": [
+                    ProjectMemberSchema.model_validate({
+                        "id": pm.id,
+                        "project_id": pm.project_id,
+                        "user_id": pm.user_id,
+                        "role": pm.role,
+                        "created_at": pm.created_at
+                    })
+                    for pm in members
+                ],
+                "comments": [CommentSchema.model_validate(c.to_dict()) for c in comments],
+                "deleted": list(dict.fromkeys(deleted)),
+                "next_seq": rows[-1].seq if has_more else max(high, since),
+                "has_more": has_more,
+                "reset": reset,
+            }
+
+
+class ImportStaging:
+    """Temporary tables holding an import's tasks, links and comments until its file is read.
+
+    Rows are staged as the file is parsed, in any order: a parent may come
+    after its subtasks. Once the whole file is in, references are checked
+    and depths numbered, then tasks are written a level at a time, parents
+    first and each level in file order, in transactions of `batch_size`
+    rows. Temporary tables belong to one connection: create, fill and write
+    a staging from a single thread, inside get_db().
+    """
+    TASK_COLUMNS = (
+        "ref", "parent_ref", "id", "name", "description", "start_date", "deadline",
+        "status", "assigned_to_id", "rank", "created_at", "updated_at"
+    )
+    COMMENT_COLUMNS = ("id", "task_ref", "user_id", "content", "created_at", "updated_at")
+    DEPENDENCY_COLUMNS = ("id", "predecessor_ref", "successor_ref", "type", "lag_days")
+
+    def __init__(self, batch_size: int = 2000):
+        self.batch_size = batch_size
+        self.tasks = 0
+        self.comments = 0
+        self.dependencies = 0
+        self.levels = 0
+        self._task_rows, self._comment_rows, self._assignments, self._dependency_rows = [], [], [], []
+        self.close()
+        DB.execute_sql(
+            "CREATE TEMP TABLE import_task (seq INTEGER PRIMARY KEY, ref TEXT NOT NULL UNIQUE, "
+            "parent_ref TEXT, id TEXT NOT NULL, depth INTEGER, name TEXT NOT NULL, "
+            "description TEXT NOT NULL, start_date TEXT NOT NULL, deadline TEXT NOT NULL, "
+            "status TEXT NOT NULL, assigned_to_id TEXT, rank TEXT NOT NULL, "
+            "created_at TEXT NOT NULL, updated_at TEXT NOT NULL)"
+        )
+        DB.execute_sql("CREATE INDEX temp.import_task_parent ON import_task (parent_ref)")
+        DB.execute_sql("CREATE INDEX temp.import_task_depth ON import_task (depth, seq)")
+        DB.execute_sql(
+            "CREATE TEMP TABLE import_comment (seq INTEGER PRIMARY KEY, id TEXT NOT NULL, "
+            "task_ref TEXT NOT NULL, user_id TEXT NOT NULL, content TEXT NOT NULL, "
+            "created_at TEXT NOT NULL, updated_at TEXT NOT NULL)"
+        )
+        DB.execute_sql(
+            "CREATE TEMP TABLE import_dependency (seq INTEGER PRIMARY KEY, id TEXT NOT NULL, "
+            "predecessor_ref TEXT NOT NULL, successor_ref TEXT NOT NULL, type TEXT NOT NULL, "
+            "lag_days REAL NOT NULL, UNIQUE (predecessor_ref, successor_ref))"
+        )
+
+    def close(self):
+        DB.execute_sql("DROP TABLE IF EXISTS temp.import_task")
+        DB.execute_sql("DROP TABLE IF EXISTS temp.import_comment")
+        DB.execute_sql("DROP TABLE IF EXISTS temp.import_dependency")
+
+    def add_task(
+        self,
+        ref: str,
+        parent_ref: Optional[str],
+        name: str,
+        description: str,
+        start_date: datetime,
+        deadline: datetime,
+        status: str,
+        assigned_to_id: Optional[str],
+        rank: Optional[str],
+        created_at: datetime,
+        updated_at: datetime
+    ):
+        """Stage a task; without a rank it is ranked after the tasks staged before it."""
+        self._task_rows.append((
+            ref, parent_ref, str(uuid.uuid4()), name, description, str(start_date), str(deadline),
+            status, assigned_to_id, rank or sequence_key(self.tasks), str(created_at), str(updated_at)
+        ))
+        self.tasks += 1
+        if len(self._task_rows) >= self.batch_size:
+            self.flush()
+
+    def assign(self, ref: str, user_id: str):
+        """Assign a staged task unless it already has an assignee."""
+        self._assignments.append((user_id, ref))
+        if len(self._assignments) >= self.batch_size:
+            self.flush()
+
+    def add_comment(self, task_ref: str, user_id: str, content: str, created_at: datetime, updated_at: datetime):
+        self._comment_rows.append(
+            (str(uuid.uuid4()), task_ref, user_id, content, str(created_at), str(updated_at))
+        )
+        self.comments += 1
+        if len(self._comment_rows) >= self.batch_size:
+            self.flush()
+
+    def add_dependency(self, predecessor_ref: str, successor_ref: str, type: str, lag_days: float):
+        self._dependency_rows.append((str(uuid.uuid4()), predecessor_ref, successor_ref, type, lag_days))
+        self.dependencies += 1
+        if len(self._dependency_rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write the rows buffered since the last flush to the staging tables."""
+        with DB.atomic():
+            cursor = DB.cursor()
+            if self._task_rows:
+                cursor.executemany(
+                    f"INSERT INTO import_task ({', '.join(self.TASK_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(self.TASK_COLUMNS))}) ON CONFLICT (ref) DO NOTHING",
+                    self._task_rows
+                )
+                if cursor.rowcount < len(self._task_rows):
+                    raise ValueError("Task ids must be unique")
+            if self._assignments:
+                cursor.executemany(
+                    "UPDATE import_task SET assigned_to_id = ? WHERE ref = ? AND assigned_to_id IS NULL",
+                    self._assignments
+                )
+            if self._comment_rows:
+                cursor.executemany(
+                    f"INSERT INTO import_comment ({', '.join(self.COMMENT_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(self.COMMENT_COLUMNS))})",
+                    self._comment_rows
+                )
+            if self._dependency_rows:
+                cursor.executemany(
+                    f"INSERT INTO import_dependency ({', '.join(self.DEPENDENCY_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(self.DEPENDENCY_COLUMNS))}) "
+                    "ON CONFLICT (predecessor_ref, successor_ref) DO NOTHING",
+                    self._dependency_rows
+                )
+                if cursor.rowcount < len(self._dependency_rows):
+                    raise ValueError("Each pair of tasks can be linked only once")
+        self._task_rows, self._comment_rows, self._assignments, self._dependency_rows = [], [], [], []
+
+    def resolve(self):
+        """Check parent, link and comment references and number each task's depth.
+
+        Raises ValueError for unknown references, cycles in the hierarchy or
+        the links, nesting past TASK_MAX_DEPTH and completed tasks with
+        incomplete subtasks.
+        """
+        self.flush()
+        row = DB.execute_sql(
+            "SELECT ref, parent_ref FROM import_task WHERE parent_ref IS NOT NULL "
+            "AND parent_ref NOT IN (SELECT ref FROM import_task) LIMIT 1"
+        ).fetchone()
+        if row:
+            raise ValueError(f"Task {row[0]} names an unknown parent task {row[1]}")
+        row = DB.execute_sql(
+            "SELECT task_ref FROM import_comment WHERE task_ref NOT IN (SELECT ref FROM import_task) LIMIT 1"
+        ).fetchone()
+        if row:
+            raise ValueError(f"A comment names an unknown task {row[0]}")
+        # As in the app, a task is completed only once all its subtasks are
+        row = DB.execute_sql(
+            "SELECT p.ref, s.ref FROM import_task s JOIN import_task p ON p.ref = s.parent_ref "
+            "WHERE p.status = 'completed' AND s.status != 'completed' LIMIT 1"
+        ).fetchone()
+        if row:
+            raise ValueError(f"Task {row[0]} is completed but has an incomplete subtask {row[1]}")
+        row = DB.execute_sql(
+            "SELECT predecessor_ref, successor_ref FROM import_dependency "
+            "WHERE predecessor_ref NOT IN (SELECT ref FROM import_task) "
+            "OR successor_ref NOT IN (SELECT ref FROM import_task) "
+            "OR predecessor_ref = successor_ref LIMIT 1"
+        ).fetchone()
+        if row:
+            raise ValueError(f"The link from task {row[0]} to task {row[1]} needs two different, known tasks")
+        self._check_links()
+
+        with DB.atomic():
+            DB.execute_sql("UPDATE import_task SET depth = NULL")
+            cursor = DB.execute_sql("UPDATE import_task SET depth = 0 WHERE parent_ref IS NULL")
+            depth = 0
+            while cursor.rowcount:
+                cursor = DB.execute_sql(
+                    "UPDATE import_task SET depth = ? WHERE depth IS NULL "
+                    "AND parent_ref IN (SELECT ref FROM import_task WHERE depth = ?)",
+                    (depth + 1, depth)
+                )
+                if cursor.rowcount:
+                    depth += 1
+                    if depth > TASK_MAX_DEPTH:
+                        raise ValueError(f"Subtasks cannot be nested more than {TASK_MAX_DEPTH} levels deep")
+        if DB.execute_sql("SELECT 1 FROM import_task WHERE depth IS NULL LIMIT 1").fetchone():
+            raise ValueError("The task hierarchy has a cycle")
+        self.levels = depth + 1 if self.tasks else 0
+
+    def _check_links(self):
+        """Raise ValueError if the staged links form a cycle (Kahn's algorithm over the refs)."""
+        successors, waiting = {}, {}
+        for predecessor, successor in DB.execute_sql(
+            "SELECT predecessor_ref, successor_ref FROM import_dependency"
+        ):
+            successors.setdefault(predecessor, []).append(successor)
+            waiting[successor] = waiting.get(successor, 0) + 1
+            waiting.setdefault(predecessor, 0)
+        ready = [ref for ref, count in waiting.items() if count == 0]
+        done = 0
+        while ready:
+            ref = ready.pop()
+            done += 1
+            for successor in successors.get(ref, ()):
+                waiting[successor] -= 1
+                if waiting[successor] == 0:
+                    ready.append(successor)
+        if done < len(waiting):
+            raise ValueError("The task links have a cycle")
+
+    def date_range(self) -> tuple:
+        """Earliest start date and latest deadline of the staged tasks, as stored."""
+        return tuple(DB.execute_sql("SELECT MIN(start_date), MAX(deadline) FROM import_task").fetchone())
+
+    def write(self, project_id: str, created_by: str, on_progress=None):
+        """Insert the staged tasks, links and comments into a project; call after resolve().
+
+        Each transaction inserts one batch of a level with a single INSERT ...
+        SELECT and logs its tasks' creation (and current status), so every
+        commit leaves a consistent hierarchy. `on_progress(tasks written)` is
+        called after each one.
+        """
+        now = datetime.now()
+        written = 0
+        for depth in range(self.levels):
+            after = 0
+            while True:
+                # Last seq of this batch of the level, or None for its final batch
+                upper = DB.execute_sql(
+                    "SELECT seq FROM import_task WHERE depth = ? AND seq > ? ORDER BY seq LIMIT 1 OFFSET ?",
+                    (depth, after, self.batch_size - 1)
+                ).fetchone()
+                window = "s.depth = ? AND s.seq > ?" + (" AND s.seq <= ?" if upper else "")
+                params = (depth, after) + ((upper[0],) if upper else ())
+                with DB.atomic():
+                    cursor = DB.execute_sql(
+                        "INSERT INTO task (id, name, description, project_id, start_date, deadline, "
+                        "assigned_to_id, created_by_id, status, created_at, updated_at, parent_task_id, "
+                        "progress_weight, progress_done, rank) "
+                        "SELECT s.id, s.name, s.description, ?, s.start_date, s.deadline, s.assigned_to_id, ?, "
+                        "s.status, s.created_at, s.updated_at, p.id, 0, 0, s.rank "
+                        f"FROM import_task s LEFT JOIN import_task p ON p.ref = s.parent_ref WHERE {window} "
+                        "ORDER BY s.seq",
+                        (project_id, created_by) + params
+                    )
+                    written += cursor.rowcount
+                    DB.execute_sql(
+                        "INSERT INTO taskstatustransition (task_id, project_id, from_status, to_status, changed_at) "
+                        f"SELECT s.id, ?, NULL, 'pending', ? FROM import_task s WHERE {window} "
+                        "UNION ALL "
+                        f"SELECT s.id, ?, 'pending', s.status, ? FROM import_task s WHERE {window} "
+                        "AND s.status != 'pending'",
+                        (project_id, now) + params + (project_id, now) + params
+                    )
+                if on_progress:
+                    on_progress(written)
+                if upper is None:
+                    break
+                after = upper[0]
+
+        last = DB.execute_sql("SELECT MAX(seq) FROM import_comment").fetchone()[0] or 0
+        for start in range(0, last, self.batch_size):
+            with DB.atomic():
+                DB.execute_sql(
+                    "INSERT INTO comment (id, task_id, user_id, content, created_at, updated_at) "
+                    "SELECT c.id, t.id, c.user_id, c.content, c.created_at, c.updated_at "
+                    "FROM import_comment c JOIN import_task t ON t.ref = c.task_ref "
+                    "WHERE c.seq > ? AND c.seq <= ? ORDER BY c.seq",
+                    (start, start + self.batch_size)
+                )
+
+        last = DB.execute_sql("SELECT MAX(seq) FROM import_dependency").fetchone()[0] or 0
+        for start in range(0, last, self.batch_size):
+            with DB.atomic():
+                DB.execute_sql(
+                    "INSERT INTO taskdependency (id, project_id, predecessor_id, successor_id, type, lag_days, "
+                    "created_at) "
+                    "SELECT d.id, ?, p.id, s.id, d.type, d.lag_days, ? FROM import_dependency d "
+                    "JOIN import_task p ON p.ref = d.predecessor_ref JOIN import_task s ON s.ref = d.successor_ref "
+                    "WHERE d.seq > ? AND d.seq <= ? ORDER BY d.seq",
+                    (project_id, now, start, start + self.batch_size)
+                )
+        Projects.bump_version(project_id)
+
+
 Users = UsersTable()
 Projects = ProjectsTable()
 Tasks = TasksTable()
+Dependencies = DependenciesTable()
 Comments = CommentsTable()
+StatusHistory = StatusHistoryTable()
+Changes = ChangeLogTable()
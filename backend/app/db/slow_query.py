@@ -0,0 +1,186 @@
+import glob
+import json
+import logging
+import os
+import re
+import sys
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import List, Optional
+
+from app.core.structured_logging import queued, request_id_var
+
+# Columns whose bound values must never reach the log file
+SENSITIVE_COLUMNS = {'password', 'salt', 'token'}
+# Values that look like secrets regardless of the column they are bound to
+SENSITIVE_VALUE_PATTERNS = [
+    re.compile(r'^\$2[aby]\$\d{2}\$'),  # bcrypt hash
+    re.compile(r'^[0-9a-f]{64}$'),      # auth token (secrets.token_hex(32))
+]
+REDACTED = '***'
+
+_TOKEN_RE = re.compile(r'"(\w+)"|\?')
+_INSERT_RE = re.compile(r'^\s*INSERT\s+INTO\s+"\w+"\s*\(([^)]*)\)', re.IGNORECASE)
+_EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+_FULL_SCAN_RE = re.compile(r'^SCAN (\S+)$')
+
+
+class SlowQueryLog:
+    """
+    Records every statement slower than `threshold_ms` as a JSON line in a
+    rotating file, together with its (redacted) parameters, the `*Table`
+    method that issued it and its `EXPLAIN QUERY PLAN`.
+
+    Timing covers `cursor.execute()`, i.e. preparing the statement and
+    stepping to the first row, which is where SQLite pays for scans and sorts.
+    """
+
+    def __init__(self, path: str, threshold_ms: float, max_bytes: int, backup_count: int):
+        self.path = path
+        self.threshold_ms = threshold_ms
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.logger = logging.getLogger(f"app.slow_query.{id(self)}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        # File writes happen on a listener thread, never inside the query
+        self.file_handler = handler
+        self.queue_handler = queued(handler)
+        self.logger.addHandler(self.queue_handler)
+
+    def install(self, db):
+        db.slow_query_hook = self
+
+    def uninstall(self, db):
+        if db.slow_query_hook is self:
+            db.slow_query_hook = None
+        self.logger.removeHandler(self.queue_handler)
+        self.queue_handler.close()
+        self.file_handler.close()
+
+    def __call__(self, db, sql: str, params, elapsed_ms: float):
+        if elapsed_ms < self.threshold_ms:
+            return
+        try:
+            entry = {
+                "ts": datetime.now().isoformat(),
+                "pid": os.getpid(),
+                "request_id": request_id_var.get(),
+                "duration_ms": round(elapsed_ms, 3),
+                "sql": sql,
+                "params": redact_params(sql, params),
+                "caller": find_caller(),
+                "plan": explain(db, sql, params),
+            }
+            self.logger.info(json.dumps(entry, default=str))
+        except Exception:
+            # The slow-query log must never break the query it observes
+            pass
+
+    def _log_files(self) -> List[str]:
+        return [p for p in [self.path] + glob.glob(f"{self.path}.*") if os.path.isfile(p)]
+
+    def read_entries(self):
+        self.queue_handler.drain()
+        for path in self._log_files():
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+    def top_offenders(self, limit: int = 20) -> List[dict]:
+        """Aggregate the log by statement and caller, ordered by total time spent."""
+        stats = {}
+        for entry in self.read_entries():
+            key = (entry.get("sql"), entry.get("caller"))
+            stat = stats.get(key)
+            if stat is None:
+                stat = stats[key] = {
+                    "sql": entry.get("sql"),
+                    "caller": entry.get("caller"),
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "plan": entry.get("plan") or [],
+                    "last_seen": entry.get("ts"),
+                }
+            duration = float(entry.get("duration_ms") or 0)
+            stat["count"] += 1
+            stat["total_ms"] += duration
+            stat["max_ms"] = max(stat["max_ms"], duration)
+            if entry.get("ts") and entry["ts"] > (stat["last_seen"] or ""):
+                stat["last_seen"] = entry["ts"]
+
+        result = sorted(stats.values(), key=lambda s: s["total_ms"], reverse=True)[:limit]
+        for stat in result:
+            stat["total_ms"] = round(stat["total_ms"], 3)
+            stat["avg_ms"] = round(stat["total_ms"] / stat["count"], 3)
+            stat["table_scans"] = sorted({
+                m.group(1) for m in (_FULL_SCAN_RE.match(line) for line in stat["plan"]) if m
+            })
+        return result
+
+
+def redact_params(sql: str, params) -> list:
+    if not params:
+        return []
+    columns = _placeholder_columns(sql, len(params))
+    redacted = []
+    for column, value in zip(columns, params):
+        if column in SENSITIVE_COLUMNS:
+            redacted.append(REDACTED)
+        elif isinstance(value, str) and any(p.match(value) for p in SENSITIVE_VALUE_PATTERNS):
+            redacted.append(REDACTED)
+        else:
+            redacted.append(value)
+    return redacted
+
+
+def _placeholder_columns(sql: str, count: int) -> List[Optional[str]]:
+    """Best-effort mapping of each `?` placeholder to the column it is bound to."""
+    insert = _INSERT_RE.match(sql)
+    if insert:
+        names = [c.strip().strip('"') for c in insert.group(1).split(',')]
+        return [names[i % len(names)] for i in range(count)]
+
+    columns = []
+    last_identifier = None
+    for match in _TOKEN_RE.finditer(sql):
+        if match.group(1):
+            last_identifier = match.group(1)
+        else:
+            columns.append(last_identifier)
+    columns.extend([None] * (count - len(columns)))
+    return columns
+
+
+def find_caller() -> Optional[str]:
+    """Return the first `*Table` method (or failing that, app frame) on the stack."""
+    fallback = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        owner = frame.f_locals.get('self')
+        if owner is not None and type(owner).__name__.endswith('Table'):
+            return f"{type(owner).__name__}.{frame.f_code.co_name}"
+        filename = frame.f_code.co_filename
+        if (fallback is None and f"{os.sep}app{os.sep}" in filename
+                and f"{os.sep}app{os.sep}db{os.sep}" not in filename):
+            fallback = f"{os.path.basename(filename)}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    return fallback
+
+
+def explain(db, sql: str, params) -> List[str]:
+    if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return []
+    # Use a raw cursor so the plan lookup is not itself timed and logged
+    cursor = db.cursor()
+    cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params or ())
+    return [row[-1] for row in cursor.fetchall()]
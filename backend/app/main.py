@@ -17,7 +17,15 @@ from app.api.v1.endpoints.users import UsersEndpoint
 from app.api.v1.endpoints.projects import ProjectsEndpoint
 from app.api.v1.endpoints.tasks import TasksEndpoint
 from app.api.v1.endpoints.gantt import GanttEndpoint
+from app.api.v1.endpoints.dependencies import DependenciesEndpoint
+from app.api.v1.endpoints.scheduling import SchedulingEndpoint
+from app.api.v1.endpoints.analytics import AnalyticsEndpoint
 from app.api.v1.endpoints.comments import CommentsEndpoint
+from app.api.v1.endpoints.sync import SyncEndpoint
+from app.api.v1.endpoints.admin import AdminEndpoint
+from app.services.profiling import ProfilingMiddleware
+from app.services.memory import MemoryProfilingMiddleware
+from app.core.structured_logging import setup_logging, RequestContextMiddleware
 
 
 class SPAStaticFiles(StaticFiles):
@@ -31,6 +39,9 @@ class SPAStaticFiles(StaticFiles):
                 raise ex
 
 
+# Structured logging through a background writer thread
+setup_logging()
+
 # Initialize FastAPI app
 app = FastAPI(title=config.PROJECT_NAME, version=config.PROJECT_VERSION)
 
@@ -42,9 +53,19 @@ app.add_middleware(
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
-    allow_headers=["Authorization", "Content-Type"],
+    allow_headers=["Authorization", "Content-Type", "X-Profile", "If-None-Match"],
+    expose_headers=["X-Profile-Id", "X-Profile-Url", "X-Request-ID", "ETag", "Content-Disposition", "X-Task-Count"],
 )
 
+# On-demand profiling of single requests for admins
+app.add_middleware(ProfilingMiddleware)
+
+# Per-request peak allocation of sampled requests while tracemalloc runs
+app.add_middleware(MemoryProfilingMiddleware)
+
+# Request correlation ids and access log (outermost, so it times everything)
+app.add_middleware(RequestContextMiddleware)
+
 # Add database dependency
 
 
@@ -198,12 +219,30 @@ api_app.include_router(
     tags=["tasks"]
 )
 
+api_app.include_router(
+    DependenciesEndpoint().get_router(),
+    prefix="/dependencies",
+    tags=["dependencies"]
+)
+
 api_app.include_router(
     GanttEndpoint().get_router(),
     prefix="/gantt",
     tags=["gantt"]
 )
 
+api_app.include_router(
+    SchedulingEndpoint().get_router(),
+    prefix="/scheduling",
+    tags=["scheduling"]
+)
+
+api_app.include_router(
+    AnalyticsEndpoint().get_router(),
+    prefix="/analytics",
+    tags=["analytics"]
+)
+
 api_app.include_router(
     CommentsEndpoint().get_router(),
     prefix="/comments",
@@ -211,6 +250,19 @@ api_app.include_router(
     dependencies=[Depends(user_check)]
 )
 
+api_app.include_router(
+    SyncEndpoint().get_router(),
+    prefix="/sync",
+    tags=["sync"]
+)
+
+api_app.include_router(
+    AdminEndpoint().get_router(),
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(admin_user_check)]
+)
+
 app.include_router(api_app)
 
 # If ../build folder exists, serve it as static files
@@ -0,0 +1,20 @@
+from peewee import *
+from .base import BaseModel
+
+
+class ProjectStatusDay(BaseModel):
+    # Transitions into and out of each status per project and day, rolled up from the log
+    project_id = CharField()
+    day = DateField()
+    status = CharField()
+    entered = IntegerField(default=0)
+    exited = IntegerField(default=0)
+
+    class Meta:
+        primary_key = CompositeKey('project_id', 'day', 'status')
+
+
+class RollupWatermark(BaseModel):
+    # Last log row folded into a rollup table
+    name = CharField(primary_key=True)
+    last_id = IntegerField(default=0)
@@ -0,0 +1,13 @@
+from peewee import *
+from datetime import datetime
+from .base import BaseModel
+
+
+class CacheEntry(BaseModel):
+    # "<namespace>:<key>", one row per key holding its latest cached version
+    id = CharField(primary_key=True)
+    namespace = CharField(index=True)
+    version = IntegerField()
+    payload = BlobField()
+    size = IntegerField()
+    stored_at = DateTimeField(default=datetime.now)
@@ -7,7 +7,7 @@ from .task import Task
 
 class Comment(BaseModel):
     id = CharField(primary_key=True)
-    task_id = CharField()
+    task_id = CharField(index=True)
     user_id = CharField()
     content = TextField()
     created_at = DateTimeField(default=datetime.now)
@@ -14,6 +14,8 @@ class Project(BaseModel):
     updated_at = DateTimeField(default=datetime.now)
     status = CharField(default='pending')  # pending, in_progress, completed
     is_active = BooleanField(default=True)
+    # Bumped on every change to the project, its members or its tasks (used for ETags)
+    version = IntegerField(default=0)
 
     def to_dict(self):
         return {
@@ -35,3 +37,34 @@ class ProjectMember(BaseModel):
     user = ForeignKeyField(User, backref='projects')
     role = CharField()  # 'project_manager' or 'project_member'
     created_at = DateTimeField(default=datetime.now)
+
+
+class ProjectImport(BaseModel):
+    # One upload being turned into a project; polled for progress while it runs
+    id = CharField(primary_key=True)
+    user_id = CharField(index=True)
+    format = CharField()  # ndjson, csv or msproject
+    status = CharField(default='queued')  # queued, parsing, writing, completed, failed
+    bytes_total = IntegerField(default=0)
+    bytes_read = IntegerField(default=0)
+    tasks_total = IntegerField(default=0)
+    tasks_written = IntegerField(default=0)
+    project_id = CharField(null=True)
+    error = TextField(null=True)
+    created_at = DateTimeField(default=datetime.now)
+    updated_at = DateTimeField(default=datetime.now)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "format": self.format,
+            "status": self.status,
+            "bytes_total": self.bytes_total,
+            "bytes_read": self.bytes_read,
+            "tasks_total": self.tasks_total,
+            "tasks_written": self.tasks_written,
+            "project_id": self.project_id,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
@@ -0,0 +1,32 @@
+from peewee import *
+from playhouse.sqlite_ext import AutoIncrementField
+from datetime import datetime
+from .base import BaseModel
+
+
+class ChangeLog(BaseModel):
+    # Latest change of every synced row, maintained by triggers. Each write
+    # replaces the row's entry under a new seq; AUTOINCREMENT never reuses one
+    seq = AutoIncrementField()
+    entity = CharField()  # project, task, member or comment
+    entity_id = CharField()
+    project_id = CharField(null=True)
+    user_id = CharField(null=True)  # the member's user, for member rows
+    deleted = BooleanField(default=False)
+    changed_at = DateTimeField(default=datetime.now)
+
+    class Meta:
+        indexes = (
+            (('entity', 'entity_id'), True),
+            (('project_id', 'seq'), False),
+            (('user_id', 'seq'), False),
+            (('deleted', 'changed_at'), False),
+        )
+
+
+class EventStream(BaseModel):
+    # One row per open change-event stream, in any worker; the per-user cap counts these.
+    # Workers refresh seen_at for their streams, so a crashed worker's rows go stale
+    id = CharField(primary_key=True)
+    user_id = CharField(index=True)
+    seen_at = DateTimeField(default=datetime.now)
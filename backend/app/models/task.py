@@ -19,10 +19,36 @@ class Task(BaseModel):
     updated_at = DateTimeField(default=datetime.now)
     # Reference to parent task if this is a subtask
     parent_task_id = ForeignKeyField('self', null=True, backref='subtasks')
+    # Duration-weighted progress of the leaf tasks in this subtree (itself if it
+    # has no subtasks): total days and days done. Maintained by triggers only
+    progress_weight = FloatField(default=0)
+    progress_done = FloatField(default=0)
+    # Manual order within the project (see app.services.ranking); '' until ranked
+    rank = CharField(default='')
+
+    class Meta:
+        indexes = (
+            # "My work" lists, read in due-date order per user
+            (('assigned_to_id', 'deadline', 'id'), False),
+            (('created_by_id', 'deadline', 'id'), False),
+            # Task lists and board columns, read in manual order
+            (('project_id', 'rank'), False),
+            (('project_id', 'status', 'rank', 'id'), False),
+        )
 
     def get_subtasks(self):
         return self.subtasks  # Use the backref created by ForeignKeyField
 
+    @property
+    def progress(self) -> float:
+        return self.progress_of(self.progress_weight, self.progress_done)
+
+    @staticmethod
+    def progress_of(weight: float, done: float) -> float:
+        if not weight:
+            return 0.0
+        return round(min(max(done / weight, 0.0), 1.0), 4)
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -36,5 +62,59 @@ class Task(BaseModel):
             "status": self.status,
             "created_at": self.created_at,
             "updated_at": self.updated_at,
-            "parent_task_id": self.parent_task_id.id if self.parent_task_id else None
+            "parent_task_id": self.parent_task_id_id,
+            "progress": self.progress,
+            "rank": self.rank
         }
+
+
+class TaskClosure(BaseModel):
+    # Every (ancestor, descendant) pair of the task hierarchy, each task paired
+    # with itself at depth 0; maintained by triggers on the task table
+    ancestor = CharField()
+    descendant = CharField(index=True)
+    depth = IntegerField()
+
+    class Meta:
+        primary_key = CompositeKey('ancestor', 'descendant')
+
+
+class TaskDependency(BaseModel):
+    id = CharField(primary_key=True)
+    project_id = CharField(index=True)
+    predecessor = ForeignKeyField(Task, backref='successor_links', on_delete='CASCADE')
+    successor = ForeignKeyField(Task, backref='predecessor_links', on_delete='CASCADE')
+    type = CharField(default='FS')  # FS, SS, FF, SF
+    lag_days = FloatField(default=0)
+    created_at = DateTimeField(default=datetime.now)
+
+    class Meta:
+        indexes = (
+            (('predecessor', 'successor'), True),
+        )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "project_id": self.project_id,
+            "predecessor_id": self.predecessor_id,
+            "successor_id": self.successor_id,
+            "type": self.type,
+            "lag_days": self.lag_days,
+            "created_at": self.created_at
+        }
+
+
+class TaskStatusTransition(BaseModel):
+    # Append-only; rows outlive their task, so task_id is not a foreign key
+    id = AutoField()
+    task_id = CharField(index=True)
+    project_id = CharField()
+    from_status = CharField(null=True)  # None: created, or moved in from another project
+    to_status = CharField(null=True)  # None: deleted, or moved out to another project
+    changed_at = DateTimeField(default=datetime.now)
+
+    class Meta:
+        indexes = (
+            (('project_id', 'changed_at'), False),
+        )
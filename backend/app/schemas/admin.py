@@ -0,0 +1,57 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class SlowQueryStat(BaseModel):
+    sql: str
+    caller: Optional[str] = None
+    count: int
+    total_ms: float
+    avg_ms: float
+    max_ms: float
+    plan: List[str] = []
+    table_scans: List[str] = []
+    last_seen: Optional[str] = None
+
+
+class RequestProfile(BaseModel):
+    id: str
+    method: str
+    path: str
+    query: str = ""
+    duration_ms: float
+    samples: int
+    created_at: str
+
+
+class MemorySnapshot(BaseModel):
+    id: str
+    pid: int
+    created_at: str
+    traced_bytes: int
+
+
+class MemoryStatus(BaseModel):
+    pid: int
+    tracing: bool
+    frames: int
+    current_bytes: int
+    peak_bytes: int
+    overhead_bytes: int
+    snapshots: List[MemorySnapshot] = []
+
+
+class MemoryStat(BaseModel):
+    location: List[str]
+    size_bytes: int
+    size_diff_bytes: int
+    count: int
+    count_diff: int
+
+
+class RequestMemoryStat(BaseModel):
+    route: str
+    count: int
+    max_peak_bytes: int
+    avg_peak_bytes: int
+    avg_retained_bytes: int
@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+from datetime import date
+from typing import Dict, List, Optional
+
+
+class DurationStats(BaseModel):
+    # In days, over tasks completed in the window
+    count: int
+    mean: Optional[float]
+    p50: Optional[float]
+    p85: Optional[float]
+    p95: Optional[float]
+    histogram: List[int]  # tasks per whole day; the last bucket also holds everything longer
+
+
+class WeeklyThroughput(BaseModel):
+    week_start: date  # Monday
+    completed: int
+
+
+class ProjectAnalytics(BaseModel):
+    project_id: str
+    days: List[date]
+    # Tasks in each status at the end of each day, aligned with `days`
+    cumulative_flow: Dict[str, List[int]]
+    remaining: List[int]  # burndown: tasks not completed
+    scope: List[int]  # all tasks in the project
+    throughput: List[WeeklyThroughput]
+    cycle_time: DurationStats  # first in progress to completed
+    lead_time: DurationStats  # created to completed
@@ -45,3 +45,31 @@ class Project(ProjectBase):
 
     class Config:
         from_attributes = True
+
+
+class BoardColumn(BaseModel):
+    status: str
+    total: int  # cards in the whole column, not just this page
+    cards: List[Task]
+    # Pass back with `status` as `cursor` for the column's next page
+    next_cursor: Optional[str] = None
+
+
+class ProjectBoard(BaseModel):
+    project_id: str
+    columns: List[BoardColumn]
+
+
+class ProjectImport(BaseModel):
+    id: str
+    format: Literal['ndjson', 'csv', 'msproject']
+    status: Literal['queued', 'parsing', 'writing', 'completed', 'failed']
+    # Upload read so far while parsing, then tasks written while writing
+    bytes_total: int
+    bytes_read: int
+    tasks_total: int
+    tasks_written: int
+    project_id: Optional[str] = None  # set once the import completed
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
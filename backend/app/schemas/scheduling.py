@@ -0,0 +1,55 @@
+from pydantic import BaseModel
+from datetime import date, datetime
+from typing import Dict, List, Literal, Optional
+
+
+class Overload(BaseModel):
+    user_id: str
+    start: date
+    end: date  # exclusive
+    peak: float  # most tasks on one day in the range
+
+
+class WorkloadReport(BaseModel):
+    capacity: float
+    overloaded_days: int  # person-days above capacity
+    overloads: List[Overload]
+
+
+class ScheduleChange(BaseModel):
+    task_id: str
+    project_id: str
+    assigned_to_id: str
+    start_date: datetime
+    deadline: datetime
+    new_start_date: datetime
+    new_deadline: datetime
+    shift_days: int
+
+
+class LevellingProposal(BaseModel):
+    capacity: float
+    changes: List[ScheduleChange]
+    unresolved_task_ids: List[str]  # still over-allocated or would pass the project deadline
+    overloaded_days_before: int
+    overloaded_days_after: int
+    # Project versions the proposal was computed from; applying fails if any moved on
+    base_versions: Dict[str, int]
+
+
+class ForecastPercentile(BaseModel):
+    percentile: int
+    finish: datetime
+
+
+class ProjectForecast(BaseModel):
+    project_id: str
+    deadline: datetime
+    computed_at: datetime
+    iterations: int
+    tasks: int  # open leaf tasks simulated
+    history_size: int  # completed tasks the overrun ratios were drawn from
+    history_scope: Literal["project", "all"]
+    planned_finish: Optional[datetime]  # finish if every task takes exactly as planned
+    on_time_probability: Optional[float]
+    percentiles: List[ForecastPercentile]
@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from typing import List, Literal
+from .project import Project, ProjectMember
+from .task import Task
+from .comment import Comment
+
+
+class Tombstone(BaseModel):
+    entity: Literal['project', 'task', 'member', 'comment']
+    id: str
+
+
+class SyncChanges(BaseModel):
+    # Current state of every row changed since the cursor (projects come
+    # without tasks or members; those are listed on their own)
+    projects: List[Project] = []
+    tasks: List[Task] = []
+    members: List[ProjectMember] = []
+    comments: List[Comment] = []
+    deleted: List[Tombstone] = []
+    # Pass back as `since`; always set, also when nothing changed
+    next_cursor: str
+    has_more: bool = False
+    # The cursor is older than the kept tombstones: drop local data, this is a full sync
+    reset: bool = False
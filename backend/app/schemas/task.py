@@ -1,6 +1,6 @@
 from pydantic import BaseModel, constr
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List, Literal
 
 
 class TaskBase(BaseModel):
@@ -35,4 +35,72 @@ class Task(TaskBase):
     created_at: datetime
     updated_at: datetime
     parent_task_id: Optional[str]
+    # Share of the subtree's leaf-task days done (in progress counts half)
+    progress: float = 0.0
+    # Manual order key: tasks of a project sort by it (ties by id)
+    rank: str = ""
     subtasks: List['Task'] = []
+
+
+class TaskMove(BaseModel):
+    # Place the task directly after or before another task of its project
+    # (at most one of the two); with neither it goes last
+    after_id: Optional[str] = None
+    before_id: Optional[str] = None
+    # Optionally drop it into another board column at the same time
+    status: Optional[str] = None
+
+
+class MyTask(Task):
+    project_name: str
+
+
+class MyTasksPage(BaseModel):
+    items: List[MyTask]
+    # Pass back as `cursor` for the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+
+class TaskUpdateResult(Task):
+    # Successors moved by a cascading date change, in schedule order
+    shifted_task_ids: List[str] = []
+
+
+class BatchTaskCreate(TaskCreate):
+    # Client-side temporary id; other operations of the batch may use it as parent_task_id
+    ref: Optional[str] = None
+
+
+class BatchTaskUpdate(TaskUpdate):
+    id: str
+
+
+class TaskBatch(BaseModel):
+    # Applied in this order: creates, then updates, then deletes (with their subtasks)
+    create: List[BatchTaskCreate] = []
+    update: List[BatchTaskUpdate] = []
+    delete: List[str] = []
+
+
+class TaskBatchResult(BaseModel):
+    created: List[Task]
+    ids: Dict[str, str]  # temporary id -> id of the created task
+    updated: List[Task]
+    deleted: List[str]  # every task removed, subtasks included
+
+
+DependencyType = Literal['FS', 'SS', 'FF', 'SF']
+
+
+class TaskDependencyCreate(BaseModel):
+    predecessor_id: str
+    successor_id: str
+    # FS: finish-to-start, SS: start-to-start, FF: finish-to-finish, SF: start-to-finish
+    type: DependencyType = 'FS'
+    lag_days: float = 0
+
+
+class TaskDependency(TaskDependencyCreate):
+    id: str
+    project_id: str
+    created_at: datetime
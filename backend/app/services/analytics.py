@@ -0,0 +1,104 @@
+"""
+Flow analytics over the task status log.
+
+Daily buckets (transitions into and out of each status, per day) are turned
+into a days x statuses matrix with one scatter-add; a cumulative sum down the
+days then gives how many tasks sat in each status at the end of every day,
+from which burndown and cumulative flow are read off. Cycle and lead times are
+percentiles over arrays of per-task durations.
+"""
+import math
+from datetime import date, timedelta
+from typing import Dict, List
+
+import numpy as np
+
+from app.services.scheduling import UNIX_EPOCH_JULIAN_DAY
+
+STATUS_ORDER = ("pending", "in_progress", "completed")
+DONE = "completed"
+# Durations of this many days or more share the histogram's last bucket
+HISTOGRAM_DAYS = 60
+DURATION_PERCENTILES = (50, 85, 95)
+
+
+def to_date(julian_day: float) -> date:
+    """Date of an SQLite julianday() value, which is at midnight for a date."""
+    return date(1970, 1, 1) + timedelta(days=math.floor(julian_day - UNIX_EPOCH_JULIAN_DAY))
+
+
+def to_julian_day(value: date) -> float:
+    return (value - date(1970, 1, 1)).days + UNIX_EPOCH_JULIAN_DAY
+
+
+def status_flow(buckets: List[tuple], first: date, last: date) -> dict:
+    """Tasks per status at the end of each day from `first` to `last`.
+
+    `buckets`: (julian day at midnight, status, entered, exited). Buckets
+    before `first` still count, as the opening balance. Returns the days,
+    the statuses in display order and the days x statuses count matrix.
+    """
+    statuses = [s for s in STATUS_ORDER if any(b[1] == s for b in buckets)]
+    statuses += sorted({b[1] for b in buckets} - set(statuses))
+    days = (last - first).days + 1
+    if not buckets or days <= 0:
+        return {"days": [], "statuses": statuses, "counts": np.zeros((0, len(statuses)), dtype=np.int64)}
+
+    column = {status: i for i, status in enumerate(statuses)}
+    day = np.array([b[0] for b in buckets], dtype=np.float64)
+    index = np.round(day - to_julian_day(first)).astype(np.int64)
+    delta = np.array([b[2] - b[3] for b in buckets], dtype=np.int64)
+    status = np.array([column[b[1]] for b in buckets], dtype=np.int64)
+
+    # Row 0 collects everything up to `first`; later buckets are dropped
+    keep = index < days
+    counts = np.zeros((days, len(statuses)), dtype=np.int64)
+    np.add.at(counts, (np.maximum(index[keep], 0), status[keep]), delta[keep])
+    np.cumsum(counts, axis=0, out=counts)
+    return {
+        "days": [first + timedelta(days=i) for i in range(days)],
+        "statuses": statuses,
+        "counts": counts,
+    }
+
+
+def weekly_completions(buckets: List[tuple], first: date, last: date) -> List[tuple]:
+    """(Monday, tasks completed that week) for each week touching [first, last]."""
+    monday = first - timedelta(days=first.weekday())
+    weeks = (last - monday).days // 7 + 1
+    if weeks <= 0:
+        return []
+    done = [b for b in buckets if b[1] == DONE and b[2]]
+    index = np.array([round(b[0] - to_julian_day(monday)) for b in done], dtype=np.int64) // 7
+    entered = np.array([b[2] for b in done], dtype=np.int64)
+    keep = (index >= 0) & (index < weeks)
+    totals = np.bincount(index[keep], weights=entered[keep], minlength=weeks)
+    return [(monday + timedelta(weeks=i), int(total)) for i, total in enumerate(totals)]
+
+
+def duration_stats(durations: np.ndarray) -> dict:
+    """Count, mean, percentiles and a whole-day histogram of durations in days (NaN skipped)."""
+    values = durations[~np.isnan(durations)]
+    values = values[values >= 0]
+    if not values.size:
+        return {"count": 0, "mean": None, "histogram": [], **{f"p{p}": None for p in DURATION_PERCENTILES}}
+    whole_days = np.minimum(np.floor(values).astype(np.int64), HISTOGRAM_DAYS)
+    return {
+        "count": int(values.size),
+        "mean": round(float(values.mean()), 4),
+        "histogram": np.bincount(whole_days).tolist(),
+        **{
+            f"p{p}": round(float(v), 4)
+            for p, v in zip(DURATION_PERCENTILES, np.percentile(values, DURATION_PERCENTILES))
+        },
+    }
+
+
+def completion_durations(completions: List[tuple]) -> Dict[str, np.ndarray]:
+    """Cycle (first started to completed) and lead (created to completed) times in days.
+
+    NaN where the log has no start (never in progress) or no creation row.
+    """
+    rows = np.array(completions, dtype=np.float64).reshape(-1, 3)  # None becomes NaN
+    created, started, done = rows[:, 0], rows[:, 1], rows[:, 2]
+    return {"cycle": done - started, "lead": done - created}
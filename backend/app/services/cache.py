@@ -0,0 +1,165 @@
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from peewee import DatabaseError
+
+from app.core import config
+from app.db.database import DB, get_db
+from app.models.cache import CacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+class VersionedCache:
+    """Cache of serialised payloads keyed by (key, version).
+
+    Entries are only ever returned for the exact version they were built from,
+    so writes invalidate them simply by bumping the version. Two tiers:
+
+    * a per-process LRU bounded by `max_bytes`;
+    * a table in the application database shared by every worker, bounded by
+      `shared_max_bytes` (0 disables it) and trimmed oldest-stored first.
+    """
+
+    def __init__(self, namespace: str, max_bytes: int, shared_max_bytes: int = 0):
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self.shared_max_bytes = shared_max_bytes
+        self._entries = OrderedDict()  # key -> (version, payload)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if shared_max_bytes:
+            with get_db():
+                DB.create_tables([CacheEntry])
+
+    def get(self, key: str, version: int) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        payload = self._get_shared(key, version)
+        if payload is not None:
+            self.shared_hits += 1
+            self._store_local(key, version, payload)
+            return payload
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, version: int, payload: bytes):
+        self._store_local(key, version, payload)
+        self._put_shared(key, version, payload)
+
+    def invalidate(self, key: str):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= len(entry[1])
+        if self.shared_max_bytes:
+            try:
+                CacheEntry.delete().where(CacheEntry.id == self._shared_id(key)).execute()
+            except DatabaseError:
+                logger.warning("Shared cache delete failed", extra={"cache": self.namespace}, exc_info=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+        if self.shared_max_bytes:
+            try:
+                CacheEntry.delete().where(CacheEntry.namespace == self.namespace).execute()
+            except DatabaseError:
+                logger.warning("Shared cache clear failed", extra={"cache": self.namespace}, exc_info=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "namespace": self.namespace,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _store_local(self, key: str, version: int, payload: bytes):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous[1])
+            self._entries[key] = (version, payload)
+            self._size += len(payload)
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def _shared_id(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _get_shared(self, key: str, version: int) -> Optional[bytes]:
+        if not self.shared_max_bytes:
+            return None
+        try:
+            row = (
+                CacheEntry.select(CacheEntry.payload)
+                .where((CacheEntry.id == self._shared_id(key)) & (CacheEntry.version == version))
+                .tuples()
+                .first()
+            )
+        except DatabaseError:
+            logger.warning("Shared cache read failed", extra={"cache": self.namespace}, exc_info=True)
+            return None
+        return bytes(row[0]) if row else None
+
+    def _put_shared(self, key: str, version: int, payload: bytes):
+        if not self.shared_max_bytes or len(payload) > self.shared_max_bytes:
+            return
+        try:
+            with DB.atomic():
+                CacheEntry.replace(
+                    id=self._shared_id(key),
+                    namespace=self.namespace,
+                    version=version,
+                    payload=payload,
+                    size=len(payload),
+                    stored_at=datetime.now(),
+                ).execute()
+                # Drop the oldest entries once the namespace exceeds its budget
+                DB.execute_sql(
+                    "DELETE FROM cacheentry WHERE id IN ("
+                    " SELECT id FROM ("
+                    "  SELECT id, SUM(size) OVER (ORDER BY stored_at DESC, id) AS running"
+                    "  FROM cacheentry WHERE namespace = ?"
+                    " ) WHERE running > ?)",
+                    (self.namespace, self.shared_max_bytes),
+                )
+        except DatabaseError:
+            logger.warning("Shared cache write failed", extra={"cache": self.namespace}, exc_info=True)
+
+
+GanttCache = VersionedCache(
+    "gantt",
+    max_bytes=config.GANTT_CACHE_MAX_BYTES,
+    shared_max_bytes=config.GANTT_CACHE_SHARED_MAX_BYTES,
+)
+
+ForecastCache = VersionedCache(
+    "forecast",
+    max_bytes=config.FORECAST_CACHE_MAX_BYTES,
+    shared_max_bytes=config.FORECAST_CACHE_SHARED_MAX_BYTES,
+)
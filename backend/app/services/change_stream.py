@@ -0,0 +1,168 @@
+"""
+Change events pushed to open clients as server-sent events.
+
+The change log the triggers keep for delta sync doubles as the message bus:
+each worker runs one poller that reads the entries added since its last look
+and fans them out to its own subscribers. A write made through any worker
+reaches the streams held by every worker, and the database sees one small
+indexed query per worker and interval, however many clients are connected.
+
+Events only say what changed (entity, id, project); clients fetch the rows
+with `/sync`, passing the last event id as the cursor. Open streams are
+registered in the database too, so the per-user cap holds across workers.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Iterable, Optional, Set
+
+from app.core import config
+from app.core.endpoints.cursor import encode_cursor
+from app.db.relational import Changes
+
+logger = logging.getLogger(__name__)
+
+
+def format_event(event: str, data: dict, seq: Optional[int] = None) -> str:
+    """One server-sent event; its id is a `/sync` cursor."""
+    lines = [f"id: {encode_cursor((str(seq),))}"] if seq is not None else []
+    lines += [f"event: {event}", f"data: {json.dumps(data, separators=(',', ':'))}"]
+    return "\n".join(lines) + "\n\n"
+
+
+RESYNC = format_event("resync", {})
+
+
+class Subscriber:
+    """One open stream: the projects it follows and its bounded event queue."""
+
+    def __init__(self, user_id: str, is_admin: bool, project_ids: Iterable[str],
+                 project_id: Optional[str], queue_size: int, start_seq: int, stream_id: str = ""):
+        self.stream_id = stream_id
+        self.user_id = user_id
+        self.is_admin = is_admin
+        self.project_ids: Set[str] = set(project_ids)
+        self.project_id = project_id  # only this project, if set
+        self.start_seq = start_seq
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(queue_size, 1))
+        self.overflowed = False
+        self.dropped = 0
+
+    def offer(self, event: str):
+        if self.overflowed:
+            self.dropped += 1
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too slow to keep up: drop the backlog, the client catches up through /sync
+            self.dropped += self.queue.qsize() + 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            self.overflowed = True
+
+    async def next_event(self, timeout: float) -> Optional[str]:
+        """The next event, or None if none came within `timeout` seconds."""
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if event is RESYNC:
+            self.overflowed = False
+        return event
+
+    def route(self, seq: int, entity: str, entity_id: str, project_id: Optional[str],
+              user_id: Optional[str], deleted: bool, encoded: str):
+        """Queue a log entry if this stream follows its project."""
+        if entity == "member" and user_id == self.user_id and not self.is_admin:
+            # The user's own membership decides which projects the stream follows
+            if deleted:
+                if project_id in self.project_ids:
+                    self.project_ids.discard(project_id)
+                    if self.project_id in (None, project_id):
+                        self.offer(format_event(
+                            "change", {"entity": "project", "id": project_id,
+                                       "project_id": project_id, "deleted": True}, seq
+                        ))
+                return
+            self.project_ids.add(project_id)
+        if self.project_id is not None and project_id != self.project_id:
+            return
+        if self.is_admin or project_id in self.project_ids:
+            self.offer(encoded)
+
+
+class ChangeStream:
+    """Per-worker fan-out of change log entries to the open streams."""
+
+    def __init__(self, poll_interval: float, queue_size: int, batch_size: int = 1000, touch_interval: float = 15.0):
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        # Streams not refreshed for three intervals were left by a worker that died
+        self.touch_interval = touch_interval
+        self.subscribers: Set[Subscriber] = set()
+        self.last_seq = 0
+        self._poller: Optional[asyncio.Task] = None
+        self._next_touch = 0.0
+
+    def connections(self, user_id: str) -> int:
+        """Streams the user has open, in every worker."""
+        return Changes.count_streams(user_id)
+
+    def subscribe(self, user_id: str, is_admin: bool, project_ids: Iterable[str],
+                  project_id: Optional[str] = None, max_per_user: Optional[int] = None) -> Optional[Subscriber]:
+        """A new stream for the user, or None if they already hold `max_per_user` across all workers."""
+        stream_id = Changes.open_stream(user_id, max_per_user, 3 * self.touch_interval)
+        if stream_id is None:
+            return None
+        if self._poller is None or self._poller.done():
+            self.last_seq = Changes.last_seq()
+            self._next_touch = time.monotonic() + self.touch_interval
+            self._poller = asyncio.get_running_loop().create_task(self._run())
+        subscriber = Subscriber(
+            user_id, is_admin, project_ids, project_id, self.queue_size, self.last_seq, stream_id
+        )
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        if subscriber in self.subscribers:
+            self.subscribers.discard(subscriber)
+            Changes.close_stream(subscriber.stream_id)
+
+    def poll(self) -> int:
+        """Fan out the log entries written since the last poll; returns how many."""
+        total = 0
+        while True:
+            rows = Changes.get_events(self.last_seq, self.batch_size)
+            for seq, entity, entity_id, project_id, user_id, deleted in rows:
+                # Encoded once, shared by every stream that gets it
+                encoded = format_event("change", {
+                    "entity": entity, "id": entity_id, "project_id": project_id, "deleted": bool(deleted)
+                }, seq)
+                for subscriber in list(self.subscribers):
+                    subscriber.route(seq, entity, entity_id, project_id, user_id, bool(deleted), encoded)
+                self.last_seq = seq
+            total += len(rows)
+            if len(rows) < self.batch_size:
+                return total
+
+    async def _run(self):
+        # Stops with the last stream; the next subscriber starts it again
+        while self.subscribers:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                self.poll()
+                if time.monotonic() >= self._next_touch:
+                    self._next_touch = time.monotonic() + self.touch_interval
+                    Changes.touch_streams([s.stream_id for s in self.subscribers])
+            except Exception:
+                logger.exception("Change stream poll failed")
+
+
+ChangeEvents = ChangeStream(
+    config.SYNC_STREAM_POLL_INTERVAL, config.SYNC_STREAM_QUEUE_SIZE, touch_interval=config.SYNC_STREAM_HEARTBEAT
+)
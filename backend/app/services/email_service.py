@@ -79,6 +79,36 @@ class EmailService:
         """
         return EmailService.send_email(user_emails, subject, html_content)
 
+    @staticmethod
+    def notify_tasks_assigned(user_email: str, task_names: List[str], project_name: str, project_url: str):
+        """Send one notification for several tasks assigned to a user at once"""
+        safe_project = escape(project_name)
+        safe_url = escape(project_url)
+        items = "".join(f"<li>{escape(name)}</li>" for name in task_names)
+        subject = f"{len(task_names)} nuevas tareas asignadas en {safe_project}"
+        html_content = f"""
+        <h2>Notificación de Asignación de Tareas</h2>
+        <p>Se te han asignado nuevas tareas en el proyecto {safe_project}:</p>
+        <ul>{items}</ul>
+        <p>Haz clic <a href="{safe_url}">aquí</a> para ver el proyecto.</p>
+        """
+        return EmailService.send_email([user_email], subject, html_content)
+
+    @staticmethod
+    def notify_tasks_completed(user_emails: List[str], task_names: List[str], project_name: str, completed_by: str):
+        """Send one notification for several tasks marked as completed at once"""
+        safe_project = escape(project_name)
+        safe_completed_by = escape(completed_by)
+        items = "".join(f"<li>{escape(name)}</li>" for name in task_names)
+        subject = f"{len(task_names)} tareas completadas en {safe_project}"
+        html_content = f"""
+        <h2>Notificación de Tareas Completadas</h2>
+        <p>Estas tareas del proyecto {safe_project} han sido marcadas como completadas:</p>
+        <ul>{items}</ul>
+        <p>Completadas por: {safe_completed_by}</p>
+        """
+        return EmailService.send_email(user_emails, subject, html_content)
+
     @staticmethod
     def notify_project_completed(user_emails: List[str], project_name: str):
         """Send notification when project is marked as completed"""
@@ -0,0 +1,208 @@
+"""
+Monte Carlo completion forecasts.
+
+Each open task's planned duration is scaled by an overrun ratio drawn from
+history (actual / planned duration of completed tasks), and the project
+finish is the latest simulated task finish once dependency links are honoured.
+Iterations are columns of a matrix walked one dependency level at a time, so
+a run is a handful of numpy operations per level and batch rather than a
+Python loop per iteration. Only the rows later levels still link to are
+kept, so a batch is bounded by the widest level and the links open across
+it, not by the number of tasks: a deep chain runs in a single batch.
+
+Entry points take and return plain picklable data so they can run in a worker
+process (see `app.services.workers`).
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.services.scheduling import ScheduleEdge, topological_order
+
+# Matrix elements per batch, about 8 MB per float32 array
+BATCH_ELEMENTS = 2_000_000
+PERCENTILES = (50, 80, 90, 95)
+# Overrun ratios outside this range are clamped; a task closed months late
+# is usually bookkeeping, not a tenfold overrun
+MIN_RATIO, MAX_RATIO = 0.1, 10.0
+
+
+def _levels(ids: List[str], edges: List[tuple]) -> np.ndarray:
+    """Dependency depth of each task; tasks of one level never depend on each other."""
+    position = {task_id: i for i, task_id in enumerate(ids)}
+    depth = np.zeros(len(ids), dtype=np.int64)
+    incoming: Dict[int, List[int]] = {}
+    for predecessor, successor, _, _ in edges:
+        incoming.setdefault(position[successor], []).append(position[predecessor])
+    schedule_edges = [ScheduleEdge(p, s) for p, s, _, _ in edges]
+    for task_id in topological_order(ids, schedule_edges):
+        i = position[task_id]
+        for p in incoming.get(i, ()):
+            depth[i] = max(depth[i], depth[p] + 1)
+    return depth
+
+
+def simulate(
+    tasks: List[dict],
+    edges: List[tuple],
+    ratios: List[float],
+    now: float,
+    iterations: int,
+    seed: int,
+    percentiles=PERCENTILES,
+    deadline: Optional[float] = None
+) -> dict:
+    """Simulate the finish of a set of open tasks.
+
+    `tasks` items: id, start, end (julian days) and started (already in
+    progress). Pending tasks never start before `now`, and no task finishes
+    before it. `edges`: (predecessor id, successor id, type, lag days) between
+    those tasks. `ratios`: overrun samples, actual / planned duration. Returns
+    the finish percentiles (julian days), the finish with no overrun at all,
+    and the share of iterations that finish by `deadline`.
+    """
+    if not tasks:
+        return {"percentiles": {}, "planned_finish": None, "on_time_probability": None}
+
+    ids = [t["id"] for t in tasks]
+    # Days from now, small enough for float32 to keep sub-minute precision
+    planned_start = np.array([t["start"] for t in tasks], dtype=np.float64) - now
+    planned = np.maximum(np.array([t["end"] for t in tasks], dtype=np.float64) - now - planned_start, 0.0)
+    # A task already under way keeps its real start; the rest cannot start in the past
+    started = np.array([bool(t.get("started")) for t in tasks])
+    start = np.where(started, planned_start, np.maximum(planned_start, 0.0)).astype(np.float32)
+    planned = planned.astype(np.float32)
+    samples = np.clip(np.asarray(ratios if len(ratios) else [1.0], dtype=np.float32), MIN_RATIO, MAX_RATIO)
+
+    position = {task_id: i for i, task_id in enumerate(ids)}
+    edges = [e for e in edges if e[0] in position and e[1] in position]
+    plan, slots = _level_plan(ids, edges, position)
+
+    rng = np.random.default_rng(seed)
+    width = max(slots, max(max(level["rows"].size, level["anchor"].size) for level in plan))
+    batch = max(1, min(iterations, BATCH_ELEMENTS // width))
+    finishes = np.empty(iterations, dtype=np.float32)
+    done = 0
+    while done < iterations:
+        size = min(batch, iterations - done)
+
+        def draw(rows, size=size):
+            return planned[rows, None] * samples[rng.integers(0, samples.size, size=(rows.size, size))]
+
+        finishes[done:done + size] = _finish(start, draw, size, plan, slots)
+        done += size
+
+    planned_finish = now + float(_finish(start, lambda rows: planned[rows, None], 1, plan, slots)[0])
+    return {
+        "percentiles": {
+            p: now + float(v) for p, v in zip(percentiles, np.percentile(finishes, percentiles))
+        },
+        "planned_finish": planned_finish,
+        "on_time_probability": None if deadline is None else float((finishes <= deadline - now).mean()),
+    }
+
+
+def _level_plan(ids: List[str], edges: List[tuple], position: Dict[str, int]) -> tuple:
+    """Per dependency level: its task rows, the state slots they take and their incoming links.
+
+    A task's begin and end are held in a slot from its level until the last
+    level that links to it, then the slot is reused. Returns the levels and
+    the number of slots needed.
+    """
+    n = len(ids)
+    depth = _levels(ids, edges) if edges else np.zeros(n, dtype=np.int64)
+    predecessor = np.array([position[e[0]] for e in edges], dtype=np.int64)
+    successor = np.array([position[e[1]] for e in edges], dtype=np.int64)
+    kind = np.array([e[2] for e in edges])
+    lag = np.array([e[3] for e in edges], dtype=np.float32)
+    anchored_on_start = np.isin(kind, ("SS", "SF"))
+    to_finish = np.isin(kind, ("FF", "SF"))
+
+    # Level after which each task's row is no longer linked to
+    last_use = depth.copy()
+    np.maximum.at(last_use, predecessor, depth[successor])
+    levels = int(depth.max()) + 1
+
+    def by_level(level_of: np.ndarray) -> List[np.ndarray]:
+        bounds = np.cumsum(np.bincount(level_of, minlength=levels))[:-1]
+        return np.split(np.argsort(level_of, kind="stable"), bounds)
+
+    rows_by_level = by_level(depth)
+    edges_by_level = by_level(depth[successor])
+    released = {}
+    for task in np.nonzero(last_use > depth)[0]:
+        released.setdefault(int(last_use[task]), []).append(task)
+
+    slot = np.empty(n, dtype=np.int64)
+    local = np.empty(n, dtype=np.int64)  # row of each task within its level
+    free: List[int] = []
+    slots = 0
+    plan = []
+    for level, rows in enumerate(rows_by_level):
+        # Tasks nothing later links to need no slot at all
+        kept = last_use[rows] > level
+        for task in rows[kept]:
+            if free:
+                slot[task] = free.pop()
+            else:
+                slot[task] = slots
+                slots += 1
+        local[rows] = np.arange(rows.size)
+        links = edges_by_level[level]
+        links = links[np.argsort(successor[links], kind="stable")]
+        succ = local[successor[links]]
+        finish_links = np.nonzero(to_finish[links])[0]
+        targets, first, counts = np.unique(succ, return_index=True, return_counts=True)
+        # The k-th link of every successor with more than k links, to take maxima round by round
+        # (much faster than maximum.reduceat along the iteration rows)
+        rounds = [(np.nonzero(counts > k)[0], first[counts > k] + k) for k in range(1, int(counts.max(initial=1)))]
+        plan.append({
+            "rows": rows,
+            "kept": np.nonzero(kept)[0],
+            "slots": slot[rows[kept]],
+            "anchor": slot[predecessor[links]],
+            "from_start": anchored_on_start[links],
+            "lag": lag[links][:, None],
+            "finish_links": finish_links,
+            "finish_succ": succ[finish_links],
+            "targets": targets,
+            "first": first,
+            "rounds": rounds,
+        })
+        free.extend(int(slot[task]) for task in released.pop(level, ()))
+    # Rows of the stacked [begin; end] state each link is anchored on
+    for level in plan:
+        level["anchor"] = level["anchor"] + np.where(level.pop("from_start"), 0, slots)
+    return plan, slots
+
+
+def _finish(start: np.ndarray, draw, size: int, plan: list, slots: int) -> np.ndarray:
+    """Project finish per iteration, in days from now.
+
+    `draw(rows)` returns the simulated durations of those task rows, one
+    column per iteration.
+    """
+    state = np.empty((2 * slots, size), dtype=np.float32)
+    begin, end = state[:slots], state[slots:]
+    finish = np.zeros(size, dtype=np.float32)
+    for level in plan:
+        rows = level["rows"]
+        duration = draw(rows)
+        level_begin = np.repeat(start[rows, None], size, axis=1)
+        if level["targets"].size:
+            # Earliest start each link allows, then the latest of those per successor
+            bound = state[level["anchor"]]
+            bound += level["lag"]
+            bound[level["finish_links"]] -= duration[level["finish_succ"]]
+            latest = bound[level["first"]]
+            for subset, links in level["rounds"]:
+                latest[subset] = np.maximum(latest[subset], bound[links])
+            targets = level["targets"]
+            level_begin[targets] = np.maximum(level_begin[targets], latest)
+        level_end = np.maximum(level_begin + duration, 0)
+        if level["slots"].size:
+            kept = level["kept"]
+            begin[level["slots"]] = level_begin[kept]
+            end[level["slots"]] = level_end[kept]
+        np.maximum(finish, level_end.max(axis=0), out=finish)
+    return finish
@@ -0,0 +1,175 @@
+"""
+Resource levelling over day buckets.
+
+Work is bucketed per assignee per day in numpy arrays (difference array plus
+cumulative sum), so detecting over-allocation is a couple of vector operations
+regardless of how many tasks overlap. Levelling is a serial schedule: movable
+tasks are placed one by one in dependency order, each at the earliest day on
+which its assignee has capacity for its whole duration, found with a
+cumulative-sum window test over that person's load row.
+
+The entry points take and return plain picklable data so they can run in a
+worker process (see `app.services.workers`).
+"""
+import heapq
+import math
+from typing import Dict, List
+
+import numpy as np
+
+
+def _day_grid(tasks: List[dict], max_days: int):
+    """Day index bounds of each task relative to the first task's UTC midnight."""
+    starts = np.array([t["start"] for t in tasks], dtype=np.float64)
+    ends = np.array([t["end"] for t in tasks], dtype=np.float64)
+    day0 = math.floor(starts.min() + 0.5) - 0.5  # julian days begin at noon
+    start_day = np.floor(starts - day0).astype(np.int64)
+    end_day = np.maximum(np.ceil(ends - day0).astype(np.int64), start_day + 1)
+    np.clip(start_day, 0, max_days - 1, out=start_day)
+    np.clip(end_day, 1, max_days, out=end_day)
+    return day0, start_day, end_day
+
+
+def daily_load(person: np.ndarray, start_day: np.ndarray, end_day: np.ndarray,
+               people: int, days: int) -> np.ndarray:
+    """people x days matrix of how many tasks each person has on each day."""
+    diff = np.zeros((people, days + 1), dtype=np.float32)
+    np.add.at(diff, (person, start_day), 1)
+    np.add.at(diff, (person, end_day), -1)
+    return np.cumsum(diff, axis=1)[:, :days]
+
+
+def overload_ranges(load: np.ndarray, capacity: float) -> List[tuple]:
+    """(person index, first day, last day exclusive, peak) for each over-allocated run."""
+    over = load > capacity + 1e-9
+    padded = np.zeros((over.shape[0], over.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = over
+    edges = np.diff(padded, axis=1)
+    result = []
+    for person, start in zip(*np.nonzero(edges == 1)):
+        end = start + int(np.argmax(edges[person, start + 1:] == -1)) + 1
+        result.append((int(person), int(start), int(end), float(load[person, start:end].max())))
+    return result
+
+
+def workload(tasks: List[dict], capacity: float, max_days: int) -> dict:
+    """Over-allocation report; `tasks` items have assignee, start and end (julian days)."""
+    if not tasks:
+        return {"day0": None, "overloads": [], "overloaded_days": 0}
+    people = sorted({t["assignee"] for t in tasks})
+    index = {p: i for i, p in enumerate(people)}
+    day0, start_day, end_day = _day_grid(tasks, max_days)
+    days = int(end_day.max())
+    person = np.array([index[t["assignee"]] for t in tasks], dtype=np.int64)
+    load = daily_load(person, start_day, end_day, len(people), days)
+    return {
+        "day0": day0,
+        "overloads": [
+            (people[p], start, end, peak) for p, start, end, peak in overload_ranges(load, capacity)
+        ],
+        "overloaded_days": int((load > capacity + 1e-9).sum()),
+    }
+
+
+def level(tasks: List[dict], edges: List[tuple], capacity: float, max_days: int) -> dict:
+    """Propose later start days for movable tasks so no assignee exceeds `capacity`.
+
+    `tasks` items: id, assignee, start, end (julian days), movable, limit
+    (julian day the task must end by, or None). `edges`: (predecessor id,
+    successor id, type, lag days). Fixed tasks keep their dates and count as
+    load. Returns shift_days per moved task, ids that could not be fitted
+    without passing their limit, and over-allocated person-days before/after.
+    """
+    if not tasks:
+        return {"shifts": {}, "unresolved": [], "overloaded_days_before": 0, "overloaded_days_after": 0}
+
+    people = sorted({t["assignee"] for t in tasks})
+    person_index = {p: i for i, p in enumerate(people)}
+    day0, start_day, end_day = _day_grid(tasks, max_days)
+    duration = end_day - start_day
+    limits = np.array(
+        [max_days if t["limit"] is None else math.ceil(t["limit"] - day0) for t in tasks],
+        dtype=np.int64
+    )
+    np.clip(limits, 0, max_days, out=limits)
+    days = int(max(end_day.max(), limits.max()))
+    person = np.array([person_index[t["assignee"]] for t in tasks], dtype=np.int64)
+    movable = np.array([bool(t["movable"]) for t in tasks])
+
+    before = daily_load(person, start_day, end_day, len(people), days)
+    overloaded_before = int((before > capacity + 1e-9).sum())
+
+    # Start from the fixed tasks only and place movable ones on top
+    load = daily_load(person[~movable], start_day[~movable], end_day[~movable], len(people), days)
+    ids = [t["id"] for t in tasks]
+    position = {task_id: i for i, task_id in enumerate(ids)}
+    incoming: Dict[int, List[tuple]] = {}
+    successors: Dict[int, List[int]] = {}
+    indegree = np.zeros(len(tasks), dtype=np.int64)
+    for predecessor, successor, kind, lag in edges:
+        if predecessor in position and successor in position:
+            p, s = position[predecessor], position[successor]
+            incoming.setdefault(s, []).append((p, kind, math.ceil(lag)))
+            successors.setdefault(p, []).append(s)
+            indegree[s] += 1
+
+    new_start = start_day.copy()
+    unresolved = []
+    # Ready tasks in original start order, then by end, so earlier work keeps priority
+    ready = [(int(start_day[i]), int(end_day[i]), ids[i], i) for i in range(len(tasks)) if indegree[i] == 0]
+    heapq.heapify(ready)
+    placed = 0
+    while ready or placed < len(tasks):
+        if not ready:
+            # Cycle in the links: release the remaining tasks in input order
+            remaining = [i for i in range(len(tasks)) if indegree[i] >= 0]
+            for i in remaining:
+                indegree[i] = 0
+                heapq.heappush(ready, (int(start_day[i]), int(end_day[i]), ids[i], i))
+        _, _, _, i = heapq.heappop(ready)
+        indegree[i] = -1
+        placed += 1
+
+        if movable[i]:
+            d = int(duration[i])
+            earliest = int(start_day[i])
+            for p, kind, lag in incoming.get(i, ()):
+                pred_start, pred_end = int(new_start[p]), int(new_start[p] + duration[p])
+                if kind == "SS":
+                    bound = pred_start + lag
+                elif kind == "FF":
+                    bound = pred_end + lag - d
+                elif kind == "SF":
+                    bound = pred_start + lag - d
+                else:
+                    bound = pred_end + lag
+                earliest = max(earliest, bound)
+            latest = int(limits[i]) - d
+
+            row = load[person[i]]
+            # Days where one more task still fits; a start s works if its window has no bad day
+            bad = np.concatenate(([0], np.cumsum(row + 1 > capacity + 1e-9)))
+            fits = np.nonzero(bad[d:] - bad[:-d] == 0)[0]
+            candidates = fits[(fits >= earliest) & (fits <= latest)]
+            if candidates.size:
+                chosen = int(candidates[0])
+            else:
+                # No slot before the limit: keep the links satisfied and report it
+                chosen = min(earliest, days - d)
+                unresolved.append(ids[i])
+            new_start[i] = chosen
+            load[person[i], chosen:chosen + d] += 1
+
+        for s in successors.get(i, ()):
+            if indegree[s] > 0:
+                indegree[s] -= 1
+                if indegree[s] == 0:
+                    heapq.heappush(ready, (int(start_day[s]), int(end_day[s]), ids[s], s))
+
+    shift = new_start - start_day
+    return {
+        "shifts": {ids[i]: int(shift[i]) for i in np.nonzero(shift)[0]},
+        "unresolved": unresolved,
+        "overloaded_days_before": overloaded_before,
+        "overloaded_days_after": int((load > capacity + 1e-9).sum()),
+    }
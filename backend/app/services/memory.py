@@ -0,0 +1,188 @@
+import os
+import random
+import tracemalloc
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional
+
+from app.core import config
+
+GROUP_BY = ("filename", "lineno", "traceback")
+
+
+class MemoryTracer:
+    """
+    Admin-controlled wrapper around tracemalloc. Snapshots and request peaks
+    live in the worker process that served the call, so a diff must be taken
+    against snapshots from the same worker (see `pid` in the status).
+    """
+
+    def __init__(self, max_snapshots: int, sample_rate: float, max_routes: int = 200):
+        self.max_snapshots = max_snapshots
+        self.sample_rate = sample_rate
+        self.max_routes = max_routes
+        self.snapshots = OrderedDict()
+        self.requests = OrderedDict()
+
+    @property
+    def is_tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self):
+        tracemalloc.stop()
+        self.snapshots.clear()
+        self.requests.clear()
+
+    def status(self) -> dict:
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "pid": os.getpid(),
+            "tracing": self.is_tracing,
+            "frames": tracemalloc.get_traceback_limit(),
+            "current_bytes": current,
+            "peak_bytes": peak,
+            "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+            "snapshots": self.list_snapshots(),
+        }
+
+    def take_snapshot(self) -> dict:
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ])
+        snapshot_id = uuid.uuid4().hex
+        meta = {
+            "id": snapshot_id,
+            "pid": os.getpid(),
+            "created_at": datetime.now().isoformat(),
+            "traced_bytes": sum(t.size for t in snapshot.traces),
+        }
+        self.snapshots[snapshot_id] = (meta, snapshot)
+        while len(self.snapshots) > self.max_snapshots:
+            self.snapshots.popitem(last=False)
+        return meta
+
+    def list_snapshots(self) -> List[dict]:
+        return [meta for meta, _ in self.snapshots.values()]
+
+    def get_snapshot(self, snapshot_id: str):
+        entry = self.snapshots.get(snapshot_id)
+        return entry[1] if entry else None
+
+    def diff(
+        self,
+        current_id: str,
+        base_id: Optional[str] = None,
+        group_by: str = "lineno",
+        file_filter: Optional[str] = None,
+        limit: int = 30
+    ) -> List[dict]:
+        """
+        Compare two snapshots, or list the top allocations of one snapshot when
+        no base is given. `file_filter` keeps allocations with any frame in a
+        matching file, e.g. "*relational.py".
+        """
+        current = self.get_snapshot(current_id)
+        base = self.get_snapshot(base_id) if base_id else None
+        if current is None or (base_id and base is None):
+            raise KeyError("Snapshot not found")
+
+        if file_filter:
+            filters = [tracemalloc.Filter(True, file_filter, all_frames=True)]
+            current = current.filter_traces(filters)
+            base = base.filter_traces(filters) if base else None
+
+        if base is not None:
+            stats = current.compare_to(base, group_by)
+        else:
+            stats = current.statistics(group_by)
+
+        return [
+            {
+                "location": [
+                    f"{frame.filename}:{frame.lineno}" if group_by != "filename" else frame.filename
+                    for frame in stat.traceback
+                ],
+                "size_bytes": stat.size,
+                "size_diff_bytes": getattr(stat, "size_diff", stat.size),
+                "count": stat.count,
+                "count_diff": getattr(stat, "count_diff", stat.count),
+            }
+            for stat in stats[:limit]
+        ]
+
+    def should_sample(self) -> bool:
+        return tracemalloc.is_tracing() and random.random() < self.sample_rate
+
+    def record_request(self, route: str, peak_bytes: int, retained_bytes: int):
+        stat = self.requests.get(route)
+        if stat is None:
+            if len(self.requests) >= self.max_routes:
+                self.requests.popitem(last=False)
+            stat = self.requests[route] = {
+                "route": route,
+                "count": 0,
+                "max_peak_bytes": 0,
+                "total_peak_bytes": 0,
+                "total_retained_bytes": 0,
+            }
+        stat["count"] += 1
+        stat["max_peak_bytes"] = max(stat["max_peak_bytes"], peak_bytes)
+        stat["total_peak_bytes"] += peak_bytes
+        stat["total_retained_bytes"] += retained_bytes
+
+    def request_stats(self) -> List[dict]:
+        return sorted(
+            (
+                {
+                    "route": s["route"],
+                    "count": s["count"],
+                    "max_peak_bytes": s["max_peak_bytes"],
+                    "avg_peak_bytes": s["total_peak_bytes"] // s["count"],
+                    "avg_retained_bytes": s["total_retained_bytes"] // s["count"],
+                }
+                for s in self.requests.values()
+            ),
+            key=lambda s: s["max_peak_bytes"],
+            reverse=True
+        )
+
+
+Memory = MemoryTracer(config.MEMORY_MAX_SNAPSHOTS, config.MEMORY_SAMPLE_RATE)
+
+
+class MemoryProfilingMiddleware:
+    """
+    Records the peak traced allocation of a sample of requests while tracing is
+    on. Peaks are process-wide, so concurrent requests in the same worker inflate
+    each other; compare routes over many samples rather than single values.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not Memory.should_sample():
+            await self.app(scope, receive, send)
+            return
+
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                route = scope.get("route")
+                path = route.path if route is not None else scope["path"]
+                Memory.record_request(
+                    f"{scope['method']} {path}",
+                    peak_bytes=max(peak - baseline, 0),
+                    retained_bytes=max(current - baseline, 0)
+                )
@@ -0,0 +1,198 @@
+import asyncio
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+from urllib.parse import parse_qs
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core import config
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_PARAM = "profile"
+PROFILE_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+PROFILE_FORMATS = {
+    "text": ".txt",      # cumulative-time call tree
+    "folded": ".folded", # collapsed stacks for flamegraph.pl / speedscope
+    "pstats": ".prof",   # raw cProfile dump for snakeviz & co
+}
+
+
+class StackSampler(threading.Thread):
+    """Samples the stack of one thread at a fixed interval into collapsed-stack counts."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class ProfileStore:
+    def __init__(self, directory: str, max_stored: int):
+        self.directory = directory
+        self.max_stored = max_stored
+
+    def path(self, profile_id: str, fmt: str) -> Optional[str]:
+        if not PROFILE_ID_RE.match(profile_id) or fmt not in PROFILE_FORMATS:
+            return None
+        path = os.path.join(self.directory, profile_id + PROFILE_FORMATS[fmt])
+        return path if os.path.isfile(path) else None
+
+    def save(self, profile_id: str, meta: dict, profiler: cProfile.Profile, stacks: Counter):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, profile_id)
+
+        profiler.dump_stats(base + ".prof")
+
+        text = io.StringIO()
+        stats = pstats.Stats(profiler, stream=text)
+        stats.sort_stats("cumulative").print_stats(60)
+        stats.print_callees(30)
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(text.getvalue())
+
+        with open(base + ".folded", "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        self._prune()
+
+    def list(self) -> List[dict]:
+        if not os.path.isdir(self.directory):
+            return []
+        result = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    result.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(result, key=lambda m: m.get("created_at", ""), reverse=True)
+
+    def _prune(self):
+        for meta in self.list()[self.max_stored:]:
+            for suffix in list(PROFILE_FORMATS.values()) + [".json"]:
+                try:
+                    os.remove(os.path.join(self.directory, meta["id"] + suffix))
+                except OSError:
+                    pass
+
+
+Profiles = ProfileStore(config.PROFILE_DIR, config.PROFILE_MAX_STORED)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a single request when an admin asks for it through the
+    `X-Profile` header or `?profile=1`. Requests without the trigger are passed
+    straight through, so the middleware costs one header scan otherwise.
+
+    The handler runs under cProfile (call tree) while a sampler thread records
+    collapsed stacks of the event-loop thread (flame graph). The profile link is
+    returned in the `X-Profile-Url` response header.
+
+    cProfile hooks the whole event-loop thread, not one request, so profiled
+    requests run one at a time; a profile still includes whatever unprofiled
+    requests ran while its handler was awaiting.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._lock = asyncio.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._is_triggered(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if not self._is_admin(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        profile_url = f"/api/v1/admin/profiles/{profile_id}".encode()
+
+        async def send_with_link(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_id.encode()))
+                headers.append((b"x-profile-url", profile_url))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        async with self._lock:
+            sampler = StackSampler(threading.get_ident(), config.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            sampler.start()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send_with_link)
+            finally:
+                profiler.disable()
+                sampler.stop()
+                meta = {
+                    "id": profile_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": scope.get("query_string", b"").decode(),
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                    "samples": sum(sampler.stacks.values()),
+                    "created_at": datetime.now().isoformat(),
+                }
+                await run_in_threadpool(Profiles.save, profile_id, meta, profiler, sampler.stacks)
+
+    @staticmethod
+    def _is_triggered(scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return value not in (b"", b"0", b"false")
+        query = scope.get("query_string", b"")
+        if PROFILE_QUERY_PARAM.encode() in query:
+            values = parse_qs(query.decode()).get(PROFILE_QUERY_PARAM, [])
+            return any(v not in ("", "0", "false") for v in values)
+        return False
+
+    @staticmethod
+    def _is_admin(scope) -> bool:
+        # Imported lazily so importing the middleware does not open the DB
+        from app.db.relational import Users
+
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode().partition(" ")
+                return scheme.lower() == "bearer" and bool(token) and Users.is_admin(token)
+        return False
@@ -0,0 +1,610 @@
+"""
+Streaming project export and import: NDJSON, CSV and MS Project XML.
+
+Exports are generators of text chunks. Tasks come from Tasks.iter_outline a
+page at a time in outline order (every task after its parent), with the
+comments of each page right after it, so a project of any size streams in
+bounded memory. People are written as usernames (email addresses), which
+carry over between installations where ids do not.
+
+Imports read an uploaded file from disk record by record, stage the rows in
+temporary tables (see ImportStaging) and only then create the project and
+write its tasks in batched transactions, recording progress on the import
+for clients to poll. A file that fails to parse or validate leaves nothing
+behind.
+
+    ndjson     one JSON object per line: a "project" record, then "member",
+               "task", "dependency" and "comment" records ("type" tells
+               them apart)
+    csv        tasks only, one per row, under a header naming CSV_COLUMNS;
+               dependency links are not carried
+    msproject  MS Project XML (MSPDI): tasks in outline order with their
+               predecessor links, resources and assignments
+"""
+import csv
+import io
+import json
+import logging
+import os
+import re
+from array import array
+from datetime import datetime
+import math
+from typing import Iterable, Iterator, Optional
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+from app.core import config
+from app.db.database import get_db
+from app.db.relational import Comments, Dependencies, ImportStaging, Projects, Tasks, Users
+from app.models.task import Task as TaskModel
+from app.services.ranking import DIGITS
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "msproject": "application/xml",
+}
+EXTENSIONS = {"ndjson": "ndjson", "csv": "csv", "msproject": "xml"}
+FORMATS_BY_MEDIA_TYPE = {
+    **{media_type: format for format, media_type in MEDIA_TYPES.items()},
+    "application/jsonl": "ndjson",
+    "text/xml": "msproject",
+}
+CSV_COLUMNS = (
+    "id", "parent_id", "name", "description", "status", "start_date", "deadline",
+    "assignee", "rank", "created_at", "updated_at"
+)
+STATUSES = ("pending", "in_progress", "completed")
+ROLES = ("project_member", "project_manager")
+MSPROJECT_NAMESPACE = "http://schemas.microsoft.com/project"
+# MS Project has no status, only percent complete
+PERCENT_COMPLETE = {"pending": 0, "in_progress": 50, "completed": 100}
+DEPENDENCY_TYPES = ("FS", "SS", "FF", "SF")
+# MSPDI PredecessorLink Type codes
+LINK_TYPES = {"FF": 0, "FS": 1, "SF": 2, "SS": 3}
+# MSPDI link lags are in tenths of a minute. Ours are calendar days, written
+# as elapsed days; other lag formats count working days of eight hours
+LAG_ELAPSED_DAYS = 8
+LAG_ELAPSED_FORMATS = (4, 6, 8, 10, 12)
+LAG_PER_DAY = 24 * 60 * 10
+LAG_PER_WORKING_DAY = 8 * 60 * 10
+
+# Characters XML 1.0 cannot carry, even escaped
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+
+class _Usernames(dict):
+    """User id -> username for one export, looked up once per user."""
+
+    def __missing__(self, user_id):
+        username = Users.get_usernames([user_id]).get(user_id) if user_id else None
+        self[user_id] = username
+        return username
+
+
+class _UserIds(dict):
+    """Username -> user id for one import, looked up once per username."""
+
+    def __missing__(self, username):
+        user = Users.get_user_by_username(username) if username else None
+        self[username] = user.id if user else None
+        return self[username]
+
+
+def _iso(value) -> Optional[str]:
+    """ISO 8601 text of a datetime, or of a date as SQLite stores it."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value.replace(" ", "T", 1) if isinstance(value, str) else value
+
+
+def _pages(items: Iterable, size: int) -> Iterator[list]:
+    page = []
+    for item in items:
+        page.append(item)
+        if len(page) == size:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
+def _json_line(record: dict) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def export_ndjson(project_id: str, page_size: int = 500) -> Iterator[str]:
+    project = Projects.get_project(project_id)
+    members = Projects.get_project_members(project_id)
+    usernames = _Usernames(Users.get_usernames([member.user_id for member in members]))
+    yield _json_line({
+        "type": "project",
+        "name": project.name,
+        "description": project.description,
+        "start_date": _iso(project.start_date),
+        "deadline": _iso(project.deadline),
+        "status": project.status,
+        "is_active": project.is_active
+    })
+    yield "".join(
+        _json_line({"type": "member", "user": usernames[member.user_id], "role": member.role})
+        for member in members if usernames[member.user_id]
+    )
+    for page in _pages(Tasks.iter_outline(project_id, page_size), page_size):
+        lines = [
+            _json_line({
+                "type": "task",
+                "id": task["id"],
+                "parent_id": task["parent_task_id"],
+                "name": task["name"],
+                "description": task["description"],
+                "status": task["status"],
+                "start_date": _iso(task["start_date"]),
+                "deadline": _iso(task["deadline"]),
+                "assignee": usernames[task["assigned_to_id"]],
+                "rank": task["rank"],
+                "progress": TaskModel.progress_of(task["progress_weight"], task["progress_done"]),
+                "created_at": _iso(task["created_at"]),
+                "updated_at": _iso(task["updated_at"])
+            })
+            for _, task in page
+        ]
+        lines += [
+            _json_line({
+                "type": "dependency",
+                "predecessor_id": predecessor,
+                "successor_id": successor,
+                "dependency_type": type,
+                "lag_days": lag_days
+            })
+            for predecessor, successor, type, lag_days in Dependencies.get_edges_into([task["id"] for _, task in page])
+        ]
+        lines += [
+            _json_line({
+                "type": "comment",
+                "id": comment.id,
+                "task_id": comment.task_id,
+                "user": usernames[comment.user_id],
+                "content": comment.content,
+                "created_at": _iso(comment.created_at),
+                "updated_at": _iso(comment.updated_at)
+            })
+            for comment in Comments.get_comments_for_tasks([task["id"] for _, task in page])
+        ]
+        yield "".join(lines)
+
+
+def export_csv(project_id: str, page_size: int = 500) -> Iterator[str]:
+    usernames = _Usernames()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for page in _pages(Tasks.iter_outline(project_id, page_size), page_size):
+        writer.writerows(
+            (
+                task["id"], task["parent_task_id"] or "", task["name"], task["description"], task["status"],
+                _iso(task["start_date"]), _iso(task["deadline"]), usernames[task["assigned_to_id"]] or "",
+                task["rank"], _iso(task["created_at"]), _iso(task["updated_at"])
+            )
+            for _, task in page
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()  # the header of a project without tasks
+
+
+def _xml_time(value) -> str:
+    """MSPDI time: ISO 8601 without fraction or zone."""
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(value)
+    return value.replace(microsecond=0, tzinfo=None).isoformat()
+
+
+def _xml_text(value) -> str:
+    if isinstance(value, datetime):
+        return _xml_time(value)
+    return escape(_XML_INVALID.sub("", str(value)))
+
+
+def _xml_element(tag: str, children: Iterable[tuple], nested: str = "") -> str:
+    """An element of text children, then any already written `nested` elements."""
+    inner = "".join(f"<{name}>{_xml_text(value)}</{name}>" for name, value in children if value is not None)
+    return f"<{tag}>{inner}{nested}</{tag}>\n"
+
+
+def export_msproject(project_id: str, page_size: int = 500) -> Iterator[str]:
+    project = Projects.get_project(project_id)
+    members = Projects.get_project_members(project_id)
+    # Members first, then anyone else assigned a task, numbered from 1 (0 is reserved)
+    resources = {member.user_id: i for i, member in enumerate(members, 1)}
+    # (task UID, resource UID) pairs: all the outline keeps once a task is written
+    assignments = array("l")
+    # A link sits in its successor's Task and may name a predecessor further down
+    # the outline, so predecessors take the first UIDs and the other tasks follow
+    predecessors = {}
+    uids = {}
+    for predecessor, successor, type, lag_days in Dependencies.get_edges([project_id]):
+        predecessors.setdefault(successor, []).append((predecessor, type, lag_days))
+        uids.setdefault(predecessor, len(uids) + 1)
+
+    yield '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    yield f'<Project xmlns="{MSPROJECT_NAMESPACE}">\n'
+    yield "".join(
+        f"<{name}>{_xml_text(value)}</{name}>\n"
+        for name, value in (
+            ("SaveVersion", 14),
+            ("Name", f"{project.name}.xml"),
+            ("Title", project.name),
+            ("StartDate", project.start_date),
+            ("FinishDate", project.deadline),
+        )
+    )
+    yield "<Tasks>\n"
+    row = 0
+    next_uid = len(uids)
+    for page in _pages(Tasks.iter_outline(project_id, page_size), page_size):
+        parts = []
+        for depth, task in page:
+            row += 1
+            uid = uids.get(task["id"])
+            if uid is None:
+                next_uid += 1
+                uid = next_uid
+            links = "".join(
+                _xml_element("PredecessorLink", (
+                    ("PredecessorUID", uids[predecessor]),
+                    ("Type", LINK_TYPES[type]),
+                    ("CrossProject", 0),
+                    ("LinkLag", round(lag_days * LAG_PER_DAY)),
+                    ("LagFormat", LAG_ELAPSED_DAYS),
+                )).rstrip("\n")
+                for predecessor, type, lag_days in predecessors.get(task["id"], ())
+            )
+            parts.append(_xml_element("Task", (
+                ("UID", uid),
+                ("ID", row),
+                ("Name", task["name"]),
+                ("Manual", 1),  # keep the dates as written rather than rescheduling
+                ("OutlineLevel", depth + 1),
+                ("Start", _xml_time(task["start_date"])),
+                ("Finish", _xml_time(task["deadline"])),
+                ("PercentComplete", PERCENT_COMPLETE.get(task["status"], 0)),
+                ("Summary", int(bool(task["has_children"]))),
+                ("Notes", task["description"] or None),
+            ), links))
+            if task["assigned_to_id"]:
+                resource = resources.setdefault(task["assigned_to_id"], len(resources) + 1)
+                assignments.extend((uid, resource))
+        yield "".join(parts)
+    yield "</Tasks>\n<Resources>\n"
+
+    for user_ids in _pages(resources, page_size):
+        parts = []
+        for user_id in user_ids:
+            user = Users.get_user_by_id(user_id)
+            if user is None:
+                continue
+            parts.append(_xml_element("Resource", (
+                ("UID", resources[user_id]),
+                ("ID", resources[user_id]),
+                ("Name", user.name or user.username),
+                ("Type", 1),  # work
+                ("EmailAddress", user.username),
+            )))
+        yield "".join(parts)
+    yield "</Resources>\n<Assignments>\n"
+
+    for start in range(0, len(assignments), 2 * page_size):
+        pairs = assignments[start:start + 2 * page_size]
+        yield "".join(
+            _xml_element("Assignment", (
+                ("UID", (start + i) // 2 + 1),
+                ("TaskUID", pairs[i]),
+                ("ResourceUID", pairs[i + 1]),
+                ("Units", 1),
+            ))
+            for i in range(0, len(pairs), 2)
+        )
+    yield "</Assignments>\n</Project>\n"
+
+
+EXPORTERS = {"ndjson": export_ndjson, "csv": export_csv, "msproject": export_msproject}
+
+
+def export_project(project_id: str, format: str) -> Iterator[str]:
+    return EXPORTERS[format](project_id, config.PROJECT_EXPORT_PAGE_SIZE)
+
+
+def _read_ndjson(stream) -> Iterator[tuple]:
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            raise ValueError(f"Line {number}: not valid JSON")
+        if not isinstance(record, dict) \
+                or record.get("type") not in ("project", "member", "task", "dependency", "comment"):
+            raise ValueError(f"Line {number}: expected a project, member, task, dependency or comment record")
+        yield f"Line {number}", record["type"], record
+
+
+def _read_csv(stream) -> Iterator[tuple]:
+    reader = csv.DictReader(stream)
+    if not reader.fieldnames:
+        raise ValueError("The CSV file is empty")
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    if "name" not in reader.fieldnames:
+        raise ValueError("The CSV header has no name column")
+    for row in reader:
+        where = f"Row {reader.line_num}"
+        yield where, "task", {
+            key: value if value != "" else None for key, value in row.items() if key in CSV_COLUMNS
+        }
+
+
+def _read_msproject(raw) -> Iterator[tuple]:
+    header = {}
+    header_sent = False
+    resources = {}  # resource UID -> username or name
+    outline = []  # refs of the open parents, by outline level
+    elements = []
+    for event, element in ElementTree.iterparse(raw, events=("start", "end")):
+        if event == "start":
+            elements.append(element)
+            if len(elements) == 2 and element.tag.rpartition("}")[2] in ("Tasks", "Resources", "Assignments") \
+                    and not header_sent:
+                header_sent = True
+                yield "Project", "project", header
+            continue
+        elements.pop()
+        tag = element.tag.rpartition("}")[2]
+        if len(elements) == 1:
+            if tag in ("Name", "Title", "StartDate", "FinishDate"):
+                header[tag] = element.text
+            continue
+        if len(elements) != 2:
+            continue
+        fields = {child.tag.rpartition("}")[2]: (child.text or "").strip() for child in element}
+        links = [
+            {link.tag.rpartition("}")[2]: (link.text or "").strip() for link in child}
+            for child in element if child.tag.rpartition("}")[2] == "PredecessorLink"
+        ]
+        container = elements[-1]
+        # Each row is done with once read: keep the tree from growing with the file
+        container.remove(element)
+        uid = fields.get("UID", "")
+        if tag == "Task" and uid not in ("", "0") and fields.get("IsNull") != "1":
+            try:
+                level = int(fields.get("OutlineLevel") or 1)
+                percent = float(fields.get("PercentComplete") or 0)
+            except ValueError:
+                raise ValueError(f"Task UID {uid}: OutlineLevel and PercentComplete must be numbers")
+            if level < 1:
+                continue  # the project summary task
+            del outline[level - 1:]
+            parent = outline[-1] if outline else None
+            outline.append(uid)
+            yield f"Task UID {uid}", "task", {
+                "id": uid,
+                "parent_id": parent,
+                "name": fields.get("Name"),
+                "description": fields.get("Notes"),
+                "status": "completed" if percent >= 100 else "in_progress" if percent > 0 else "pending",
+                "start_date": fields.get("Start") or None,
+                "deadline": fields.get("Finish") or None,
+                "created_at": fields.get("CreateDate") or None,
+            }
+            for link in links:
+                if link.get("CrossProject") == "1":
+                    continue
+                yield f"Task UID {uid}", "dependency", _msproject_link(link, uid)
+        elif tag == "Resource" and uid and uid != "0":
+            person = fields.get("EmailAddress") or fields.get("Name")
+            if person:
+                resources[uid] = person
+                yield f"Resource UID {uid}", "member", {"user": person, "role": "project_member"}
+        elif tag == "Assignment" and fields.get("ResourceUID") in resources:
+            yield f"Assignment UID {uid}", "assignment", {
+                "task_id": fields.get("TaskUID"), "assignee": resources[fields["ResourceUID"]]
+            }
+    if not header_sent:
+        yield "Project", "project", header
+
+
+def _msproject_link(link: dict, uid: str) -> dict:
+    """A dependency record from the fields of a PredecessorLink of task `uid`."""
+    try:
+        code = int(link.get("Type") or LINK_TYPES["FS"])
+        lag = int(link.get("LinkLag") or 0)
+        lag_format = int(link.get("LagFormat") or LAG_ELAPSED_DAYS)
+    except ValueError:
+        raise ValueError(f"Task UID {uid}: Type, LinkLag and LagFormat of a link must be numbers")
+    per_day = LAG_PER_DAY if lag_format in LAG_ELAPSED_FORMATS else LAG_PER_WORKING_DAY
+    return {
+        "predecessor_id": link.get("PredecessorUID"),
+        "successor_id": uid,
+        "dependency_type": next((name for name, value in LINK_TYPES.items() if value == code), None),
+        "lag_days": lag / per_day,
+    }
+
+
+def _text(record: dict, key: str, max_length: int, required: bool = False) -> str:
+    value = record.get(key)
+    value = "" if value is None else str(value)
+    if required and not value.strip():
+        raise ValueError(f"{key} is required")
+    if len(value) > max_length:
+        raise ValueError(f"{key} is longer than {max_length} characters")
+    return value
+
+
+def _time(value) -> Optional[datetime]:
+    if value is None or value == "":
+        return None
+    try:
+        # Stored as wall-clock time, like dates entered in the app
+        return datetime.fromisoformat(str(value)).replace(tzinfo=None)
+    except ValueError:
+        raise ValueError(f"{value!r} is not an ISO 8601 date")
+
+
+def _rank(value) -> Optional[str]:
+    """A usable rank key, or None to rank the task by its place in the file."""
+    if isinstance(value, str) and 0 < len(value) <= 64 and value[-1] != DIGITS[0] \
+            and all(digit in DIGITS for digit in value):
+        return value
+    return None
+
+
+def _stage_task(staging: ImportStaging, record: dict, people: _UserIds, now: datetime):
+    status = record.get("status") or "pending"
+    if status not in STATUSES:
+        raise ValueError(f"Unknown status {status!r}")
+    start_date, deadline = _time(record.get("start_date")), _time(record.get("deadline"))
+    created_at = _time(record.get("created_at")) or now
+    start_date = start_date or deadline or created_at
+    parent = record.get("parent_id")
+    staging.add_task(
+        ref=str(record["id"]),
+        parent_ref=str(parent) if parent not in (None, "") else None,
+        name=_text(record, "name", 200, required=True),
+        description=_text(record, "description", 5000),
+        start_date=start_date,
+        deadline=deadline or start_date,
+        status=status,
+        assigned_to_id=people[record.get("assignee")],
+        rank=_rank(record.get("rank")),
+        created_at=created_at,
+        updated_at=_time(record.get("updated_at")) or created_at
+    )
+
+
+def _stage_dependency(staging: ImportStaging, record: dict):
+    type = record.get("dependency_type") or "FS"
+    if type not in DEPENDENCY_TYPES:
+        raise ValueError(f"Unknown dependency type {type!r}")
+    for key in ("predecessor_id", "successor_id"):
+        if record.get(key) in (None, ""):
+            raise ValueError(f"{key} is required")
+    lag_days = record.get("lag_days") or 0
+    if isinstance(lag_days, bool) or not isinstance(lag_days, (int, float)) or not math.isfinite(lag_days):
+        raise ValueError("lag_days must be a number")
+    staging.add_dependency(str(record["predecessor_id"]), str(record["successor_id"]), type, float(lag_days))
+
+
+def _stage(import_id: str, raw, format: str, staging: ImportStaging, user_id: str, trusted: bool) -> tuple:
+    """Stage every record of the file; returns the project record and {user id: role}.
+
+    Unless `trusted` (an admin's import), members join as project members
+    whatever role the file gives them and comments are the importer's, so
+    a file cannot hand out management rights or speak for other people.
+    """
+    if format == "msproject":
+        records = _read_msproject(raw)
+    else:
+        text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+        records = _read_ndjson(text) if format == "ndjson" else _read_csv(text)
+
+    project, members = {}, {}
+    people = _UserIds()
+    now = datetime.now()
+    for count, (where, kind, record) in enumerate(records, 1):
+        try:
+            if kind == "project":
+                project = record
+            elif kind == "member":
+                member_id = people[record.get("user")]
+                if member_id:
+                    role = record.get("role")
+                    members[member_id] = role if trusted and role in ROLES else "project_member"
+            elif kind == "task":
+                if record.get("id") in (None, ""):
+                    record["id"] = where
+                _stage_task(staging, record, people, now)
+            elif kind == "dependency":
+                _stage_dependency(staging, record)
+            elif kind == "assignment":
+                assignee = people[record.get("assignee")]
+                if assignee and record.get("task_id"):
+                    staging.assign(record["task_id"], assignee)
+            elif kind == "comment":
+                if record.get("task_id") in (None, ""):
+                    raise ValueError("task_id is required")
+                created_at = _time(record.get("created_at")) or now
+                staging.add_comment(
+                    task_ref=str(record["task_id"]),
+                    user_id=(people[record.get("user")] if trusted else None) or user_id,
+                    content=_text(record, "content", 5000, required=True),
+                    created_at=created_at,
+                    updated_at=_time(record.get("updated_at")) or created_at
+                )
+        except ValueError as e:
+            raise ValueError(f"{where}: {e}")
+        if count % staging.batch_size == 0:
+            Projects.update_import(import_id, bytes_read=raw.tell())
+    return project, members
+
+
+def _project_columns(project: dict, name: Optional[str], staging: ImportStaging) -> dict:
+    """Project columns from the file's project record, falling back on its tasks' dates."""
+    first, last = staging.date_range()
+    now = datetime.now()
+    start_date = _time(project.get("start_date") or project.get("StartDate")) or first or now
+    status = project.get("status")
+    return {
+        "name": (name or _text(project, "name", 200) or project.get("Title") or "Imported project")[:200],
+        "description": _text(project, "description", 5000),
+        "start_date": start_date,
+        "deadline": _time(project.get("deadline") or project.get("FinishDate")) or last or start_date,
+        "status": status if status in STATUSES else "pending",
+        "is_active": project.get("is_active") is not False
+    }
+
+
+def run_import(
+    import_id: str, path: str, format: str, user_id: str, name: Optional[str] = None, trusted: bool = False
+):
+    """Turn an uploaded file into a new project, recording progress on the import.
+
+    Runs as a background task on its own connection and removes the file
+    when done. Pass `trusted` for admins, whose files keep member roles and
+    comment authors.
+    """
+    with get_db():
+        staging = None
+        project_id = None
+        try:
+            Projects.update_import(import_id, status="parsing")
+            staging = ImportStaging(config.PROJECT_IMPORT_BATCH_SIZE)
+            with open(path, "rb") as raw:
+                project, members = _stage(import_id, raw, format, staging, user_id, trusted)
+            staging.resolve()
+            Projects.update_import(
+                import_id, status="writing", bytes_read=os.path.getsize(path), tasks_total=staging.tasks
+            )
+            project_id = Projects.create_imported_project(
+                _project_columns(project, name, staging), list(members.items()), user_id
+            )
+            staging.write(
+                project_id, user_id, lambda written: Projects.update_import(import_id, tasks_written=written)
+            )
+            Projects.update_import(import_id, status="completed", project_id=project_id)
+        except (ValueError, ElementTree.ParseError, UnicodeDecodeError, csv.Error) as e:
+            if project_id:
+                Projects.delete_project(project_id)
+            Projects.update_import(import_id, status="failed", error=str(e))
+        except Exception:
+            logger.exception("Project import failed", extra={"import_id": import_id})
+            if project_id:
+                Projects.delete_project(project_id)
+            Projects.update_import(import_id, status="failed", error="Import failed")
+        finally:
+            if staging is not None:
+                staging.close()
+            os.unlink(path)
@@ -0,0 +1,93 @@
+"""
+Fractional rank keys for manual ordering.
+
+Ranks are strings over an alphabet in ASCII order, compared byte-wise (as
+SQLite does), so a key strictly between any two others always exists: moving
+a task writes only its own row. Keys never end in the lowest digit, which
+keeps room before every key. Repeated inserts at one spot make keys longer;
+`spaced_keys` hands out short, evenly spread keys again.
+"""
+from typing import List, Optional
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+_VALUE = {digit: i for i, digit in enumerate(DIGITS)}
+
+
+def rank_between(low: Optional[str], high: Optional[str]) -> str:
+    """A key sorting after `low` and before `high` (None: unbounded on that side).
+
+    Between two keys the midpoint is taken; at either end the key only steps
+    one digit past its neighbour, so appending or prepending one task after
+    another lengthens keys by a digit only every few dozen moves.
+    """
+    at_start, at_end = low is None, high is None
+    low = low or ""
+    if high is not None and not low < high:
+        raise ValueError("Rank bounds out of order")
+    key = []
+    i = 0
+    while True:
+        a = _VALUE[low[i]] if i < len(low) else 0
+        b = _VALUE[high[i]] if high is not None and i < len(high) else BASE
+        if a == b:
+            key.append(DIGITS[a])
+        elif at_end:
+            if a + 1 < BASE:
+                key.append(DIGITS[a + 1])
+                return "".join(key)
+            key.append(DIGITS[a])
+        elif at_start:
+            if b > 1:
+                key.append(DIGITS[b - 1])
+                return "".join(key)
+            # Below "1" only "0..." is left, and "0z" leaves the most room under it
+            key.extend((DIGITS[0], DIGITS[-1]))
+            return "".join(key)
+        elif (a + b) // 2 > a:
+            key.append(DIGITS[(a + b) // 2])
+            return "".join(key)
+        else:
+            # Adjacent digits: keep low's digit, anything after it is below high
+            key.append(DIGITS[a])
+            high = None
+        i += 1
+
+
+def spaced_keys(count: int) -> List[str]:
+    """`count` ascending keys of the shortest length that spreads them evenly."""
+    length = 1
+    while BASE ** length <= 2 * count:
+        length += 1
+    step = BASE ** length / (count + 1)
+    keys = []
+    for i in range(1, count + 1):
+        value = int(step * i)
+        digits = []
+        for _ in range(length):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        keys.append("".join(reversed(digits)).rstrip(DIGITS[0]))
+    return keys
+
+
+def keys_after(low: Optional[str], count: int) -> List[str]:
+    """`count` ascending keys after `low`: evenly spread under one short prefix."""
+    prefix = rank_between(low, None)
+    return [prefix + key for key in spaced_keys(count)]
+
+
+def sequence_key(position: int, length: int = 5) -> str:
+    """The key of the `position`-th row (from 0) of a list ranked as it streams by.
+
+    Keys have a fixed length and ascend with position, each with room on both
+    sides, so no count is needed up front; `length` digits rank BASE**length / 2 rows.
+    """
+    value = 2 * position + 1  # odd, so the last digit is never the lowest
+    if value >= BASE ** length:
+        raise ValueError("Too many rows for the key length")
+    digits = []
+    for _ in range(length):
+        value, digit = divmod(value, BASE)
+        digits.append(DIGITS[digit])
+    return "".join(reversed(digits))
@@ -0,0 +1,239 @@
+"""
+Critical-path analysis over task dependencies.
+
+Tasks keep their planned dates as "start no earlier than" constraints; the
+dependency links then push successors later where needed. One forward pass in
+topological order gives the earliest schedule, one backward pass from the
+project finish gives the latest, and their difference is each task's total
+slack. Both passes are O(tasks + dependencies).
+"""
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Collection, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+DAY_SECONDS = 86400.0
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+# Slack below this (in days, about a minute) counts as zero
+CRITICAL_EPSILON = 1e-3
+
+
+class ScheduleNode(NamedTuple):
+    id: str
+    start: Union[datetime, float]  # datetime, or a day number on any consistent scale
+    end: Union[datetime, float]
+
+
+class ScheduleEdge(NamedTuple):
+    predecessor_id: str
+    successor_id: str
+    type: str = "FS"
+    lag_days: float = 0.0
+
+
+class CriticalPath(NamedTuple):
+    slack: Dict[str, float]     # total slack in days
+    critical: Dict[str, bool]
+    finish: float               # project finish, in days since the epoch
+
+
+def _days(value: Union[datetime, float, None]) -> float:
+    if value is None:
+        return 0.0
+    if isinstance(value, datetime):
+        return value.timestamp() / DAY_SECONDS
+    return float(value)
+
+
+def topological_order(ids: List[str], edges: Iterable[ScheduleEdge]) -> List[str]:
+    """Kahn's algorithm; nodes caught in a cycle are appended in input order."""
+    indegree = {task_id: 0 for task_id in ids}
+    successors: Dict[str, List[str]] = {task_id: [] for task_id in ids}
+    for edge in edges:
+        if edge.predecessor_id in indegree and edge.successor_id in indegree:
+            successors[edge.predecessor_id].append(edge.successor_id)
+            indegree[edge.successor_id] += 1
+
+    queue = deque(task_id for task_id in ids if indegree[task_id] == 0)
+    order = []
+    while queue:
+        task_id = queue.popleft()
+        order.append(task_id)
+        for successor in successors[task_id]:
+            indegree[successor] -= 1
+            if indegree[successor] == 0:
+                queue.append(successor)
+
+    if len(order) < len(ids):
+        placed = set(order)
+        order.extend(task_id for task_id in ids if task_id not in placed)
+    return order
+
+
+def critical_path(nodes: List[ScheduleNode], edges: List[ScheduleEdge]) -> CriticalPath:
+    ids = [node.id for node in nodes]
+    duration = {node.id: max(_days(node.end) - _days(node.start), 0.0) for node in nodes}
+    early_start = {node.id: _days(node.start) for node in nodes}
+
+    incoming: Dict[str, List[ScheduleEdge]] = {task_id: [] for task_id in ids}
+    outgoing: Dict[str, List[ScheduleEdge]] = {task_id: [] for task_id in ids}
+    for edge in edges:
+        if edge.predecessor_id in incoming and edge.successor_id in incoming:
+            incoming[edge.successor_id].append(edge)
+            outgoing[edge.predecessor_id].append(edge)
+
+    order = topological_order(ids, edges)
+
+    # Forward pass: earliest start honouring planned dates and predecessors
+    for task_id in order:
+        start = early_start[task_id]
+        own = duration[task_id]
+        for edge in incoming[task_id]:
+            pred_start = early_start[edge.predecessor_id]
+            pred_finish = pred_start + duration[edge.predecessor_id]
+            if edge.type == "SS":
+                bound = pred_start + edge.lag_days
+            elif edge.type == "FF":
+                bound = pred_finish + edge.lag_days - own
+            elif edge.type == "SF":
+                bound = pred_start + edge.lag_days - own
+            else:
+                bound = pred_finish + edge.lag_days
+            if bound > start:
+                start = bound
+        early_start[task_id] = start
+
+    finish = max((early_start[t] + duration[t] for t in ids), default=0.0)
+
+    # Backward pass: latest finish that does not delay the project
+    late_finish = {}
+    for task_id in reversed(order):
+        latest = finish
+        own = duration[task_id]
+        for edge in outgoing[task_id]:
+            succ_finish = late_finish.get(edge.successor_id, finish)
+            succ_start = succ_finish - duration[edge.successor_id]
+            if edge.type == "SS":
+                bound = succ_start - edge.lag_days + own
+            elif edge.type == "FF":
+                bound = succ_finish - edge.lag_days
+            elif edge.type == "SF":
+                bound = succ_finish - edge.lag_days + own
+            else:
+                bound = succ_start - edge.lag_days
+            if bound < latest:
+                latest = bound
+        late_finish[task_id] = latest
+
+    slack = {}
+    critical = {}
+    for task_id in ids:
+        value = late_finish[task_id] - (early_start[task_id] + duration[task_id])
+        slack[task_id] = round(value, 4)
+        critical[task_id] = value <= CRITICAL_EPSILON
+    return CriticalPath(slack=slack, critical=critical, finish=finish)
+
+
+def edges_from(dependencies) -> List[ScheduleEdge]:
+    return [
+        ScheduleEdge(d.predecessor_id, d.successor_id, d.type, d.lag_days)
+        for d in dependencies
+    ]
+
+
+def predecessors_by_task(edges: Iterable[ScheduleEdge]) -> Dict[str, List[str]]:
+    result: Dict[str, List[str]] = {}
+    for edge in edges:
+        result.setdefault(edge.successor_id, []).append(edge.predecessor_id)
+    return result
+
+
+def as_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def from_julian_day(day: Optional[float]) -> Optional[datetime]:
+    """Naive UTC datetime for an SQLite julianday() value."""
+    if day is None:
+        return None
+    return datetime(1970, 1, 1) + timedelta(days=day - UNIX_EPOCH_JULIAN_DAY)
+
+
+def julian_day(value: datetime) -> float:
+    """SQLite julianday() of a datetime; naive values are taken as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp() / DAY_SECONDS + UNIX_EPOCH_JULIAN_DAY
+
+
+def _comparable(value: datetime) -> datetime:
+    """Naive UTC, so stored naive and aware dates can be compared."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def propagate(
+    dates: Dict[str, Tuple[datetime, datetime]],
+    edges: List[ScheduleEdge],
+    changed_id: str,
+    fixed: Collection[str] = ()
+) -> Dict[str, Tuple[datetime, datetime]]:
+    """Push every task downstream of `changed_id` later until all its links hold.
+
+    `dates` maps task id to (start, end) and already holds the changed task's
+    new dates. Tasks only ever move forward, keeping their duration; tasks in
+    `fixed` keep their dates, and what follows them is scheduled from those.
+    Returns the new (start, end) of each task that moved. O(tasks + dependencies).
+    """
+    outgoing: Dict[str, List[ScheduleEdge]] = {}
+    incoming: Dict[str, List[ScheduleEdge]] = {}
+    for edge in edges:
+        if edge.predecessor_id in dates and edge.successor_id in dates:
+            outgoing.setdefault(edge.predecessor_id, []).append(edge)
+            incoming.setdefault(edge.successor_id, []).append(edge)
+
+    # Only tasks reachable from the changed one may move
+    reachable = {changed_id}
+    stack = [changed_id]
+    while stack:
+        for edge in outgoing.get(stack.pop(), ()):
+            if edge.successor_id not in reachable:
+                reachable.add(edge.successor_id)
+                stack.append(edge.successor_id)
+
+    current: Dict[str, Tuple[datetime, datetime]] = {}
+
+    def dates_of(task_id: str) -> Tuple[datetime, datetime]:
+        if task_id not in current:
+            start, end = dates[task_id]
+            current[task_id] = (as_datetime(start), as_datetime(end))
+        return current[task_id]
+
+    shifted = {}
+    sub_edges = [e for e in edges if e.predecessor_id in reachable and e.successor_id in reachable]
+    for task_id in topological_order(sorted(reachable), sub_edges):
+        if task_id == changed_id or task_id in fixed:
+            continue
+        start, end = dates_of(task_id)
+        duration = _comparable(end) - _comparable(start)
+        required = None
+        for edge in incoming.get(task_id, ()):
+            pred_start, pred_end = (_comparable(value) for value in dates_of(edge.predecessor_id))
+            lag = timedelta(days=edge.lag_days)
+            if edge.type == "SS":
+                bound = pred_start + lag
+            elif edge.type == "FF":
+                bound = pred_end + lag - duration
+            elif edge.type == "SF":
+                bound = pred_start + lag - duration
+            else:
+                bound = pred_end + lag
+            if required is None or bound > required:
+                required = bound
+        if required is not None and required > _comparable(start):
+            delta = required - _comparable(start)
+            current[task_id] = (start + delta, end + delta)
+            shifted[task_id] = current[task_id]
+    return shifted
@@ -0,0 +1,29 @@
+"""
+Process pool for CPU-bound computations (levelling, forecasting).
+
+Work submitted here takes and returns plain picklable data, so it can run in
+a separate process without blocking the API's event loop or holding the GIL.
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from app.core import config
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: never fork a process that holds SQLite connections and threads
+        _pool = ProcessPoolExecutor(
+            max_workers=config.COMPUTE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+async def run_in_worker(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_executor(), func, *args)
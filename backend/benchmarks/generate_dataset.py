@@ -0,0 +1,317 @@
+"""
+Generate a synthetic database at production scale, directly through the
+peewee models with bulk inserts in large transactions.
+
+    python -m benchmarks.generate_dataset --db data/bench.db --scale production
+    python -m benchmarks.generate_dataset --db data/bench.db --users 5000 --projects 500 \\
+        --tasks 50000 --comments 200000 --seed 7
+
+Output is deterministic for a given seed and set of options. Every user shares
+the same password (`--password`), hashed once up front, and gets one active
+auth token so token-authenticated paths can be exercised.
+"""
+import argparse
+import bisect
+import itertools
+import math
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import bcrypt
+
+SCALES = {
+    "tiny": {"users": 50, "projects": 10, "tasks": 1_000, "comments": 5_000},
+    "small": {"users": 500, "projects": 100, "tasks": 10_000, "comments": 50_000},
+    "medium": {"users": 5_000, "projects": 1_000, "tasks": 100_000, "comments": 500_000},
+    "production": {"users": 50_000, "projects": 10_000, "tasks": 1_000_000, "comments": 5_000_000},
+}
+
+DEFAULTS = {
+    "members_mean": 8.0,       # mean members per project (log-normal)
+    "members_sigma": 0.6,
+    "project_skew": 1.2,       # Pareto alpha for tasks per project (lower = more skewed)
+    "subtask_ratio": 0.35,     # chance that a task is created under an existing task
+    "max_depth": 3,            # deepest subtask level (0 = top-level only)
+    "comment_skew": 1.1,       # Pareto alpha for comments per task
+    "bcrypt_rounds": 12,
+    "password": "benchmark-password",
+    "batch_rows": 200_000,     # rows per transaction
+}
+
+# SQLite's default SQLITE_MAX_VARIABLE_NUMBER since 3.32
+MAX_VARIABLES = 32_766
+
+
+class Generator:
+    def __init__(self, options: dict, seed: int, log=print):
+        self.options = {**DEFAULTS, **options}
+        self.rng = random.Random(seed)
+        self.log = log
+        self.now = datetime(2026, 1, 1)  # fixed "today" keeps output reproducible
+        self.user_ids = []
+        self.project_spans = {}  # project_id -> (start, deadline)
+        self.members = {}        # project_id -> [user_id], project manager first
+        self.task_ids = []
+
+    def uuid(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def bulk_insert(self, model, fields, rows):
+        """Insert an iterable of tuples in multi-row statements and large transactions."""
+        from app.db.database import DB
+
+        per_statement = max(1, MAX_VARIABLES // len(fields))
+        per_transaction = self.options["batch_rows"]
+        total = 0
+        rows = iter(rows)
+        while True:
+            chunk = list(itertools.islice(rows, per_transaction))
+            if not chunk:
+                break
+            with DB.atomic():
+                for i in range(0, len(chunk), per_statement):
+                    model.insert_many(chunk[i:i + per_statement], fields=fields).execute()
+            total += len(chunk)
+        return total
+
+    def pareto_weights(self, count: int, alpha: float):
+        weights = [self.rng.paretovariate(alpha) for _ in range(count)]
+        return list(itertools.accumulate(weights))
+
+    def weighted_counts(self, total: int, buckets: int, alpha: float):
+        """Split `total` items over `buckets` with a Pareto skew (every bucket gets >= 0)."""
+        counts = [0] * buckets
+        if not buckets:
+            return counts
+        cumulative = self.pareto_weights(buckets, alpha)
+        top = cumulative[-1]
+        for _ in range(total):
+            counts[bisect.bisect(cumulative, self.rng.random() * top)] += 1
+        return counts
+
+    def generate_users(self, count: int):
+        from app.models.user import User, UserRole
+        from app.models.auth_token import AuthToken
+
+        # bcrypt is the slow part of user creation, so hash once and share it
+        password_hash = bcrypt.hashpw(
+            self.options["password"].encode(), bcrypt.gensalt(self.options["bcrypt_rounds"])
+        ).decode()
+        created = self.now - timedelta(days=730)
+
+        def users():
+            for i in range(count):
+                user_id = self.uuid()
+                self.user_ids.append(user_id)
+                role = UserRole.ADMIN.value if i == 0 else UserRole.USER.value
+                yield (user_id, f"user{i}@bench.example.com", password_hash, '', role,
+                       f"Bench User {i}", created, created, True, False)
+
+        self.bulk_insert(User, [
+            User.id, User.username, User.password, User.salt, User.role,
+            User.name, User.created_at, User.updated_at, User.is_active, User.password_reset_required
+        ], users())
+
+        expires = self.now + timedelta(days=3650)
+
+        def tokens():
+            for user_id in self.user_ids:
+                yield (self.uuid(), user_id, f"{self.rng.getrandbits(256):064x}", created, expires, True)
+
+        self.bulk_insert(AuthToken, [
+            AuthToken.id, AuthToken.user, AuthToken.token,
+            AuthToken.created_at, AuthToken.expires_at, AuthToken.is_active
+        ], tokens())
+
+    def generate_projects(self, count: int):
+        from app.models.project import Project, ProjectMember
+
+        project_rows = []
+        member_rows = []
+        for i in range(count):
+            project_id = self.uuid()
+            start = self.now - timedelta(days=self.rng.randint(0, 720))
+            deadline = start + timedelta(days=self.rng.randint(30, 365))
+            self.project_spans[project_id] = (start, deadline)
+            status = 'completed' if deadline < self.now and self.rng.random() < 0.7 else (
+                'in_progress' if start < self.now else 'pending'
+            )
+            project_rows.append((project_id, f"Project {i}", f"Synthetic project {i}",
+                                 start, deadline, start, start, status, True))
+
+            members = max(1, int(self.rng.lognormvariate(
+                _lognormal_mu(self.options["members_mean"], self.options["members_sigma"]),
+                self.options["members_sigma"]
+            )))
+            for j, user_id in enumerate(self.rng.sample(self.user_ids, min(members, len(self.user_ids)))):
+                role = 'project_manager' if j == 0 else 'project_member'
+                member_rows.append((self.uuid(), project_id, user_id, role, start))
+
+        self.bulk_insert(Project, [
+            Project.id, Project.name, Project.description, Project.start_date, Project.deadline,
+            Project.created_at, Project.updated_at, Project.status, Project.is_active
+        ], project_rows)
+        self.bulk_insert(ProjectMember, [
+            ProjectMember.id, ProjectMember.project, ProjectMember.user,
+            ProjectMember.role, ProjectMember.created_at
+        ], member_rows)
+        for _, project_id, user_id, _, _ in member_rows:
+            self.members.setdefault(project_id, []).append(user_id)
+
+    def generate_tasks(self, count: int):
+        from app.models.task import Task
+        from app.services.ranking import spaced_keys
+
+        project_ids = list(self.project_spans)
+        per_project = self.weighted_counts(count, len(project_ids), self.options["project_skew"])
+        max_depth = self.options["max_depth"]
+        subtask_ratio = self.options["subtask_ratio"]
+
+        def tasks():
+            for project_id, task_count in zip(project_ids, per_project):
+                project_start, project_deadline = self.project_spans[project_id]
+                span_days = max(1, (project_deadline - project_start).days)
+                members = self.members[project_id]
+                ranks = spaced_keys(task_count)
+                # Tasks that can still take children: (id, depth, start, deadline)
+                parents = []
+                for i in range(task_count):
+                    task_id = self.uuid()
+                    parent = None
+                    if parents and self.rng.random() < subtask_ratio:
+                        parent = self.rng.choice(parents)
+                    if parent:
+                        parent_id, depth, start, parent_deadline = parent
+                        depth += 1
+                        start = start + timedelta(days=self.rng.randint(0, max(0, (parent_deadline - start).days)))
+                        deadline = min(parent_deadline, start + timedelta(days=self.rng.randint(1, 14)))
+                    else:
+                        parent_id, depth = None, 0
+                        start = project_start + timedelta(days=self.rng.randint(0, span_days))
+                        deadline = start + timedelta(days=self.rng.randint(1, 30))
+                    if depth < max_depth:
+                        parents.append((task_id, depth, start, deadline))
+
+                    if deadline < self.now:
+                        status = 'completed' if self.rng.random() < 0.85 else 'in_progress'
+                    elif start < self.now:
+                        status = self.rng.choice(('pending', 'in_progress', 'in_progress', 'completed'))
+                    else:
+                        status = 'pending'
+                    updated = start
+                    if status == 'completed':
+                        # Completion drifts around the deadline (log-normal overrun)
+                        updated = start + (deadline - start) * self.rng.lognormvariate(0.1, 0.35)
+                    self.task_ids.append(task_id)
+                    yield (task_id, f"Task {i}", "Synthetic task", project_id, start, deadline,
+                           self.rng.choice(members) if self.rng.random() < 0.8 else None,
+                           members[0], status, start, updated, parent_id, ranks[i])
+
+        self.bulk_insert(Task, [
+            Task.id, Task.name, Task.description, Task.project_id, Task.start_date, Task.deadline,
+            Task.assigned_to_id, Task.created_by_id, Task.status, Task.created_at, Task.updated_at,
+            Task.parent_task_id, Task.rank
+        ], tasks())
+
+    def generate_comments(self, count: int):
+        from app.models.comment import Comment
+
+        if not self.task_ids:
+            return
+        cumulative = self.pareto_weights(len(self.task_ids), self.options["comment_skew"])
+        top = cumulative[-1]
+
+        def comments():
+            for i in range(count):
+                task_id = self.task_ids[bisect.bisect(cumulative, self.rng.random() * top)]
+                created = self.now - timedelta(minutes=self.rng.randint(0, 720 * 24 * 60))
+                yield (self.uuid(), task_id, self.rng.choice(self.user_ids),
+                       f"Synthetic comment {i}", created, created)
+
+        self.bulk_insert(Comment, [
+            Comment.id, Comment.task_id, Comment.user_id, Comment.content,
+            Comment.created_at, Comment.updated_at
+        ], comments())
+
+    def run(self, users: int, projects: int, tasks: int, comments: int):
+        for label, step, amount in (
+            ("users", self.generate_users, users),
+            ("projects", self.generate_projects, projects),
+            ("tasks", self.generate_tasks, tasks),
+            ("comments", self.generate_comments, comments),
+        ):
+            started = time.perf_counter()
+            step(amount)
+            self.log(f"{label:<9} {amount:>10,} rows in {time.perf_counter() - started:6.1f}s")
+
+
+def _lognormal_mu(mean: float, sigma: float) -> float:
+    return math.log(mean) - sigma ** 2 / 2
+
+
+def open_database(path: str):
+    """Point the app's database at `path` and create the schema there."""
+    from app.db.database import DB
+
+    DB.init(path)
+    DB.connect(reuse_if_open=True)
+    # The table objects create (and migrate) the schema when they are built
+    already_imported = "app.db.relational" in sys.modules
+    from app.db import relational
+    from app.models.cache import CacheEntry
+    if already_imported:
+        for table in vars(relational).values():
+            if type(table).__name__.endswith("Table"):
+                table.__init__()
+    DB.create_tables([CacheEntry])
+    return DB
+
+
+def generate(path: str, users: int, projects: int, tasks: int, comments: int, seed: int = 42,
+             log=print, **options):
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} already exists")
+    db = open_database(path)
+    try:
+        Generator(options, seed, log=log).run(users, projects, tasks, comments)
+    finally:
+        db.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="Path of the SQLite file to create")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--projects", type=int)
+    parser.add_argument("--tasks", type=int)
+    parser.add_argument("--comments", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--members-mean", type=float, default=DEFAULTS["members_mean"])
+    parser.add_argument("--members-sigma", type=float, default=DEFAULTS["members_sigma"])
+    parser.add_argument("--project-skew", type=float, default=DEFAULTS["project_skew"])
+    parser.add_argument("--subtask-ratio", type=float, default=DEFAULTS["subtask_ratio"])
+    parser.add_argument("--max-depth", type=int, default=DEFAULTS["max_depth"])
+    parser.add_argument("--comment-skew", type=float, default=DEFAULTS["comment_skew"])
+    parser.add_argument("--bcrypt-rounds", type=int, default=DEFAULTS["bcrypt_rounds"])
+    parser.add_argument("--password", default=DEFAULTS["password"])
+    parser.add_argument("--batch-rows", type=int, default=DEFAULTS["batch_rows"])
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = dict(SCALES[args.scale])
+    for key in sizes:
+        if getattr(args, key) is not None:
+            sizes[key] = getattr(args, key)
+    options = {key: getattr(args, key) for key in DEFAULTS}
+    generate(args.db, seed=args.seed, **sizes, **options)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
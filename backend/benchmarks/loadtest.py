@@ -0,0 +1,335 @@
+"""
+Load-test the API with realistic project-manager traffic.
+
+Start the server with query counting enabled, then run the scenarios:
+
+    EXPOSE_QUERY_COUNT=true uvicorn app.main:app --workers 4
+    python -m benchmarks.loadtest run --base-url http://127.0.0.1:8000
+
+Results are written as JSON (one file per run, tagged with the git commit) and
+two runs can be compared with:
+
+    python -m benchmarks.loadtest compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+SCENARIOS = ("login_storm", "dashboard", "open_project", "gantt", "status_churn")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+PASSWORD = "loadtest-password"
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.queries = []
+
+    def record(self, response: httpx.Response, elapsed: float):
+        self.latencies.append(elapsed * 1000)
+        if response.status_code >= 400:
+            self.errors += 1
+        count = response.headers.get("X-DB-Query-Count")
+        if count is not None:
+            self.queries.append(int(count))
+
+    def summary(self, duration: float, iterations: int) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "requests": len(latencies),
+            "iterations": iterations,
+            "errors": self.errors,
+            "duration_s": round(duration, 3),
+            "rps": round(len(latencies) / duration, 2) if duration else None,
+            "latency_ms": {
+                "mean": round(sum(latencies) / len(latencies), 3) if latencies else None,
+                "p50": percentile(latencies, 50),
+                "p90": percentile(latencies, 90),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+                "max": latencies[-1] if latencies else None,
+            },
+            "db_queries_per_request": (
+                round(sum(self.queries) / len(self.queries), 2) if self.queries else None
+            ),
+            "db_queries_total": sum(self.queries) if self.queries else None,
+        }
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.admin_token = None
+        self.users = []        # [(username, token)]
+        self.projects = []     # [project_id]
+        self.leaf_tasks = []   # [(project_id, task_id)]
+
+    def auth(self, token):
+        return {"Authorization": f"Bearer {token}"}
+
+    async def login(self, client, username):
+        response = await client.post(
+            "/token",
+            data={"grant_type": "password", "username": username, "password": PASSWORD}
+        )
+        if response.status_code == 200:
+            return response, response.json()["access_token"]
+        return response, None
+
+    async def signup_or_login(self, client, username, name):
+        _, token = await self.login(client, username)
+        if token:
+            return token
+        response = await client.post("/signup", json={"username": username, "password": PASSWORD, "name": name})
+        response.raise_for_status()
+        return response.json()["access_token"]
+
+    async def seed(self, client):
+        """Create the admin, members, projects and task trees used by every scenario."""
+        args = self.args
+        self.admin_token = await self.signup_or_login(client, args.admin_username, "Load Admin")
+
+        for i in range(args.users):
+            username = f"loadtest-user-{i}@{args.domain}"
+            token = await self.signup_or_login(client, username, f"Load User {i}")
+            self.users.append((username, token))
+
+        member_ids = []
+        for _, token in self.users:
+            response = await client.get("/api/v1/userinfo/", headers=self.auth(token))
+            member_ids.append(response.json()["id"])
+
+        now = datetime.now()
+        for p in range(args.projects):
+            response = await client.post("/api/v1/projects/", headers=self.auth(self.admin_token), json={
+                "name": f"Load project {p}",
+                "description": "Created by benchmarks.loadtest",
+                "start_date": now.isoformat(),
+                "deadline": (now + timedelta(days=90)).isoformat(),
+            })
+            response.raise_for_status()
+            project_id = response.json()["id"]
+            self.projects.append(project_id)
+
+            for user_id in self.rng.sample(member_ids, min(args.members_per_project, len(member_ids))):
+                await client.post(
+                    f"/api/v1/projects/{project_id}/members",
+                    headers=self.auth(self.admin_token),
+                    json={"user_id": user_id, "role": "project_member"}
+                )
+
+            for t in range(args.tasks_per_project):
+                start = now + timedelta(days=self.rng.randint(0, 60))
+                response = await client.post("/api/v1/tasks/", headers=self.auth(self.admin_token), json={
+                    "name": f"Task {t}",
+                    "description": "Load test task",
+                    "project_id": project_id,
+                    "start_date": start.isoformat(),
+                    "deadline": (start + timedelta(days=self.rng.randint(1, 20))).isoformat(),
+                    "assigned_to_id": self.rng.choice(member_ids) if member_ids else None,
+                })
+                response.raise_for_status()
+                task_id = response.json()["id"]
+                for s in range(args.subtasks_per_task):
+                    response = await client.post("/api/v1/tasks/", headers=self.auth(self.admin_token), json={
+                        "name": f"Task {t}.{s}",
+                        "description": "Load test subtask",
+                        "project_id": project_id,
+                        "start_date": start.isoformat(),
+                        "deadline": (start + timedelta(days=1)).isoformat(),
+                        "parent_task_id": task_id,
+                    })
+                    response.raise_for_status()
+                    self.leaf_tasks.append((project_id, response.json()["id"]))
+                if not args.subtasks_per_task:
+                    self.leaf_tasks.append((project_id, task_id))
+
+    async def timed(self, recorder, coro):
+        start = time.perf_counter()
+        response = await coro
+        recorder.record(response, time.perf_counter() - start)
+        return response
+
+    # Scenarios: each call performs one user-visible action
+
+    async def login_storm(self, client, recorder, rng):
+        username, _ = rng.choice(self.users)
+        await self.timed(recorder, client.post(
+            "/token", data={"grant_type": "password", "username": username, "password": PASSWORD}
+        ))
+
+    async def dashboard(self, client, recorder, rng):
+        _, token = rng.choice(self.users)
+        await self.timed(recorder, client.get("/api/v1/projects/", headers=self.auth(token)))
+
+    async def open_project(self, client, recorder, rng):
+        # Mirrors the five parallel requests of the project page
+        project_id = rng.choice(self.projects)
+        headers = self.auth(self.admin_token)
+        await asyncio.gather(
+            self.timed(recorder, client.get(f"/api/v1/projects/{project_id}", headers=headers)),
+            self.timed(recorder, client.get(f"/api/v1/projects/{project_id}/members", headers=headers)),
+            self.timed(recorder, client.get("/api/v1/tasks/", params={"project_id": project_id}, headers=headers)),
+            self.timed(recorder, client.get("/api/v1/users/", headers=headers)),
+            self.timed(recorder, client.get(f"/api/v1/gantt/{project_id}", headers=headers)),
+        )
+
+    async def gantt(self, client, recorder, rng):
+        project_id = rng.choice(self.projects)
+        await self.timed(recorder, client.get(f"/api/v1/gantt/{project_id}", headers=self.auth(self.admin_token)))
+
+    async def status_churn(self, client, recorder, rng):
+        # Every status change re-runs the project status rollup
+        _, task_id = rng.choice(self.leaf_tasks)
+        status = rng.choice(("pending", "in_progress", "completed"))
+        await self.timed(recorder, client.put(
+            f"/api/v1/tasks/{task_id}", headers=self.auth(self.admin_token), json={"status": status}
+        ))
+
+    async def run_scenario(self, client, name):
+        step = getattr(self, name)
+        recorder = Recorder()
+        deadline = time.perf_counter() + self.args.duration
+        iterations = 0
+
+        async def worker(worker_id):
+            nonlocal iterations
+            rng = random.Random(f"{self.args.seed}-{name}-{worker_id}")
+            while time.perf_counter() < deadline:
+                await step(client, recorder, rng)
+                iterations += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(self.args.concurrency)))
+        return recorder.summary(time.perf_counter() - started, iterations)
+
+    async def run(self):
+        limits = httpx.Limits(max_connections=self.args.concurrency * 5)
+        async with httpx.AsyncClient(base_url=self.args.base_url, timeout=60, limits=limits) as client:
+            await self.seed(client)
+            results = {}
+            for name in self.args.scenarios:
+                results[name] = await self.run_scenario(client, name)
+                print_summary(name, results[name])
+            return results
+
+
+def print_summary(name, summary):
+    latency = summary["latency_ms"]
+    print(
+        f"{name:<14} {summary['requests']:>7} req  {summary['rps'] or 0:>8.1f} rps  "
+        f"p50 {latency['p50'] or 0:>8.1f}ms  p95 {latency['p95'] or 0:>8.1f}ms  "
+        f"p99 {latency['p99'] or 0:>8.1f}ms  errors {summary['errors']:>4}  "
+        f"queries/req {summary['db_queries_per_request']}"
+    )
+
+
+def command_run(args):
+    results = asyncio.run(LoadTest(args).run())
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created_at": datetime.now().isoformat(),
+        "base_url": args.base_url,
+        "config": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "users": args.users,
+            "projects": args.projects,
+            "tasks_per_project": args.tasks_per_project,
+            "subtasks_per_task": args.subtasks_per_task,
+            "seed": args.seed,
+        },
+        "scenarios": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"loadtest-{commit or 'nogit'}-{datetime.now():%Y%m%d%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+def command_compare(args):
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    print(f"{'scenario':<14} {'rps':>22} {'p95 ms':>24} {'queries/req':>22}")
+    for name in SCENARIOS:
+        if name not in before["scenarios"] or name not in after["scenarios"]:
+            continue
+        b, a = before["scenarios"][name], after["scenarios"][name]
+        print(
+            f"{name:<14} {fmt_change(b['rps'], a['rps']):>22} "
+            f"{fmt_change(b['latency_ms']['p95'], a['latency_ms']['p95']):>24} "
+            f"{fmt_change(b['db_queries_per_request'], a['db_queries_per_request']):>22}"
+        )
+
+
+def fmt_change(before, after):
+    if before is None or after is None:
+        return f"{before} -> {after}"
+    change = f" ({(after - before) / before * 100:+.1f}%)" if before else ""
+    return f"{before:.1f} -> {after:.1f}{change}"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Seed data and run the scenarios")
+    run.add_argument("--base-url", default="http://127.0.0.1:8000")
+    run.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    run.add_argument("--concurrency", type=int, default=20)
+    run.add_argument("--duration", type=float, default=20, help="Seconds per scenario")
+    run.add_argument("--users", type=int, default=20)
+    run.add_argument("--projects", type=int, default=10)
+    run.add_argument("--members-per-project", type=int, default=8)
+    run.add_argument("--tasks-per-project", type=int, default=50)
+    run.add_argument("--subtasks-per-task", type=int, default=2)
+    run.add_argument("--admin-username", default="loadtest-admin@example.com",
+                     help="Must be an admin already, or the first user of an empty database")
+    run.add_argument("--domain", default="example.com", help="Must satisfy WHITELIST_DOMAIN")
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--output", help="Result file (default: benchmarks/results/loadtest-<commit>-<time>.json)")
+    run.set_defaults(func=command_run)
+
+    compare = commands.add_parser("compare", help="Compare two result files")
+    compare.add_argument("before")
+    compare.add_argument("after")
+    compare.set_defaults(func=command_compare)
+
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    sys.exit(args.func(args))
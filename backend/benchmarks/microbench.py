@@ -0,0 +1,258 @@
+"""
+Per-method benchmarks for the hot relational.py paths, run against generated
+databases of increasing size to expose each method's complexity curve.
+
+    python -m benchmarks.microbench run --sizes tiny small medium
+    python -m benchmarks.microbench run --save-baseline        # refresh baselines/microbench.json
+    python -m benchmarks.microbench compare                    # run and check against the baseline
+    python -m benchmarks.microbench compare --results out.json # check an earlier run instead
+
+`compare` exits with status 1 when a method's median time grows beyond
+`--time-tolerance` or its query count beyond `--query-tolerance` (relative).
+Query counts are machine independent; timings are only comparable on the
+machine that produced the baseline.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.generate_dataset import SCALES, generate, open_database
+
+BENCH_DIR = os.path.dirname(__file__)
+DATA_DIR = os.path.join(BENCH_DIR, ".data")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baselines", "microbench.json")
+DEFAULT_SIZES = ("tiny", "small")
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def dataset_path(size: str, seed: int) -> str:
+    """Generate (once) and return the database file for a scale preset."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"{size}-{seed}.db")
+    if not os.path.exists(path):
+        print(f"Generating {size} dataset at {path}")
+        generate(path, seed=seed, bcrypt_rounds=4, log=lambda line: print(f"  {line}"), **SCALES[size])
+    return path
+
+
+def pick_inputs(db) -> dict:
+    """Choose deterministic, representative arguments for every benchmarked method."""
+    def one(sql):
+        return db.execute_sql(sql).fetchone()
+
+    admin_id, admin_token = one(
+        'SELECT u.id, t.token FROM "user" u JOIN authtoken t ON t.user_id = u.id '
+        "WHERE u.role = 'admin' ORDER BY u.id LIMIT 1"
+    )
+    member_id, member_token, member_project = one(
+        'SELECT u.id, t.token, m.project_id FROM "user" u '
+        'JOIN authtoken t ON t.user_id = u.id JOIN projectmember m ON m.user_id = u.id '
+        "WHERE u.role = 'user' ORDER BY u.id LIMIT 1"
+    )
+    (largest_project,) = one(
+        "SELECT project_id FROM task GROUP BY project_id ORDER BY COUNT(*) DESC, project_id LIMIT 1"
+    )
+    (parent_task,) = one(
+        "SELECT parent_task_id FROM task WHERE parent_task_id IS NOT NULL "
+        "GROUP BY parent_task_id ORDER BY COUNT(*) DESC, parent_task_id LIMIT 1"
+    )
+    (window_start,) = one(
+        f"SELECT start_date FROM task WHERE project_id = '{largest_project}' "
+        "ORDER BY start_date LIMIT 1 OFFSET (SELECT COUNT(*) / 2 FROM task "
+        f"WHERE project_id = '{largest_project}')"
+    )
+    (commented_task,) = one(
+        "SELECT task_id FROM comment GROUP BY task_id ORDER BY COUNT(*) DESC, task_id LIMIT 1"
+    )
+    return {
+        "admin_id": admin_id,
+        "admin_token": admin_token,
+        "member_id": member_id,
+        "member_token": member_token,
+        "member_project": member_project,
+        "largest_project": largest_project,
+        "window_start": datetime.fromisoformat(str(window_start)),
+        "parent_task": parent_task,
+        "commented_task": commented_task,
+    }
+
+
+def benchmarks(inputs: dict) -> dict:
+    from fastapi import Request
+    from app.db.relational import Users, Projects, Tasks, Comments
+    from app.api.v1.endpoints.gantt import GanttEndpoint
+
+    gantt = GanttEndpoint()
+    admin = Users.get_user_by_token(inputs["admin_token"])
+
+    return {
+        "UsersTable.get_user_by_token": lambda: Users.get_user_by_token(inputs["member_token"]),
+        "ProjectsTable.user_has_access": lambda: Projects.user_has_access(
+            inputs["member_id"], inputs["member_project"]
+        ),
+        "ProjectsTable.get_all_projects": lambda: Projects.get_all_projects(),
+        "TasksTable.get_project_tasks": lambda: Tasks.get_project_tasks(inputs["largest_project"]),
+        "TasksTable.get_project_tasks_in_window": lambda: Tasks.get_project_tasks_in_window(
+            inputs["largest_project"], inputs["window_start"], inputs["window_start"] + timedelta(days=14)
+        ),
+        "TasksTable.get_task": lambda: Tasks.get_task(inputs["parent_task"]),
+        "CommentsTable.get_task_comments": lambda: Comments.get_task_comments(inputs["commented_task"]),
+        "GanttEndpoint.get_gantt": lambda: asyncio.run(
+            gantt.get_gantt(
+                Request({"type": "http", "headers": []}),
+                project_id=inputs["largest_project"], window_start=None, window_end=None, userinfo=admin,
+            )
+        ),
+        "GanttEndpoint._build_chart": lambda: gantt._build_chart(inputs["largest_project"]),
+    }
+
+
+def measure(func, min_repeats: int, max_seconds: float) -> dict:
+    from app.core.structured_logging import query_count_var
+
+    func()  # warm up caches and lazy imports
+    timings = []
+    queries = None
+    started = time.perf_counter()
+    while True:
+        counter = [0]
+        token = query_count_var.set(counter)
+        t0 = time.perf_counter()
+        try:
+            func()
+        finally:
+            elapsed = time.perf_counter() - t0
+            query_count_var.reset(token)
+        timings.append(elapsed * 1000)
+        queries = counter[0]
+        if len(timings) >= min_repeats and (
+            time.perf_counter() - started > max_seconds or len(timings) >= 1000
+        ):
+            break
+    return {
+        "median_ms": round(statistics.median(timings), 4),
+        "min_ms": round(min(timings), 4),
+        "repeats": len(timings),
+        "queries": queries,
+    }
+
+
+def run(sizes, seed: int, min_repeats: int, max_seconds: float, methods=None) -> dict:
+    results = {}
+    for size in sizes:
+        db = open_database(dataset_path(size, seed))
+        try:
+            inputs = pick_inputs(db)
+            for name, func in benchmarks(inputs).items():
+                if methods and name not in methods:
+                    continue
+                stat = measure(func, min_repeats, max_seconds)
+                results.setdefault(name, {})[size] = stat
+                print(f"{size:<8} {name:<40} {stat['median_ms']:>10.3f} ms  {stat['queries']:>7} queries")
+        finally:
+            db.close()
+    return {
+        "commit": git_commit(),
+        "created_at": datetime.now().isoformat(),
+        "machine": {"python": platform.python_version(), "platform": platform.platform()},
+        "seed": seed,
+        "sizes": {size: SCALES[size] for size in sizes},
+        "methods": results,
+    }
+
+
+def compare(baseline: dict, current: dict, time_tolerance: float, query_tolerance: float) -> list:
+    regressions = []
+    for name, per_size in current["methods"].items():
+        for size, stat in per_size.items():
+            base = baseline["methods"].get(name, {}).get(size)
+            if not base:
+                continue
+            if base["median_ms"] and stat["median_ms"] > base["median_ms"] * (1 + time_tolerance):
+                regressions.append(
+                    f"{name} [{size}] time {base['median_ms']:.3f} -> {stat['median_ms']:.3f} ms"
+                )
+            if stat["queries"] > base["queries"] * (1 + query_tolerance):
+                regressions.append(f"{name} [{size}] queries {base['queries']} -> {stat['queries']}")
+    return regressions
+
+
+def write_json(path: str, data: dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def command_run(args):
+    results = run(args.sizes, args.seed, args.min_repeats, args.max_seconds, args.methods)
+    if args.output:
+        write_json(args.output, results)
+    if args.save_baseline:
+        write_json(BASELINE_PATH, results)
+        print(f"Baseline written to {BASELINE_PATH}")
+
+
+def command_compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if args.results:
+        with open(args.results) as f:
+            current = json.load(f)
+    else:
+        sizes = [s for s in baseline["sizes"] if s in SCALES]
+        current = run(sizes, baseline["seed"], args.min_repeats, args.max_seconds, args.methods)
+    regressions = compare(baseline, current, args.time_tolerance, args.query_tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print("No regressions against the baseline")
+    return 1 if regressions else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def common(sub):
+        sub.add_argument("--min-repeats", type=int, default=5)
+        sub.add_argument("--max-seconds", type=float, default=1.0, help="Time budget per method and size")
+        sub.add_argument("--methods", nargs="+", help="Only run these methods")
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("--sizes", nargs="+", choices=SCALES, default=list(DEFAULT_SIZES))
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--output", help="Write results to this JSON file")
+    run_parser.add_argument("--save-baseline", action="store_true", help=f"Overwrite {BASELINE_PATH}")
+    common(run_parser)
+    run_parser.set_defaults(func=command_run)
+
+    compare_parser = commands.add_parser("compare", help="Flag regressions against the baseline")
+    compare_parser.add_argument("--baseline", default=BASELINE_PATH)
+    compare_parser.add_argument("--results", help="Compare this results file instead of running")
+    compare_parser.add_argument("--time-tolerance", type=float, default=0.25)
+    compare_parser.add_argument("--query-tolerance", type=float, default=0.0)
+    common(compare_parser)
+    compare_parser.set_defaults(func=command_compare)
+
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    sys.exit(args.func(args))
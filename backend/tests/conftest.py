@@ -8,6 +8,15 @@ import os
 import tempfile
 
 
+def pytest_collection_modifyitems(config, items):
+    if os.environ.get("RUN_SLOW_TESTS"):
+        return
+    skip = pytest.mark.skip(reason="slow; set RUN_SLOW_TESTS=1 to run")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip)
+
+
 @pytest.fixture(scope="session")
 def test_db_path():
     # Create a temporary database file
@@ -28,9 +37,20 @@ def test_db(test_db_path):
     DB.connect()
 
     # Create tables
-    from app.models.project import Project, ProjectMember
-    from app.models.task import Task
-    DB.create_tables([User, AuthToken, Project, ProjectMember, Task])
+    from app.models.project import Project, ProjectMember, ProjectImport
+    from app.models.task import Task, TaskClosure, TaskDependency, TaskStatusTransition
+    from app.models.cache import CacheEntry
+    from app.models.analytics import ProjectStatusDay, RollupWatermark
+    from app.models.comment import Comment
+    from app.models.sync import ChangeLog, EventStream
+    DB.create_tables([
+        User, AuthToken, Project, ProjectMember, ProjectImport, Task, TaskClosure, TaskDependency, TaskStatusTransition,
+        CacheEntry, ProjectStatusDay, RollupWatermark, Comment, ChangeLog, EventStream
+    ])
+    from app.db.relational import Changes, Tasks
+    Tasks.create_interval_index()
+    Tasks.create_hierarchy_index()
+    Changes.create_triggers()
 
     yield DB
 
@@ -0,0 +1,159 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.db import database
+from app.db.slow_query import SlowQueryLog, redact_params
+
+
+@pytest.fixture
+def slow_query_log(tmp_path):
+    log = SlowQueryLog(
+        str(tmp_path / "slow_queries.log"),
+        threshold_ms=0,
+        max_bytes=1024 * 1024,
+        backup_count=1
+    )
+    previous = database.SlowQueries
+    log.install(database.DB)
+    database.SlowQueries = log
+    yield log
+    log.uninstall(database.DB)
+    database.SlowQueries = previous
+
+
+def test_redact_params():
+    sql = 'SELECT * FROM "authtoken" AS "t1" WHERE (("t1"."token" = ?) AND ("t1"."user_id" = ?))'
+    assert redact_params(sql, ["abc", "user-1"]) == ["***", "user-1"]
+
+    sql = 'INSERT INTO "user" ("id", "username", "password") VALUES (?, ?, ?)'
+    assert redact_params(sql, ["1", "a@b.com", "$2b$12$abcdef"]) == ["1", "a@b.com", "***"]
+
+
+def test_slow_queries(client: TestClient, admin_token, slow_query_log):
+    response = client.get(
+        "/api/v1/projects/",
+        headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == 200
+
+    response = client.get(
+        "/api/v1/admin/slow-queries",
+        headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == 200
+    stats = response.json()
+    assert len(stats) > 0
+    assert stats[0]["total_ms"] >= stats[-1]["total_ms"]
+    assert any(s["caller"] == "UsersTable.get_user_by_token" for s in stats)
+    assert any(s["plan"] for s in stats)
+    # Bearer tokens never reach the log file
+    with open(slow_query_log.path) as f:
+        assert admin_token not in f.read()
+
+
+def test_slow_queries_unauthorized(client: TestClient, user_token):
+    response = client.get(
+        "/api/v1/admin/slow-queries",
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 401
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    from app.services.profiling import Profiles
+    monkeypatch.setattr(Profiles, "directory", str(tmp_path / "profiles"))
+    return Profiles.directory
+
+
+def test_request_profile(client: TestClient, admin_token, profile_dir):
+    response = client.get(
+        "/api/v1/projects/",
+        headers={"Authorization": f"Bearer {admin_token}", "X-Profile": "1"}
+    )
+    assert response.status_code == 200
+    profile_url = response.headers["X-Profile-Url"]
+
+    response = client.get(profile_url, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert "get_projects" in response.text
+
+    response = client.get(
+        profile_url,
+        params={"format": "folded"},
+        headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == 200
+
+    response = client.get("/api/v1/admin/profiles", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert response.json()[0]["path"] == "/api/v1/projects/"
+
+
+def test_request_profile_requires_admin(client: TestClient, user_token, profile_dir):
+    response = client.get(
+        "/api/v1/projects/",
+        params={"profile": "1"},
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 200
+    assert "X-Profile-Url" not in response.headers
+
+
+def test_overlapping_profiles(profile_dir, monkeypatch):
+    import asyncio
+    from app.services.profiling import ProfilingMiddleware
+    monkeypatch.setattr(ProfilingMiddleware, "_is_admin", staticmethod(lambda scope: True))
+    running, overlapped = set(), []
+
+    async def app(scope, receive, send):
+        running.add(scope["path"])
+        overlapped.append(len(running) > 1)
+        await asyncio.sleep(0.02)
+        running.discard(scope["path"])
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def request(middleware, path):
+        headers = []
+        scope = {"type": "http", "method": "GET", "path": path, "headers": [(b"x-profile", b"1")]}
+        await middleware(scope, None, lambda message: asyncio.sleep(0, headers.extend(message.get("headers", []))))
+        return dict(headers)[b"x-profile-id"].decode()
+
+    async def main():
+        middleware = ProfilingMiddleware(app)
+        return await asyncio.gather(request(middleware, "/a"), request(middleware, "/b"))
+
+    ids = asyncio.run(main())
+    # Profiled requests take turns, and each keeps its own profile
+    assert overlapped == [False, False]
+    from app.services.profiling import Profiles
+    assert sorted(m["path"] for m in Profiles.list() if m["id"] in ids) == ["/a", "/b"]
+
+
+def test_memory_tracing(client: TestClient, admin_token, monkeypatch):
+    from app.services.memory import Memory
+    monkeypatch.setattr(Memory, "sample_rate", 1.0)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    response = client.post("/api/v1/admin/memory/start", headers=headers)
+    assert response.status_code == 200
+    try:
+        base = client.post("/api/v1/admin/memory/snapshots", headers=headers).json()
+        response = client.get("/api/v1/projects/", headers=headers)
+        assert response.status_code == 200
+        current = client.post("/api/v1/admin/memory/snapshots", headers=headers).json()
+
+        response = client.get(
+            "/api/v1/admin/memory/diff",
+            params={"base": base["id"], "current": current["id"], "group_by": "filename"},
+            headers=headers
+        )
+        assert response.status_code == 200
+        assert isinstance(response.json(), list)
+
+        response = client.get("/api/v1/admin/memory/requests", headers=headers)
+        assert response.status_code == 200
+        assert any(r["route"] == "GET /api/v1/projects/" for r in response.json())
+    finally:
+        response = client.post("/api/v1/admin/memory/stop", headers=headers)
+        assert response.status_code == 200
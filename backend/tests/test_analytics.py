@@ -0,0 +1,124 @@
+import sqlite3
+from datetime import date, datetime, timedelta
+import numpy as np
+from fastapi.testclient import TestClient
+from app.db.database import DB
+from app.db.relational import StatusHistory
+from app.models.task import TaskStatusTransition
+from app.services.analytics import duration_stats, status_flow, to_julian_day, weekly_completions
+from tests.test_tasks import create_test_project
+
+
+def test_status_flow_and_throughput():
+    monday = date(2026, 3, 2)
+    buckets = [
+        (to_julian_day(monday), "pending", 3, 0),
+        (to_julian_day(monday + timedelta(days=1)), "pending", 0, 1),
+        (to_julian_day(monday + timedelta(days=1)), "completed", 1, 0),
+        (to_julian_day(monday + timedelta(days=8)), "pending", 0, 1),
+        (to_julian_day(monday + timedelta(days=8)), "completed", 1, 0),
+        (to_julian_day(monday + timedelta(days=30)), "pending", 5, 0),
+    ]
+    # Earlier buckets form the opening balance; later ones are ignored
+    flow = status_flow(buckets, monday + timedelta(days=2), monday + timedelta(days=9))
+    assert flow["statuses"] == ["pending", "completed"]
+    assert len(flow["days"]) == 8
+    assert flow["counts"][:, 0].tolist() == [2] * 6 + [1, 1]
+    assert flow["counts"][:, 1].tolist() == [1] * 6 + [2, 2]
+
+    assert weekly_completions(buckets, monday + timedelta(days=2), monday + timedelta(days=9)) == [
+        (monday, 1), (monday + timedelta(days=7), 1)
+    ]
+
+    stats = duration_stats(np.array([0.5, 1.5, np.nan, 2.5, 100.0]))
+    assert stats["count"] == 4
+    assert stats["p50"] == 2.0
+    assert stats["histogram"][:3] == [1, 1, 1]
+    assert len(stats["histogram"]) == 61 and stats["histogram"][-1] == 1
+
+
+def test_project_analytics(client: TestClient, admin_token, user_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    project = create_test_project(client, admin_token)
+    tasks = []
+    for _ in range(3):
+        response = client.post(
+            "/api/v1/tasks/",
+            headers=headers,
+            json={
+                "name": "Task",
+                "description": "",
+                "project_id": project["id"],
+                "start_date": datetime.now().isoformat(),
+                "deadline": (datetime.now() + timedelta(days=2)).isoformat()
+            }
+        )
+        assert response.status_code == 200
+        tasks.append(response.json())
+    for status in ("in_progress", "completed"):
+        client.put(f"/api/v1/tasks/{tasks[0]['id']}", headers=headers, json={"status": status})
+    client.put(f"/api/v1/tasks/{tasks[1]['id']}", headers=headers, json={"status": "in_progress"})
+    # Saving without a status change adds nothing to the log
+    client.put(f"/api/v1/tasks/{tasks[1]['id']}", headers=headers, json={"name": "Renamed"})
+    assert client.delete(f"/api/v1/tasks/{tasks[2]['id']}", headers=headers).status_code == 200
+
+    log = [
+        (row.from_status, row.to_status)
+        for row in TaskStatusTransition.select().where(TaskStatusTransition.task_id == tasks[0]["id"])
+        .order_by(TaskStatusTransition.id)
+    ]
+    assert log == [(None, "pending"), ("pending", "in_progress"), ("in_progress", "completed")]
+    assert TaskStatusTransition.select().where(
+        (TaskStatusTransition.task_id == tasks[2]["id"]) & TaskStatusTransition.to_status.is_null()
+    ).count() == 1
+
+    response = client.get(f"/api/v1/analytics/{project['id']}", headers=headers)
+    assert response.status_code == 200
+    analytics = response.json()
+    today = date.today().isoformat()
+    assert analytics["days"] == [today]
+    assert analytics["cumulative_flow"] == {"pending": [0], "in_progress": [1], "completed": [1]}
+    assert analytics["scope"] == [2]
+    assert analytics["remaining"] == [1]
+    assert sum(week["completed"] for week in analytics["throughput"]) == 1
+    assert analytics["cycle_time"]["count"] == 1
+    assert analytics["lead_time"]["count"] == 1
+    assert analytics["cycle_time"]["histogram"] == [1]
+
+    # The rollup only reads what was logged since the last refresh
+    assert StatusHistory.refresh_status_days() == 0
+    # ... and with nothing new it does not wait for the write lock
+    writer = sqlite3.connect(DB.database)
+    try:
+        writer.execute("BEGIN IMMEDIATE")
+        assert StatusHistory.refresh_status_days() == 0
+    finally:
+        writer.rollback()
+        writer.close()
+
+    etag = response.headers["ETag"]
+    response = client.get(
+        f"/api/v1/analytics/{project['id']}", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+    # Reopening a task takes it out of the completed work
+    client.put(f"/api/v1/tasks/{tasks[0]['id']}", headers=headers, json={"status": "in_progress"})
+    assert StatusHistory.refresh_status_days() == 1
+    response = client.get(
+        f"/api/v1/analytics/{project['id']}", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    analytics = response.json()
+    assert analytics["cumulative_flow"]["completed"] == [0]
+    assert analytics["remaining"] == [2]
+    assert analytics["cycle_time"]["count"] == 0
+
+    response = client.get(
+        f"/api/v1/analytics/{project['id']}?from=2026-02-01&to=2026-01-01", headers=headers
+    )
+    assert response.status_code == 400
+    response = client.get(
+        f"/api/v1/analytics/{project['id']}", headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 403
@@ -0,0 +1,60 @@
+from fastapi.testclient import TestClient
+from app.services.cache import VersionedCache, GanttCache
+from tests.test_tasks import create_test_project, create_test_task
+
+
+def test_versioned_cache_lru(test_db):
+    cache = VersionedCache("test-lru", max_bytes=10)
+    cache.put("a", 1, b"aaaa")
+    cache.put("b", 1, b"bbbb")
+    assert cache.get("a", 1) == b"aaaa"  # a is now most recently used
+    cache.put("c", 1, b"cccc")
+
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == b"aaaa"
+    assert cache.get("c", 1) == b"cccc"
+    # A newer version never sees the old payload
+    assert cache.get("a", 2) is None
+    stats = cache.stats()
+    assert stats["bytes"] <= 10
+    assert stats["evictions"] == 1
+
+
+def test_versioned_cache_shared_between_workers(test_db):
+    worker_1 = VersionedCache("test-shared", max_bytes=1024, shared_max_bytes=10)
+    worker_2 = VersionedCache("test-shared", max_bytes=1024, shared_max_bytes=10)
+    worker_1.clear()
+
+    worker_1.put("p1", 3, b"chart")
+    assert worker_2.get("p1", 3) == b"chart"
+    assert worker_2.stats()["shared_hits"] == 1
+    assert worker_2.get("p1", 4) is None
+
+    # The shared budget keeps only the newest entries
+    worker_1.put("p2", 1, b"chart")
+    worker_1.put("p3", 1, b"chart")
+    assert VersionedCache("test-shared", max_bytes=1024, shared_max_bytes=10).get("p1", 3) is None
+    worker_1.clear()
+
+
+def test_gantt_cache(client: TestClient, admin_token):
+    project = create_test_project(client, admin_token)
+    task = create_test_task(client, admin_token, project["id"])
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    first = client.get(f"/api/v1/gantt/{project['id']}", headers=headers)
+    hits = GanttCache.stats()["hits"]
+    second = client.get(f"/api/v1/gantt/{project['id']}", headers=headers)
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert GanttCache.stats()["hits"] == hits + 1
+
+    # A task write bumps the project version, so the chart is rebuilt
+    response = client.put(
+        f"/api/v1/tasks/{task['id']}",
+        headers=headers,
+        json={"status": "completed"}
+    )
+    assert response.status_code == 200
+    third = client.get(f"/api/v1/gantt/{project['id']}", headers=headers)
+    assert third.json()["tasks"][0]["progress"] == 1.0
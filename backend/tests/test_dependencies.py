@@ -0,0 +1,228 @@
+import pytest
+import time
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from app.services.scheduling import ScheduleNode, ScheduleEdge, critical_path, propagate
+from tests.test_tasks import create_test_project
+
+
+def create_task(client: TestClient, token, project_id: str, start: datetime, days: int):
+    response = client.post(
+        "/api/v1/tasks/",
+        headers={"Authorization": f"Bearer {token}"},
+        json={
+            "name": f"Task {days}d",
+            "description": "",
+            "project_id": project_id,
+            "start_date": start.isoformat(),
+            "deadline": (start + timedelta(days=days)).isoformat()
+        }
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def link(client: TestClient, token, predecessor, successor, **extra):
+    return client.post(
+        "/api/v1/dependencies/",
+        headers={"Authorization": f"Bearer {token}"},
+        json={"predecessor_id": predecessor["id"], "successor_id": successor["id"], **extra}
+    )
+
+
+def test_dependencies_and_critical_path(client: TestClient, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    project = create_test_project(client, admin_token)
+    start = datetime(2026, 3, 2)
+    design = create_task(client, admin_token, project["id"], start, 5)
+    build = create_task(client, admin_token, project["id"], start, 10)
+    docs = create_task(client, admin_token, project["id"], start, 3)
+
+    assert link(client, admin_token, design, build).status_code == 200
+    response = link(client, admin_token, design, docs, type="SS", lag_days=1)
+    assert response.status_code == 200
+    docs_link = response.json()
+
+    # Self links, duplicates and cycles are rejected
+    assert link(client, admin_token, design, design).status_code == 400
+    assert link(client, admin_token, design, build).status_code == 400
+    response = link(client, admin_token, build, design)
+    assert response.status_code == 400
+    assert "cycle" in response.json()["detail"]
+
+    response = client.get(f"/api/v1/dependencies/?project_id={project['id']}", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+    chart = {t["id"]: t for t in client.get(f"/api/v1/gantt/{project['id']}", headers=headers).json()["tasks"]}
+    assert chart[build["id"]]["dependencies"] == [design["id"]]
+    assert chart[design["id"]]["critical"] and chart[build["id"]]["critical"]
+    assert not chart[docs["id"]]["critical"]
+    # Build ends on day 15; docs can start on day 1 and take 3 days
+    assert chart[docs["id"]]["slack"] == 11
+
+    response = client.delete(f"/api/v1/dependencies/{docs_link['id']}", headers=headers)
+    assert response.status_code == 200
+    chart = {t["id"]: t for t in client.get(f"/api/v1/gantt/{project['id']}", headers=headers).json()["tasks"]}
+    assert chart[docs["id"]]["dependencies"] == []
+    assert chart[docs["id"]]["slack"] == 12
+
+
+def test_critical_path_through_subtasks(client: TestClient, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    project = create_test_project(client, admin_token)
+    start = datetime(2026, 3, 2)
+    design = create_task(client, admin_token, project["id"], start, 10)
+    phase = create_task(client, admin_token, project["id"], start, 30)
+
+    def subtask(parent, days):
+        response = client.post("/api/v1/tasks/", headers=headers, json={
+            "name": f"Subtask {days}d", "description": "", "project_id": project["id"],
+            "parent_task_id": parent["id"], "start_date": start.isoformat(),
+            "deadline": (start + timedelta(days=days)).isoformat()
+        })
+        assert response.status_code == 200
+        return response.json()
+
+    step = subtask(subtask(phase, 30), 5)
+    assert link(client, admin_token, design, step).status_code == 200
+
+    # The depth-2 task is a bar of its own, with the same slack with or without a window
+    full = {t["id"]: t for t in client.get(f"/api/v1/gantt/{project['id']}", headers=headers).json()["tasks"]}
+    windowed = {t["id"]: t for t in client.get(
+        f"/api/v1/gantt/{project['id']}", headers=headers,
+        params={"from": start.isoformat(), "to": (start + timedelta(days=60)).isoformat()}
+    ).json()["tasks"]}
+    assert full.keys() == windowed.keys()
+    assert full[step["id"]]["dependencies"] == [design["id"]]
+    # Step runs days 10-15 after design; phase ends on day 30
+    assert full[step["id"]]["slack"] == windowed[step["id"]]["slack"] == 15
+    assert full[design["id"]]["slack"] == windowed[design["id"]]["slack"] == 15
+
+
+def test_dependencies_require_project_manager(client: TestClient, admin_token, user_token):
+    project = create_test_project(client, admin_token)
+    first = create_task(client, admin_token, project["id"], datetime(2026, 3, 2), 1)
+    second = create_task(client, admin_token, project["id"], datetime(2026, 3, 2), 1)
+    assert link(client, user_token, first, second).status_code == 403
+
+
+def test_critical_path_dependency_types():
+    day = datetime(2026, 1, 1)
+    nodes = [
+        ScheduleNode("a", day, day + timedelta(days=4)),
+        ScheduleNode("b", day, day + timedelta(days=2)),
+        ScheduleNode("c", day, day + timedelta(days=1)),
+    ]
+    # b must finish with a (days 2-4), c starts 2 days after b (days 4-5)
+    edges = [ScheduleEdge("a", "b", "FF"), ScheduleEdge("b", "c", "SS", 2)]
+    schedule = critical_path(nodes, edges)
+    assert schedule.critical == {"a": True, "b": True, "c": True}
+    assert schedule.finish - nodes[0].start.timestamp() / 86400 == 5
+
+    # Without the links every shorter task has slack up to a's finish
+    schedule = critical_path(nodes, [])
+    assert schedule.slack == {"a": 0, "b": 2, "c": 3}
+
+
+def long_chain(count):
+    """A chain of one-day tasks with extra links that skip ahead: every task is critical."""
+    day = datetime(2026, 1, 1)
+    nodes = [ScheduleNode(str(i), day, day + timedelta(days=1)) for i in range(count)]
+    edges = [ScheduleEdge(str(i), str(i + 1)) for i in range(count - 1)]
+    edges += [ScheduleEdge(str(i), str(i + 7)) for i in range(0, count - 7, 3)]
+    return nodes, edges
+
+
+def test_critical_path_long_chain():
+    schedule = critical_path(*long_chain(10000))
+    assert all(schedule.critical.values())
+
+
+@pytest.mark.slow
+def test_critical_path_scales_linearly():
+    nodes, edges = long_chain(10000)
+    started = time.perf_counter()
+    critical_path(nodes, edges)
+    assert time.perf_counter() - started < 1.0
+
+
+def test_cascade_date_change(client: TestClient, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    project = create_test_project(client, admin_token)
+    day = datetime(2026, 5, 4)
+    first = create_task(client, admin_token, project["id"], day, 2)
+    second = create_task(client, admin_token, project["id"], day + timedelta(days=2), 3)
+    third = create_task(client, admin_token, project["id"], day + timedelta(days=6), 1)
+    other = create_task(client, admin_token, project["id"], day, 1)
+    assert link(client, admin_token, first, second).status_code == 200
+    assert link(client, admin_token, second, third, lag_days=1).status_code == 200
+
+    new_deadline = (day + timedelta(days=4)).isoformat()
+    # Without cascade nothing else moves
+    response = client.put(f"/api/v1/tasks/{first['id']}", headers=headers, json={"deadline": new_deadline})
+    assert response.status_code == 200
+    assert response.json()["shifted_task_ids"] == []
+
+    response = client.put(
+        f"/api/v1/tasks/{first['id']}?cascade=true",
+        headers=headers,
+        json={"deadline": new_deadline}
+    )
+    assert response.status_code == 200
+    assert response.json()["shifted_task_ids"] == [second["id"], third["id"]]
+
+    def dates(task):
+        data = client.get(f"/api/v1/tasks/{task['id']}", headers=headers).json()
+        return datetime.fromisoformat(data["start_date"]), datetime.fromisoformat(data["deadline"])
+
+    assert dates(second) == (day + timedelta(days=4), day + timedelta(days=7))
+    assert dates(third) == (day + timedelta(days=8), day + timedelta(days=9))
+    assert dates(other) == (day, day + timedelta(days=1))
+
+    # Completed and started work keeps its dates; what follows is scheduled from them
+    client.put(f"/api/v1/tasks/{second['id']}", headers=headers, json={"status": "in_progress"})
+    new_deadline = (day + timedelta(days=6)).isoformat()
+    response = client.put(
+        f"/api/v1/tasks/{first['id']}?cascade=true", headers=headers, json={"deadline": new_deadline}
+    )
+    assert response.json()["shifted_task_ids"] == []
+    assert dates(second) == (day + timedelta(days=4), day + timedelta(days=7))
+    response = client.put(
+        f"/api/v1/tasks/{first['id']}?cascade=true&move_started=true", headers=headers, json={"deadline": new_deadline}
+    )
+    assert response.json()["shifted_task_ids"] == [second["id"], third["id"]]
+    assert dates(third) == (day + timedelta(days=10), day + timedelta(days=11))
+
+    client.put(f"/api/v1/tasks/{third['id']}", headers=headers, json={"status": "completed"})
+    response = client.put(
+        f"/api/v1/tasks/{first['id']}?cascade=true&move_started=true",
+        headers=headers, json={"deadline": (day + timedelta(days=8)).isoformat()}
+    )
+    assert response.json()["shifted_task_ids"] == [second["id"]]
+    assert dates(third) == (day + timedelta(days=10), day + timedelta(days=11))
+
+
+def large_graph(day, count):
+    """A back-to-back chain whose first task has just grown by two days."""
+    dates = {str(i): (day + timedelta(days=i), day + timedelta(days=i + 1)) for i in range(count)}
+    edges = [ScheduleEdge(str(i), str(i + 1)) for i in range(count - 1)]
+    edges += [ScheduleEdge(str(i), str(i + 2), "SS", 1) for i in range(count - 2)]
+    dates["0"] = (day, day + timedelta(days=3))
+    return dates, edges
+
+
+def test_propagate_large_graph():
+    day = datetime(2026, 1, 1)
+    count = 5000
+    shifted = propagate(*large_graph(day, count), "0")
+    assert len(shifted) == count - 1
+    assert shifted[str(count - 1)][0] == day + timedelta(days=count + 1)
+
+
+@pytest.mark.slow
+def test_propagate_large_graph_time():
+    dates, edges = large_graph(datetime(2026, 1, 1), 5000)
+    started = time.perf_counter()
+    propagate(dates, edges, "0")
+    assert time.perf_counter() - started < 1.0
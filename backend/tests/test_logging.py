@@ -0,0 +1,63 @@
+import json
+import logging
+from fastapi.testclient import TestClient
+from app.core.structured_logging import JsonFormatter, queued, request_id_var
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+def test_request_id_header(client: TestClient):
+    response = client.get("/", headers={"X-Request-ID": "abc-123"})
+    assert response.headers["X-Request-ID"] == "abc-123"
+
+    response = client.get("/", headers={"X-Request-ID": "not valid!"})
+    assert response.headers["X-Request-ID"] != "not valid!"
+
+
+def test_queued_json_logging():
+    target = ListHandler()
+    target.setFormatter(JsonFormatter())
+    handler = queued(target)
+    logger = logging.getLogger("tests.structured")
+    logger.addHandler(handler)
+    token = request_id_var.set("req-1")
+    try:
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("Error deleting %s", "task", extra={"task_id": "t1"})
+    finally:
+        request_id_var.reset(token)
+        logger.removeHandler(handler)
+        handler.close()
+
+    entry = json.loads(target.lines[0])
+    assert entry["msg"] == "Error deleting task"
+    assert entry["request_id"] == "req-1"
+    assert entry["task_id"] == "t1"
+    assert "ValueError: boom" in entry["exc"]
+
+
+def test_queued_drain():
+    target = ListHandler()
+    handler = queued(target)
+    thread = handler.listener._thread
+    logger = logging.getLogger("tests.drain")
+    logger.addHandler(handler)
+    try:
+        for i in range(100):
+            logger.warning("record %d", i)
+        handler.drain()
+        assert len(target.lines) == 100
+        # Flushed in place: the listener keeps running on the same thread
+        assert handler.listener._thread is thread and thread.is_alive()
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
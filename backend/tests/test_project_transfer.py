@@ -0,0 +1,288 @@
+import csv
+import json
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from app.db.relational import Projects
+from tests.test_tasks import create_test_project
+
+START = datetime(2026, 3, 2, 9, 0)
+
+
+def export(client, token, project_id, format="ndjson"):
+    response = client.get(
+        f"/api/v1/projects/{project_id}/export",
+        headers={"Authorization": f"Bearer {token}"},
+        params={"format": format}
+    )
+    assert response.status_code == 200, response.text
+    return response
+
+
+def import_plan(client, token, content, format, **params):
+    response = client.post(
+        "/api/v1/projects/import",
+        headers={"Authorization": f"Bearer {token}"},
+        params={"format": format, **params},
+        content=content
+    )
+    assert response.status_code == 202, response.text
+    # The test client runs the background import before returning
+    response = client.get(
+        f"/api/v1/projects/imports/{response.json()['id']}", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def records(response):
+    return [json.loads(line) for line in response.iter_lines() if line]
+
+
+def links(lines):
+    """(predecessor name, successor name, type, lag) of each dependency record."""
+    names = {record["id"]: record["name"] for record in lines if record["type"] == "task"}
+    return sorted(
+        (names[r["predecessor_id"]], names[r["successor_id"]], r["dependency_type"], r["lag_days"])
+        for r in lines if r["type"] == "dependency"
+    )
+
+
+def outline(lines):
+    """(depth, name, description, status, dates, assignee) of each task, in export order."""
+    depth = {}
+    rows = []
+    for record in lines:
+        if record["type"] == "task":
+            depth[record["id"]] = depth[record["parent_id"]] + 1 if record["parent_id"] else 0
+            rows.append((
+                depth[record["id"]], record["name"], record["description"], record["status"],
+                record["start_date"], record["deadline"], record["assignee"]
+            ))
+    return rows
+
+
+def test_project_export_import(client: TestClient, admin_token, user_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    project = create_test_project(client, admin_token)
+
+    def new(name, ref, parent=None, days=0, **fields):
+        return {
+            "name": name, "description": fields.pop("description", ""), "project_id": project["id"],
+            "ref": ref, "parent_task_id": parent,
+            "start_date": (START + timedelta(days=days)).isoformat(),
+            "deadline": (START + timedelta(days=days + 2)).isoformat(), **fields
+        }
+
+    admin_id = client.get("/api/v1/userinfo/", headers=headers).json()["id"]
+    response = client.post("/api/v1/tasks/batch", headers=headers, json={"create": [
+        new("Design", "a", description='Specs <draft> & "notes",\nsecond line'),
+        new("Wireframes", "a1", "a", assigned_to_id=admin_id),
+        new("Review", "a2", "a", days=2),
+        new("Sign-off ✓", "a2x", "a2", days=3),
+        new("Build", "b", days=5),
+    ]})
+    assert response.status_code == 200
+    ids = response.json()["ids"]
+    for ref in ("a1", "b"):
+        client.put(f"/api/v1/tasks/{ids[ref]}", headers=headers, json={"status": "in_progress"})
+    client.put(f"/api/v1/tasks/{ids['a1']}", headers=headers, json={"status": "completed"})
+    client.post("/api/v1/comments/", headers=headers, json={"task_id": ids["a2x"], "content": "Looks good"})
+    # Review waits on Wireframes, and on Build further down the outline
+    for predecessor, successor, extra in (("a1", "a2", {"lag_days": 1}), ("b", "a2", {"type": "SS", "lag_days": 0.5})):
+        response = client.post("/api/v1/dependencies/", headers=headers, json={
+            "predecessor_id": ids[predecessor], "successor_id": ids[successor], **extra
+        })
+        assert response.status_code == 200
+
+    original = records(export(client, admin_token, project["id"]))
+    assert original[0]["type"] == "project" and original[0]["name"] == "Test Project"
+    assert {"type": "member", "user": "admin@test.com", "role": "project_manager"} in original
+    expected = outline(original)
+    # Outline order: every subtask follows its parent, subtrees stay together
+    assert [(depth, name) for depth, name, *_ in expected] == [
+        (0, "Design"), (1, "Wireframes"), (1, "Review"), (2, "Sign-off ✓"), (0, "Build")
+    ]
+    assert expected[1][3] == "completed" and expected[1][6] == "admin@test.com"
+    assert links(original) == [("Build", "Review", "SS", 0.5), ("Wireframes", "Review", "FS", 1)]
+
+    for format in ("ndjson", "csv", "msproject"):
+        response = export(client, admin_token, project["id"], format)
+        assert response.headers["X-Task-Count"] == "5"
+        assert response.headers["Content-Disposition"].startswith('attachment; filename="Test_Project.')
+        job = import_plan(client, admin_token, response.content, format, name=f"Copy ({format})")
+        assert job["status"] == "completed", job
+        assert job["tasks_total"] == job["tasks_written"] == 5
+        assert job["bytes_read"] == job["bytes_total"] == len(response.content)
+
+        copy = records(export(client, admin_token, job["project_id"]))
+        assert copy[0]["name"] == f"Copy ({format})"
+        assert outline(copy) == expected
+        # CSV has no place for links
+        assert links(copy) == (links(original) if format != "csv" else [])
+        tasks = [record for record in copy if record["type"] == "task"]
+        if format != "msproject":
+            # MS Project files carry no rank; the outline order stands in for it
+            assert [t["rank"] for t in tasks] == [r["rank"] for r in original if r["type"] == "task"]
+        comments = [record for record in copy if record["type"] == "comment"]
+        if format == "ndjson":
+            assert [(c["content"], c["user"]) for c in comments] == [("Looks good", "admin@test.com")]
+            assert comments[0]["task_id"] == tasks[3]["id"]
+        # Progress rolls up through the imported hierarchy as for tasks made in the app
+        assert [t["progress"] for t in tasks] == [r["progress"] for r in original if r["type"] == "task"]
+        Projects.delete_project(job["project_id"])
+
+    # Other people's plans and imports stay private
+    user_headers = {"Authorization": f"Bearer {user_token}"}
+    assert client.get(f"/api/v1/projects/{project['id']}/export", headers=user_headers).status_code == 403
+    response = client.post(
+        "/api/v1/projects/import", headers=headers, params={"format": "csv"}, content=b"name\nOne task\n"
+    )
+    assert client.get(f"/api/v1/projects/imports/{response.json()['id']}", headers=user_headers).status_code == 404
+    Projects.delete_project(Projects.get_import(response.json()["id"]).project_id)
+    response = client.post("/api/v1/projects/import", headers=headers, content=b"name\nOne task\n")
+    assert response.status_code == 400
+
+
+def test_import_roles_and_authors_need_admin(client: TestClient, admin_token, user_token):
+    plan = "\n".join(json.dumps(record) for record in (
+        {"type": "project", "name": "Shared plan"},
+        {"type": "member", "user": "admin@test.com", "role": "project_manager"},
+        {"type": "task", "id": "a", "name": "Task a"},
+        {"type": "comment", "task_id": "a", "user": "admin@test.com", "content": "Approved"},
+    )).encode()
+
+    # A plain user cannot hand out management rights or write as someone else
+    job = import_plan(client, user_token, plan, "ndjson")
+    assert job["status"] == "completed", job
+    lines = records(export(client, user_token, job["project_id"]))
+    assert {(r["user"], r["role"]) for r in lines if r["type"] == "member"} == {
+        ("admin@test.com", "project_member"), ("user@test.com", "project_manager")
+    }
+    assert [(r["user"], r["content"]) for r in lines if r["type"] == "comment"] == [("user@test.com", "Approved")]
+    Projects.delete_project(job["project_id"])
+
+    # An admin restoring a plan keeps them
+    job = import_plan(client, admin_token, plan, "ndjson")
+    lines = records(export(client, admin_token, job["project_id"]))
+    assert [(r["user"], r["content"]) for r in lines if r["type"] == "comment"] == [("admin@test.com", "Approved")]
+    assert ("admin@test.com", "project_manager") in {(r["user"], r["role"]) for r in lines if r["type"] == "member"}
+    Projects.delete_project(job["project_id"])
+
+
+def test_import_rejects_invalid_plans(client: TestClient, admin_token):
+    projects = len(Projects.get_all_projects())
+
+    def task(ref, parent=None, **fields):
+        return json.dumps({"type": "task", "id": ref, "parent_id": parent, "name": f"Task {ref}", **fields})
+
+    def link(predecessor, successor, **fields):
+        return json.dumps({"type": "dependency", "predecessor_id": predecessor, "successor_id": successor, **fields})
+
+    for lines, error in (
+        ([task("a", "b"), task("b", "a")], "cycle"),
+        ([task("a", "missing")], "unknown parent"),
+        ([task("a"), task("a")], "unique"),
+        ([task("b", "a"), task("a", status="completed")], "Task a is completed but has an incomplete subtask b"),
+        ([task("a", status="done")], "Line 1: Unknown status"),
+        ([task("a", start_date="next week")], "Line 1: 'next week' is not an ISO 8601 date"),
+        ([task("a"), "{not json"], "Line 2: not valid JSON"),
+        ([task("a"), task("b"), link("a", "b"), link("b", "a")], "links have a cycle"),
+        ([task("a"), link("a", "missing")], "needs two different, known tasks"),
+        ([task("a"), task("b"), link("a", "b"), link("a", "b", dependency_type="SS")], "linked only once"),
+        ([task("a"), task("b"), link("a", "b", dependency_type="XX")], "Line 3: Unknown dependency type"),
+        ([task(str(i), str(i - 1) if i else None) for i in range(12)], "nested"),
+    ):
+        job = import_plan(client, admin_token, "\n".join(lines).encode(), "ndjson")
+        assert job["status"] == "failed" and error in job["error"], (error, job)
+        assert job["project_id"] is None
+    job = import_plan(client, admin_token, b"<Project><Tasks><Task>", "msproject")
+    assert job["status"] == "failed"
+    # Nothing is written until the whole file checks out
+    assert len(Projects.get_all_projects()) == projects
+
+    # Rows may come before their parents; CSV rows without ids are numbered
+    job = import_plan(
+        client, admin_token,
+        b"Name,Parent_ID,ID,Deadline\nLeaf,p,,\nParent,,p,2026-04-01T17:00:00\n",
+        "csv", name="From a spreadsheet"
+    )
+    assert job["status"] == "completed", job
+    lines = records(export(client, admin_token, job["project_id"]))
+    assert [(r["name"], r["parent_id"] is None) for r in lines if r["type"] == "task"] == [
+        ("Parent", True), ("Leaf", False)
+    ]
+    Projects.delete_project(job["project_id"])
+
+
+@pytest.mark.slow
+def test_large_plan_round_trip(client: TestClient, admin_token, monkeypatch):
+    # 100k tasks: 20k top-level tasks, each with two subtasks holding one subtask each
+    roots = 20000
+
+    def plan():
+        yield json.dumps({"type": "project", "name": "Large plan"}).encode() + b"\n"
+        chunk = []
+        for r in range(roots):
+            status = "completed" if r % 3 == 0 else "pending"
+            chunk.append({"id": f"r{r}", "name": f"r{r}", "status": status})
+            for c in range(2):
+                chunk.append({"id": f"r{r}.{c}", "parent_id": f"r{r}", "name": f"r{r}.{c}", "status": status})
+                chunk.append({"id": f"r{r}.{c}.0", "parent_id": f"r{r}.{c}", "name": f"r{r}.{c}.0",
+                              "status": status, "start_date": (START + timedelta(days=r % 30)).isoformat()})
+            if len(chunk) >= 5000:
+                yield b"".join(json.dumps({"type": "task", **t}).encode() + b"\n" for t in chunk)
+                chunk = []
+        yield b"".join(json.dumps({"type": "task", **t}).encode() + b"\n" for t in chunk)
+
+    progress = []
+    update_import = Projects.update_import
+
+    def record_progress(import_id, **fields):
+        if "tasks_written" in fields:
+            progress.append(fields["tasks_written"])
+        update_import(import_id, **fields)
+
+    monkeypatch.setattr(Projects, "update_import", record_progress)
+    job = import_plan(client, admin_token, plan(), "ndjson")
+    assert job["status"] == "completed", job
+    assert job["tasks_total"] == job["tasks_written"] == 5 * roots
+    # Written level by level in batches, reporting after each
+    assert progress == sorted(progress) and progress[-1] == 5 * roots and len(progress) >= 50
+
+    def expected(count):
+        """Name and parent name of the count-th task in outline order."""
+        r, rest = divmod(count, 5)
+        name = f"r{r}" + ("", ".0", ".0.0", ".1", ".1.0")[rest]
+        return name, name.rsplit(".", 1)[0] if "." in name else None
+
+    def check_outline(rows):
+        names, count = {}, 0
+        for task_id, parent_id, name in rows:
+            names[task_id] = name
+            assert (name, names[parent_id] if parent_id else None) == expected(count)
+            count += 1
+        assert count == 5 * roots
+
+    # Every format streams the whole plan in outline order, each subtree as in the file
+    response = export(client, admin_token, job["project_id"])
+    assert response.headers["X-Task-Count"] == str(5 * roots)
+    check_outline(
+        (record["id"], record["parent_id"], record["name"])
+        for record in map(json.loads, response.iter_lines()) if record["type"] == "task"
+    )
+    response = export(client, admin_token, job["project_id"], "csv")
+    check_outline((row[0], row[1], row[2]) for row in list(csv.reader(response.iter_lines()))[1:])
+
+    # MS Project files rebuild the hierarchy from outline levels alone
+    response = export(client, admin_token, job["project_id"], "msproject")
+    copy = import_plan(client, admin_token, response.content, "msproject")
+    assert copy["status"] == "completed" and copy["tasks_written"] == 5 * roots, copy
+    tasks = [
+        record for record in map(json.loads, export(client, admin_token, copy["project_id"]).iter_lines())
+        if record["type"] == "task"
+    ]
+    check_outline((t["id"], t["parent_id"], t["name"]) for t in tasks)
+    assert [t["status"] for t in tasks[:6]] == ["completed"] * 5 + ["pending"]
+    Projects.delete_project(copy["project_id"])
+    Projects.delete_project(job["project_id"])
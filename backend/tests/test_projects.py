@@ -102,3 +102,100 @@ def test_delete_project(client: TestClient, admin_token):
     )
     projects = response.json()
     assert not any(p["id"] == project["id"] for p in projects)
+
+
+def test_get_project_etag(client: TestClient, admin_token):
+    project = create_test_project(client, admin_token)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    response = client.get(f"/api/v1/projects/{project['id']}", headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    # Unchanged project revalidates without a body
+    response = client.get(
+        f"/api/v1/projects/{project['id']}",
+        headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+    # Any update bumps the version and invalidates the tag
+    response = client.put(
+        f"/api/v1/projects/{project['id']}",
+        headers=headers,
+        json={"name": "Renamed Project"}
+    )
+    assert response.status_code == 200
+    response = client.get(
+        f"/api/v1/projects/{project['id']}",
+        headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed Project"
+    assert response.headers["ETag"] != etag
+
+
+def test_project_board(client: TestClient, admin_token, user_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    project = create_test_project(client, admin_token)
+    start = datetime(2026, 7, 1)
+    ids = []
+    for day in range(7):
+        response = client.post(
+            "/api/v1/tasks/",
+            headers=headers,
+            json={
+                "name": f"Card {day}",
+                "description": "",
+                "project_id": project["id"],
+                "start_date": start.isoformat(),
+                "deadline": (start + timedelta(days=day)).isoformat()
+            }
+        )
+        assert response.status_code == 200
+        ids.append(response.json()["id"])
+    for task_id in ids[:5]:
+        client.put(f"/api/v1/tasks/{task_id}", headers=headers, json={"status": "completed"})
+
+    response = client.get(f"/api/v1/projects/{project['id']}/board", headers=headers, params={"limit": 2})
+    assert response.status_code == 200
+    columns = {column["status"]: column for column in response.json()["columns"]}
+    assert list(columns) == ["pending", "in_progress", "completed"]
+    assert columns["in_progress"] == {"status": "in_progress", "total": 0, "cards": [], "next_cursor": None}
+    assert columns["pending"]["total"] == 2 and columns["pending"]["next_cursor"] is None
+    completed = columns["completed"]
+    assert completed["total"] == 5
+    assert [card["name"] for card in completed["cards"]] == ["Card 0", "Card 1"]
+
+    # Page through one column; its total is still reported
+    names, cursor = [], completed["next_cursor"]
+    while cursor:
+        cursor_of_last_page = cursor
+        response = client.get(
+            f"/api/v1/projects/{project['id']}/board",
+            headers=headers,
+            params={"limit": 2, "status": "completed", "cursor": cursor}
+        )
+        [column] = response.json()["columns"]
+        assert column["total"] == 5
+        names += [card["name"] for card in column["cards"]]
+        cursor = column["next_cursor"]
+    assert names == ["Card 2", "Card 3", "Card 4"]
+
+    etag = response.headers["ETag"]
+    response = client.get(
+        f"/api/v1/projects/{project['id']}/board",
+        headers={**headers, "If-None-Match": etag},
+        params={"limit": 2, "status": "completed", "cursor": cursor_of_last_page}
+    )
+    assert response.status_code == 304
+    response = client.get(
+        f"/api/v1/projects/{project['id']}/board", headers=headers, params={"cursor": completed["next_cursor"]}
+    )
+    assert response.status_code == 400
+    response = client.get(
+        f"/api/v1/projects/{project['id']}/board", headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 403
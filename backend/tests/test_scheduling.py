@@ -0,0 +1,241 @@
+import pytest
+import time
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from app.api.v1.endpoints import scheduling as scheduling_endpoint
+from app.services.forecast import simulate
+from app.services.levelling import level, workload
+from app.db.relational import Tasks
+from app.models.task import Task as TaskModel
+from tests.test_tasks import create_test_project
+
+
+def test_level_moves_pending_tasks_around_fixed_load():
+    # Julian day 2461000.5 is a UTC midnight
+    day = 2461000.5
+    tasks = [
+        {"id": "fixed", "assignee": "u1", "start": day, "end": day + 3, "movable": False, "limit": None},
+        {"id": "a", "assignee": "u1", "start": day, "end": day + 2, "movable": True, "limit": None},
+        {"id": "b", "assignee": "u1", "start": day, "end": day + 1, "movable": True, "limit": day + 4},
+        {"id": "other", "assignee": "u2", "start": day, "end": day + 3, "movable": True, "limit": None},
+    ]
+    result = level(tasks, [("a", "other", "FS", 0)], capacity=1.0, max_days=100)
+    # b is shorter so it goes first into the free day 3; a waits until day 4
+    assert result["shifts"] == {"b": 3, "a": 4, "other": 6}
+    assert result["unresolved"] == []
+    assert result["overloaded_days_before"] == 2
+    assert result["overloaded_days_after"] == 0
+
+    # A limit that cannot be met is reported rather than silently exceeded
+    tasks[2]["limit"] = day + 2
+    assert "b" in level(tasks, [], capacity=1.0, max_days=100)["unresolved"]
+
+    report = workload(tasks, capacity=1.0, max_days=100)
+    assert report["overloads"] == [("u1", 0, 2, 3.0)]
+    assert report["overloaded_days"] == 2
+
+
+def test_levelling_propose_and_apply(client: TestClient, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    # A user of its own, so the shared test user is left without assignments
+    response = client.post(
+        "/signup",
+        json={"username": "planner@test.com", "password": "plannerpass123", "name": "Planner"}
+    )
+    assert response.status_code == 200
+    user_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    user_id = client.get("/api/v1/userinfo/", headers=user_headers).json()["id"]
+    project = create_test_project(client, admin_token)
+    response = client.post(
+        f"/api/v1/projects/{project['id']}/members",
+        headers=headers,
+        json={"user_id": user_id, "role": "project_member"}
+    )
+    assert response.status_code == 200
+
+    start = datetime.combine(datetime.now().date(), datetime.min.time()) + timedelta(days=2)
+    ids = []
+    for name in ("Fixed", "First", "Second"):
+        response = client.post(
+            "/api/v1/tasks/",
+            headers=headers,
+            json={
+                "name": name,
+                "description": "",
+                "project_id": project["id"],
+                "start_date": start.isoformat(),
+                "deadline": (start + timedelta(days=3)).isoformat(),
+                "assigned_to_id": user_id
+            }
+        )
+        assert response.status_code == 200
+        ids.append(response.json()["id"])
+    client.put(f"/api/v1/tasks/{ids[0]}", headers=headers, json={"status": "in_progress"})
+
+    response = client.get(f"/api/v1/scheduling/workload?project_id={project['id']}", headers=headers)
+    assert response.status_code == 200
+    report = response.json()
+    assert report["overloaded_days"] == 3
+    assert report["overloads"] == [{
+        "user_id": user_id,
+        "start": start.date().isoformat(),
+        "end": (start + timedelta(days=3)).date().isoformat(),
+        "peak": 3.0
+    }]
+
+    response = client.get(f"/api/v1/scheduling/level?project_id={project['id']}", headers=headers)
+    assert response.status_code == 200
+    proposal = response.json()
+    assert proposal["overloaded_days_before"] == 3
+    assert proposal["overloaded_days_after"] == 0
+    assert proposal["unresolved_task_ids"] == []
+    # The in-progress task stays put; the pending ones queue up behind it
+    assert {c["task_id"] for c in proposal["changes"]} == set(ids[1:])
+    assert sorted(c["shift_days"] for c in proposal["changes"]) == [3, 6]
+
+    # Members may look but only project managers and admins may apply
+    assert client.get(f"/api/v1/scheduling/level?project_id={project['id']}", headers=user_headers).status_code == 200
+    response = client.post("/api/v1/scheduling/level/apply", headers=user_headers, json=proposal)
+    assert response.status_code == 403
+
+    # Only the proposed shifts can be applied, not dates of the caller's choosing
+    tampered = {**proposal, "changes": [
+        {**change, "new_start_date": "2030-01-01T00:00:00"} for change in proposal["changes"]
+    ]}
+    response = client.post("/api/v1/scheduling/level/apply", headers=headers, json=tampered)
+    assert response.status_code == 400
+
+    response = client.post("/api/v1/scheduling/level/apply", headers=headers, json=proposal)
+    assert response.status_code == 200
+    response = client.get(f"/api/v1/scheduling/workload?project_id={project['id']}", headers=headers)
+    assert response.json()["overloaded_days"] == 0
+
+    # The project moved on, so the same proposal is now stale
+    response = client.post("/api/v1/scheduling/level/apply", headers=headers, json=proposal)
+    assert response.status_code == 409
+
+
+def test_levelling_requires_access(client: TestClient, admin_token, user_token):
+    project = create_test_project(client, admin_token)
+    response = client.get(
+        f"/api/v1/scheduling/workload?project_id={project['id']}",
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 403
+
+
+def test_simulate_forecast():
+    now = 2461000.5
+    tasks = [
+        {"id": "a", "start": now, "end": now + 5},
+        {"id": "b", "start": now, "end": now + 5},
+        # Started five days ago, so its overrun counts from then
+        {"id": "c", "start": now - 5, "end": now + 5, "started": True},
+    ]
+    edges = [("a", "b", "FS", 0)]
+    result = simulate(tasks, edges, [1.0], now, 1000, seed=1, deadline=now + 10)
+    assert result["planned_finish"] == now + 10
+    assert all(abs(v - (now + 10)) < 1e-3 for v in result["percentiles"].values())
+    assert result["on_time_probability"] == 1.0
+
+    # Every task takes twice as long: the chain ends on day 20, c on day 15
+    result = simulate(tasks, edges, [2.0], now, 1000, seed=1, deadline=now + 10)
+    assert abs(result["percentiles"][50] - (now + 20)) < 1e-3
+    assert result["on_time_probability"] == 0.0
+
+    # Half the draws overrun; the chain only finishes on time if both its tasks do
+    result = simulate(tasks[:2], edges, [1.0, 2.0], now, 20000, seed=1, deadline=now + 10)
+    assert 0.2 < result["on_time_probability"] < 0.3
+    assert abs(result["percentiles"][95] - (now + 20)) < 1e-3
+
+    assert simulate([], [], [1.0], now, 100, seed=1)["percentiles"] == {}
+
+
+def deep_chain(now, count):
+    """A chain is as many dependency levels as tasks; batches must not shrink with it."""
+    tasks = [{"id": str(i), "start": now, "end": now + 1} for i in range(count)]
+    edges = [(str(i), str(i + 1), "FS", 0) for i in range(count - 1)]
+    edges += [(str(i), str(i + 2), "SS", 1) for i in range(count - 2)]
+    return tasks, edges
+
+
+def test_simulate_deep_chain():
+    now = 2461000.5
+    count = 5000
+    result = simulate(*deep_chain(now, count), [1.0, 2.0], now, 5000, seed=1)
+    assert result["planned_finish"] == now + count
+    # Half the tasks overrun by a day on average
+    assert abs(result["percentiles"][50] - (now + 1.5 * count)) < 0.02 * count
+
+
+@pytest.mark.slow
+def test_simulate_deep_chain_time():
+    now = 2461000.5
+    tasks, edges = deep_chain(now, 5000)
+    started = time.perf_counter()
+    simulate(tasks, edges, [1.0, 2.0], now, 5000, seed=1)
+    assert time.perf_counter() - started < 2.0
+
+
+def test_project_forecast(client: TestClient, admin_token, user_token, monkeypatch):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    project = create_test_project(client, admin_token)
+    now = datetime.now()
+    for start, days, status in ((now - timedelta(days=10), 5, "completed"), (now, 4, None), (now, 8, None)):
+        response = client.post(
+            "/api/v1/tasks/",
+            headers=headers,
+            json={
+                "name": "Task",
+                "description": "",
+                "project_id": project["id"],
+                "start_date": start.isoformat(),
+                "deadline": (start + timedelta(days=days)).isoformat()
+            }
+        )
+        assert response.status_code == 200
+        task = response.json()
+        if status:
+            client.put(f"/api/v1/tasks/{task['id']}", headers=headers, json={"status": status})
+
+    # Completed 10 days after a start planned to take 5; later edits do not move its completion
+    history = Tasks.get_overrun_history(project["id"])
+    assert len(history) == 1 and abs(history[0] - 2.0) < 0.01
+    TaskModel.update(updated_at=now + timedelta(days=30)).where(TaskModel.project_id == project["id"]).execute()
+    assert Tasks.get_overrun_history(project["id"]) == history
+
+    response = client.get(f"/api/v1/scheduling/forecast/{project['id']}?iterations=1000", headers=headers)
+    assert response.status_code == 200
+    forecast = response.json()
+    assert forecast["tasks"] == 2
+    assert forecast["iterations"] == 1000
+    assert forecast["history_scope"] == "all"
+    assert forecast["history_size"] >= 1
+    finishes = [p["finish"] for p in forecast["percentiles"]]
+    assert [p["percentile"] for p in forecast["percentiles"]] == [50, 80, 90, 95]
+    assert finishes == sorted(finishes)
+    assert 0 <= forecast["on_time_probability"] <= 1
+
+    # Cached until the project changes
+    again = client.get(f"/api/v1/scheduling/forecast/{project['id']}?iterations=1000", headers=headers).json()
+    assert again["computed_at"] == forecast["computed_at"]
+    client.put(f"/api/v1/tasks/{task['id']}", headers=headers, json={"status": "in_progress"})
+    again = client.get(f"/api/v1/scheduling/forecast/{project['id']}?iterations=1000", headers=headers).json()
+    assert again["computed_at"] != forecast["computed_at"]
+
+    # ... or until the next day, even if nobody touches it
+    class Tomorrow(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz) + timedelta(days=1)
+
+    monkeypatch.setattr(scheduling_endpoint, "datetime", Tomorrow)
+    later = client.get(f"/api/v1/scheduling/forecast/{project['id']}?iterations=1000", headers=headers).json()
+    assert later["computed_at"][:10] > again["computed_at"][:10]
+    assert min(p["finish"] for p in later["percentiles"]) >= later["computed_at"]
+
+    response = client.get(
+        f"/api/v1/scheduling/forecast/{project['id']}",
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 403
@@ -0,0 +1,263 @@
+import asyncio
+import json
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from app.api.v1.endpoints import sync as sync_endpoint
+from app.db import relational
+from app.db.relational import Changes
+from app.services.change_stream import RESYNC, ChangeStream
+from tests.test_tasks import create_test_project
+
+
+def create_task(client: TestClient, headers, project_id, name="Task"):
+    response = client.post(
+        "/api/v1/tasks/",
+        headers=headers,
+        json={
+            "name": name,
+            "description": "",
+            "project_id": project_id,
+            "start_date": datetime.now().isoformat(),
+            "deadline": (datetime.now() + timedelta(days=2)).isoformat()
+        }
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def sync(client: TestClient, headers, since=None, **params):
+    if since is not None:
+        params["since"] = since
+    response = client.get("/api/v1/sync/", headers=headers, params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_delta_sync(client: TestClient, admin_token, user_token, monkeypatch):
+    admin = {"Authorization": f"Bearer {admin_token}"}
+    user = {"Authorization": f"Bearer {user_token}"}
+    user_id = client.get("/api/v1/userinfo/", headers=user).json()["id"]
+
+    start = sync(client, user)["next_cursor"]
+    project = create_test_project(client, admin_token)
+    kept = create_task(client, admin, project["id"], "Kept")
+    doomed = create_task(client, admin, project["id"], "Doomed")
+
+    # Not a member yet: nothing of the project shows
+    changes = sync(client, user, start)
+    assert project["id"] not in [p["id"] for p in changes["projects"]]
+    assert not changes["tasks"] and not changes["has_more"]
+
+    # Joining brings the whole project, rows older than the cursor included
+    assert client.post(
+        f"/api/v1/projects/{project['id']}/members", headers=admin, json={"user_id": user_id}
+    ).status_code == 200
+    changes = sync(client, user, start)
+    assert [p["id"] for p in changes["projects"]] == [project["id"]]
+    assert {t["id"] for t in changes["tasks"]} == {kept["id"], doomed["id"]}
+    assert user_id in [m["user_id"] for m in changes["members"]]
+    cursor = changes["next_cursor"]
+    assert sync(client, user, cursor)["tasks"] == []
+
+    # Updates, deletes and comments since the cursor; a task changed twice shows once
+    client.put(f"/api/v1/tasks/{kept['id']}", headers=admin, json={"name": "Renamed"})
+    client.put(f"/api/v1/tasks/{kept['id']}", headers=admin, json={"status": "in_progress"})
+    assert client.delete(f"/api/v1/tasks/{doomed['id']}", headers=admin).status_code == 200
+    comment = client.post(
+        "/api/v1/comments/", headers=admin, json={"task_id": kept["id"], "content": "Hi"}
+    ).json()
+    changes = sync(client, user, cursor)
+    assert [(t["id"], t["name"], t["status"]) for t in changes["tasks"]] == [
+        (kept["id"], "Renamed", "in_progress")
+    ]
+    assert [c["id"] for c in changes["comments"]] == [comment["id"]]
+    assert changes["deleted"] == [{"entity": "task", "id": doomed["id"]}]
+    # Starting a task moved the project along
+    assert [p["status"] for p in changes["projects"]] == ["in_progress"]
+
+    # Paging
+    first = sync(client, user, cursor, limit=1)
+    assert first["has_more"] and len(first["tasks"]) + len(first["deleted"]) + len(first["comments"]) == 1
+    rest = sync(client, user, first["next_cursor"])
+    assert not rest["has_more"] and len(rest["tasks"]) + len(rest["deleted"]) + len(rest["comments"]) == 2
+    cursor = rest["next_cursor"]
+
+    # Losing access reads as the project being deleted
+    assert client.delete(
+        f"/api/v1/projects/{project['id']}/members/{user_id}", headers=admin
+    ).status_code == 200
+    changes = sync(client, user, cursor)
+    assert {"entity": "project", "id": project["id"]} in changes["deleted"]
+    assert [d["entity"] for d in changes["deleted"]].count("member") == 1
+    after_removal = changes["next_cursor"]
+    client.put(f"/api/v1/tasks/{kept['id']}", headers=admin, json={"name": "Unseen"})
+    assert sync(client, user, after_removal)["tasks"] == []
+    changes = sync(client, admin, after_removal)
+    assert [t["name"] for t in changes["tasks"]] == ["Unseen"]
+    assert changes["projects"] == []  # the version bump is not a project change
+
+    # Cursors older than the oldest kept tombstone get a full resync
+    monkeypatch.setattr(relational, "SYNC_TOMBSTONE_DAYS", -1)
+    assert Changes.prune_tombstones() >= 2
+    changes = sync(client, admin, cursor)
+    assert changes["reset"] and changes["deleted"] == []
+    assert kept["id"] in [t["id"] for t in changes["tasks"]]
+    assert not sync(client, admin, changes["next_cursor"])["reset"]
+
+    response = client.get("/api/v1/sync/", headers=user, params={"since": "bogus"})
+    assert response.status_code == 400
+
+
+def drain(subscriber):
+    events = []
+    while not subscriber.queue.empty():
+        event = subscriber.queue.get_nowait()
+        events.append("resync" if event is RESYNC else json.loads(event.split("data: ")[1]))
+    return events
+
+
+def test_change_stream(client: TestClient, admin_token, user_token, monkeypatch):
+    admin = {"Authorization": f"Bearer {admin_token}"}
+    user = {"Authorization": f"Bearer {user_token}"}
+    admin_id = client.get("/api/v1/userinfo/", headers=admin).json()["id"]
+    user_id = client.get("/api/v1/userinfo/", headers=user).json()["id"]
+    project = create_test_project(client, admin_token)
+    other = create_test_project(client, admin_token)
+
+    loop = asyncio.new_event_loop()
+    stream = ChangeStream(poll_interval=60, queue_size=3)
+
+    async def subscribe(*args):
+        return stream.subscribe(*args)
+
+    try:
+        everything = loop.run_until_complete(subscribe(admin_id, True, [], None))
+        mine = loop.run_until_complete(subscribe(user_id, False, [], None))
+        one_project = loop.run_until_complete(subscribe(user_id, False, [], project["id"]))
+        assert stream.connections(user_id) == 2
+
+        task = create_task(client, admin, project["id"])
+        stream.poll()
+        assert task["id"] in [e["id"] for e in drain(everything)]
+        assert drain(mine) == [] and drain(one_project) == []
+
+        # Joining a project starts its events, on every stream of the user
+        client.post(f"/api/v1/projects/{project['id']}/members", headers=admin, json={"user_id": user_id})
+        client.post(f"/api/v1/projects/{other['id']}/members", headers=admin, json={"user_id": user_id})
+        create_task(client, admin, other["id"])
+        stream.poll()
+        assert [e["entity"] for e in drain(mine)] == ["member", "member", "task"]
+        assert [e["entity"] for e in drain(one_project)] == ["member"]
+        drain(everything)
+
+        # A stream that falls behind is told to resync instead of growing
+        for _ in range(4):
+            create_task(client, admin, other["id"])
+        stream.poll()
+        assert mine.overflowed and mine.queue.qsize() == 1
+        assert loop.run_until_complete(mine.next_event(0.1)) is RESYNC
+        assert mine.dropped > 0 and not mine.overflowed
+        assert loop.run_until_complete(mine.next_event(0.01)) is None
+        assert drain(one_project) == []
+        assert loop.run_until_complete(everything.next_event(0.1)) is RESYNC
+
+        # Losing access reads as the project being deleted
+        client.delete(f"/api/v1/projects/{project['id']}/members/{user_id}", headers=admin)
+        client.put(f"/api/v1/tasks/{task['id']}", headers=admin, json={"name": "Unseen"})
+        stream.poll()
+        assert drain(one_project) == [
+            {"entity": "project", "id": project["id"], "project_id": project["id"], "deleted": True}
+        ]
+        assert [e["entity"] for e in drain(mine)] == ["project"]
+        assert [e["entity"] for e in drain(everything)] == ["member", "task"]
+
+        stream.unsubscribe(mine)
+        assert stream.connections(user_id) == 1
+    finally:
+        for subscriber in list(stream.subscribers):
+            stream.unsubscribe(subscriber)
+        stream._poller.cancel()
+        loop.run_until_complete(asyncio.gather(stream._poller, return_exceptions=True))
+        loop.close()
+
+    client.delete(f"/api/v1/projects/{other['id']}/members/{user_id}", headers=admin)
+    response = client.get("/api/v1/sync/events", headers=user, params={"project_id": project["id"]})
+    assert response.status_code == 403
+    monkeypatch.setattr(sync_endpoint, "SYNC_STREAM_MAX_PER_USER", 0)
+    assert client.get("/api/v1/sync/events", headers=user).status_code == 429
+
+
+def test_stream_limit_across_workers():
+    loop = asyncio.new_event_loop()
+    # Two workers, each with its own fan-out, sharing the database
+    workers = [ChangeStream(poll_interval=60, queue_size=3), ChangeStream(poll_interval=60, queue_size=3)]
+
+    async def subscribe(worker):
+        return worker.subscribe("stream-user", False, [], None, max_per_user=2)
+
+    try:
+        first = loop.run_until_complete(subscribe(workers[0]))
+        assert loop.run_until_complete(subscribe(workers[1])) is not None
+        assert loop.run_until_complete(subscribe(workers[1])) is None
+        assert workers[0].connections("stream-user") == 2
+
+        workers[0].unsubscribe(first)
+        assert loop.run_until_complete(subscribe(workers[0])) is not None
+        assert loop.run_until_complete(subscribe(workers[0])) is None
+
+        # Streams of a worker that stopped refreshing them stop counting
+        relational.EventStreamModel.update(seen_at=datetime.now() - timedelta(hours=1)).where(
+            relational.EventStreamModel.id.in_([s.stream_id for s in workers[1].subscribers])
+        ).execute()
+        assert loop.run_until_complete(subscribe(workers[0])) is not None
+        assert workers[0].connections("stream-user") == 2
+    finally:
+        for worker in workers:
+            for subscriber in list(worker.subscribers):
+                worker.unsubscribe(subscriber)
+            if worker._poller is not None:
+                worker._poller.cancel()
+                loop.run_until_complete(asyncio.gather(worker._poller, return_exceptions=True))
+        loop.close()
+    assert Changes.count_streams("stream-user") == 0
+
+
+def test_event_stream_body(monkeypatch):
+    loop = asyncio.new_event_loop()
+    stream = ChangeStream(poll_interval=60, queue_size=3)
+    monkeypatch.setattr(sync_endpoint, "ChangeEvents", stream)
+    monkeypatch.setattr(sync_endpoint, "SYNC_STREAM_HEARTBEAT", 0.01)
+
+    class Request:
+        disconnected = False
+
+        async def is_disconnected(self):
+            return self.disconnected
+
+    async def subscribe():
+        return stream.subscribe("body-user", True, [], None)
+
+    try:
+        subscriber = loop.run_until_complete(subscribe())
+        request = Request()
+        # Reconnecting with an event id from before the stream started: changes may be lost
+        events = sync_endpoint.SyncEndpoint()._events(request, subscriber, subscriber.start_seq - 1)
+        assert loop.run_until_complete(events.__anext__()) is RESYNC
+        # Nothing to send: a keep-alive comment holds the connection open
+        assert loop.run_until_complete(events.__anext__()) == ": keep-alive\n\n"
+        subscriber.offer("event: change\ndata: {}\n\n")
+        assert loop.run_until_complete(events.__anext__()) == "event: change\ndata: {}\n\n"
+
+        # Once the client is gone the stream ends and gives up its place
+        request.disconnected = True
+        with pytest.raises(StopAsyncIteration):
+            loop.run_until_complete(events.__anext__())
+        assert subscriber not in stream.subscribers
+        assert Changes.count_streams("body-user") == 0
+    finally:
+        for subscriber in list(stream.subscribers):
+            stream.unsubscribe(subscriber)
+        stream._poller.cancel()
+        loop.run_until_complete(asyncio.gather(stream._poller, return_exceptions=True))
+        loop.close()
@@ -131,6 +131,28 @@ def test_delete_task(client: TestClient, admin_token):
     assert not any(t["id"] == task["id"] for t in tasks)
 
 
+def test_delete_task_failure(client: TestClient, admin_token, monkeypatch):
+    from app.db import relational
+    from peewee import OperationalError
+
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    project = create_test_project(client, admin_token)
+    task = create_test_task(client, admin_token, project["id"])
+
+    def locked(rows):
+        raise OperationalError("database is locked")
+
+    # A failed delete is an error, not a missing task, and leaves the task in place
+    monkeypatch.setattr(relational.StatusHistory, "record", locked)
+    response = client.delete(f"/api/v1/tasks/{task['id']}", headers=headers)
+    assert response.status_code == 500
+    monkeypatch.undo()
+    assert client.get(f"/api/v1/tasks/{task['id']}", headers=headers).status_code == 200
+
+    assert client.delete(f"/api/v1/tasks/{task['id']}", headers=headers).status_code == 200
+    assert client.delete(f"/api/v1/tasks/{task['id']}", headers=headers).status_code == 404
+
+
 def test_gantt_chart(client: TestClient, admin_token):
     # First create a project with tasks
     project = create_test_project(client, admin_token)
@@ -159,3 +181,433 @@ def test_gantt_chart(client: TestClient, admin_token):
         assert "end" in task
         assert "progress" in task
         assert task["progress"] in [0.0, 0.5, 1.0]
+
+
+def test_conditional_get_tasks_and_gantt(client: TestClient, admin_token):
+    project = create_test_project(client, admin_token)
+    task = create_test_task(client, admin_token, project["id"])
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    urls = [f"/api/v1/tasks/?project_id={project['id']}", f"/api/v1/gantt/{project['id']}"]
+
+    etags = {}
+    for url in urls:
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        etags[url] = response.headers["ETag"]
+        response = client.get(url, headers={**headers, "If-None-Match": etags[url]})
+        assert response.status_code == 304
+    assert len(set(etags.values())) == len(urls)
+
+    # Changing a task invalidates both representations
+    response = client.put(
+        f"/api/v1/tasks/{task['id']}",
+        headers=headers,
+        json={"status": "in_progress"}
+    )
+    assert response.status_code == 200
+    for url in urls:
+        response = client.get(url, headers={**headers, "If-None-Match": etags[url]})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etags[url]
+
+
+def test_gantt_time_window(client: TestClient, admin_token):
+    from app.db.relational import Tasks
+
+    project = create_test_project(client, admin_token)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    def create(name, start, days, parent=None):
+        response = client.post(
+            "/api/v1/tasks/",
+            headers=headers,
+            json={
+                "name": name,
+                "description": "",
+                "project_id": project["id"],
+                "start_date": start.isoformat(),
+                "deadline": (start + timedelta(days=days)).isoformat(),
+                "parent_task_id": parent["id"] if parent else None
+            }
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    year = create("Year", datetime(2026, 1, 1), 365)
+    spring = create("Spring", datetime(2026, 3, 1), 90, parent=year)
+    april = create("April", datetime(2026, 4, 1), 10, parent=spring)
+    create("January", datetime(2026, 1, 5), 10, parent=year)
+    create("Next year", datetime(2027, 2, 1), 10)
+
+    def window(**params):
+        response = client.get(f"/api/v1/gantt/{project['id']}", headers=headers, params=params)
+        assert response.status_code == 200
+        return [t["name"] for t in response.json()["tasks"]]
+
+    assert Tasks.interval_index
+    # April overlaps; its ancestors come along for context, parents first
+    assert window(**{"from": "2026-04-05T00:00:00", "to": "2026-04-06T00:00:00"}) == ["Year", "Spring", "April"]
+    assert window(**{"from": "2027-01-15T00:00:00"}) == ["Next year"]
+    assert {"Year", "January", "Next year"} <= set(window())
+
+    # The index follows date changes
+    response = client.put(
+        f"/api/v1/tasks/{april['id']}",
+        headers=headers,
+        json={"start_date": "2027-02-03T00:00:00", "deadline": "2027-02-04T00:00:00"}
+    )
+    assert response.status_code == 200
+    assert window(**{"from": "2027-01-15T00:00:00"}) == ["Year", "Spring", "April", "Next year"]
+
+    response = client.get(
+        f"/api/v1/gantt/{project['id']}",
+        headers=headers,
+        params={"from": "2027-01-01T00:00:00", "to": "2026-01-01T00:00:00"}
+    )
+    assert response.status_code == 400
+
+
+def test_gantt_portfolio(client: TestClient, admin_token, user_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    user_headers = {"Authorization": f"Bearer {user_token}"}
+    project = create_test_project(client, admin_token)
+    done = create_test_task(client, admin_token, project["id"])
+    create_test_task(client, admin_token, project["id"])
+    response = client.put(f"/api/v1/tasks/{done['id']}", headers=headers, json={"status": "completed"})
+    assert response.status_code == 200
+
+    response = client.get("/api/v1/gantt/portfolio", headers=headers, params={"include_tasks": True})
+    assert response.status_code == 200
+    bars = response.json()["tasks"]
+    project_bar = next(b for b in bars if b["id"] == project["id"])
+    assert project_bar["kind"] == "project"
+    assert project_bar["progress"] == 0.5
+    task_bars = [b for b in bars if b["parent"] == project["id"]]
+    assert len(task_bars) == 2 and all(b["kind"] == "task" for b in task_bars)
+    # Task bars directly follow their project bar
+    index = bars.index(project_bar)
+    assert bars[index + 1:index + 3] == task_bars
+
+    summary = client.get("/api/v1/gantt/portfolio", headers=headers, params={"summary": True}).json()["tasks"]
+    assert all(b["kind"] == "project" for b in summary)
+
+    # Revalidation, and invalidation by any write in a visible project
+    etag = response.headers["ETag"]
+    params = {"include_tasks": True}
+    assert client.get("/api/v1/gantt/portfolio", headers={**headers, "If-None-Match": etag}, params=params).status_code == 304
+    create_test_task(client, admin_token, project["id"])
+    assert client.get("/api/v1/gantt/portfolio", headers={**headers, "If-None-Match": etag}, params=params).status_code == 200
+
+    # Windows far from every project return nothing; users only see their own projects
+    far = client.get("/api/v1/gantt/portfolio", headers=headers, params={"from": "1990-01-01T00:00:00", "to": "1990-02-01T00:00:00"})
+    assert far.json()["tasks"] == []
+    mine = client.get("/api/v1/gantt/portfolio", headers=user_headers).json()["tasks"]
+    assert all(b["id"] != project["id"] for b in mine)
+
+
+def test_task_hierarchy(client: TestClient, admin_token, monkeypatch):
+    from app.db import relational
+
+    project = create_test_project(client, admin_token)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    def create(name, parent=None):
+        return client.post(
+            "/api/v1/tasks/",
+            headers=headers,
+            json={
+                "name": name,
+                "description": "",
+                "project_id": project["id"],
+                "start_date": datetime.now().isoformat(),
+                "deadline": (datetime.now() + timedelta(days=7)).isoformat(),
+                "parent_task_id": parent["id"] if parent else None
+            }
+        )
+
+    root = create("Root").json()
+    child = create("Child", root).json()
+    grandchild = create("Grandchild", child).json()
+    sibling = create("Sibling").json()
+
+    response = client.get(f"/api/v1/tasks/{root['id']}/subtree", headers=headers)
+    assert response.status_code == 200
+    subtree = response.json()
+    assert subtree["subtasks"][0]["name"] == "Child"
+    assert subtree["subtasks"][0]["subtasks"][0]["name"] == "Grandchild"
+
+    response = client.get(f"/api/v1/tasks/{grandchild['id']}/ancestors", headers=headers)
+    assert [t["name"] for t in response.json()] == ["Root", "Child"]
+
+    # A task cannot move under its own subtree
+    response = client.put(f"/api/v1/tasks/{root['id']}", headers=headers, json={"parent_task_id": grandchild["id"]})
+    assert response.status_code == 400
+
+    # Completion looks past direct children
+    client.put(f"/api/v1/tasks/{child['id']}", headers=headers, json={"status": "completed"})
+    response = client.put(f"/api/v1/tasks/{root['id']}", headers=headers, json={"status": "completed"})
+    assert response.status_code == 400
+
+    # Reparenting carries the whole subtree along
+    response = client.put(f"/api/v1/tasks/{child['id']}", headers=headers, json={"parent_task_id": sibling["id"]})
+    assert response.status_code == 200
+    response = client.get(f"/api/v1/tasks/{grandchild['id']}/ancestors", headers=headers)
+    assert [t["name"] for t in response.json()] == ["Sibling", "Child"]
+
+    monkeypatch.setattr(relational, "TASK_MAX_DEPTH", 2)
+    assert create("Too deep", grandchild).status_code == 400
+    response = client.put(f"/api/v1/tasks/{sibling['id']}", headers=headers, json={"parent_task_id": root["id"]})
+    assert response.status_code == 400
+
+    # Deleting a parent removes every level below it
+    assert client.delete(f"/api/v1/tasks/{sibling['id']}", headers=headers).status_code == 200
+    for task in (child, grandchild):
+        assert client.get(f"/api/v1/tasks/{task['id']}", headers=headers).status_code == 404
+    assert client.get(f"/api/v1/tasks/{root['id']}/subtree", headers=headers).json()["subtasks"] == []
+
+
+def test_task_progress_rollup(client: TestClient, admin_token):
+    project = create_test_project(client, admin_token)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    start = datetime(2026, 5, 4)
+
+    def create(name, days, parent=None):
+        response = client.post(
+            "/api/v1/tasks/",
+            headers=headers,
+            json={
+                "name": name,
+                "description": "",
+                "project_id": project["id"],
+                "start_date": start.isoformat(),
+                "deadline": (start + timedelta(days=days)).isoformat(),
+                "parent_task_id": parent["id"] if parent else None
+            }
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    def progress(task):
+        return client.get(f"/api/v1/tasks/{task['id']}", headers=headers).json()["progress"]
+
+    root = create("Root", 10)
+    short = create("Short", 1, root)
+    phase = create("Phase", 10, root)
+    long = create("Long", 3, phase)
+
+    # Leaves are weighted by their own duration; parents' dates do not count
+    response = client.put(f"/api/v1/tasks/{long['id']}", headers=headers, json={"status": "completed"})
+    assert response.json()["progress"] == 1.0
+    assert progress(phase) == 1.0
+    assert progress(root) == 0.75
+
+    response = client.put(f"/api/v1/tasks/{short['id']}", headers=headers, json={"status": "in_progress"})
+    assert progress(root) == 0.875
+    bars = client.get(f"/api/v1/gantt/{project['id']}", headers=headers).json()["tasks"]
+    assert {bar["name"]: bar["progress"] for bar in bars}["Root"] == 0.875
+
+    # Moving and deleting subtrees carry their totals along
+    response = client.put(f"/api/v1/tasks/{phase['id']}", headers=headers, json={"parent_task_id": short["id"]})
+    assert response.status_code == 200
+    assert progress(short) == 1.0
+    assert progress(root) == 1.0
+    assert client.delete(f"/api/v1/tasks/{phase['id']}", headers=headers).status_code == 200
+    # Short is a leaf again, in progress on its own
+    assert progress(short) == 0.5
+    assert progress(root) == 0.5
+
+
+def test_my_tasks(client: TestClient, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = client.post(
+        "/signup",
+        json={"username": "mywork@test.com", "password": "myworkpass123", "name": "My Work"}
+    )
+    assert response.status_code == 200
+    user_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    user_id = client.get("/api/v1/userinfo/", headers=user_headers).json()["id"]
+
+    projects = [create_test_project(client, admin_token) for _ in range(2)]
+    for project in projects:
+        response = client.post(
+            f"/api/v1/projects/{project['id']}/members",
+            headers=headers,
+            json={"user_id": user_id, "role": "project_member"}
+        )
+        assert response.status_code == 200
+    elsewhere = create_test_project(client, admin_token)
+
+    start = datetime(2026, 6, 1)
+    for day, project in enumerate(projects * 2 + [elsewhere]):
+        response = client.post(
+            "/api/v1/tasks/",
+            headers=headers,
+            json={
+                "name": f"Due {day}",
+                "description": "",
+                "project_id": project["id"],
+                "start_date": start.isoformat(),
+                "deadline": (start + timedelta(days=day)).isoformat(),
+                "assigned_to_id": user_id
+            }
+        )
+        assert response.status_code == 200
+    client.put(f"/api/v1/tasks/{response.json()['id']}", headers=headers, json={"status": "completed"})
+
+    # Pages follow the deadline order across projects; other projects stay hidden
+    names, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/v1/tasks/mine", headers=user_headers, params=params)
+        assert response.status_code == 200
+        page = response.json()
+        names += [task["name"] for task in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert names == ["Due 0", "Due 1", "Due 2", "Due 3"]
+    assert page["items"][0]["project_name"] == "Test Project"
+
+    response = client.get(
+        "/api/v1/tasks/mine",
+        headers=user_headers,
+        params={"due_after": "2026-06-02T00:00:00", "due_before": "2026-06-04T00:00:00"}
+    )
+    assert [task["name"] for task in response.json()["items"]] == ["Due 1", "Due 2"]
+
+    # Admins see every project they created tasks in, filtered by status
+    response = client.get("/api/v1/tasks/mine", headers=headers, params={"status": "completed", "limit": 200})
+    assert "Due 4" in [task["name"] for task in response.json()["items"]]
+
+    response = client.get("/api/v1/tasks/mine", headers=user_headers, params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_rank_keys():
+    from app.services.ranking import rank_between, spaced_keys
+
+    keys = spaced_keys(100)
+    assert keys == sorted(keys) and len(set(keys)) == 100 and max(map(len, keys)) == 2
+    low, high = "a", "b"
+    for _ in range(30):
+        high = rank_between(low, high)
+        assert low < high
+    # Appending and prepending step past the neighbour instead of halving the gap
+    last = first = "V"
+    for _ in range(100):
+        last, first = rank_between(last, None), rank_between(None, first)
+    assert len(last) <= 3 and len(first) <= 3
+    assert all(not key.endswith("0") for key in (last, first, high))
+
+
+def test_manual_task_order(client: TestClient, admin_token, monkeypatch):
+    from app.api.v1.endpoints import tasks as tasks_endpoint
+    from app.db.relational import Tasks
+
+    project = create_test_project(client, admin_token)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    a, b, c = (create_test_task(client, admin_token, project["id"]) for _ in range(3))
+
+    def order():
+        response = client.get("/api/v1/tasks/", headers=headers, params={"project_id": project["id"], "order": "rank"})
+        return [task["id"] for task in response.json()]
+
+    def move(task, **body):
+        return client.post(f"/api/v1/tasks/{task['id']}/move", headers=headers, json=body)
+
+    assert order() == [a["id"], b["id"], c["id"]]
+    response = move(c, after_id=a["id"])
+    assert response.status_code == 200
+    # A move writes nothing but the rank
+    assert response.json()["updated_at"] == c["updated_at"]
+    assert order() == [a["id"], c["id"], b["id"]]
+    assert move(b, before_id=a["id"]).status_code == 200
+    assert order() == [b["id"], a["id"], c["id"]]
+    assert move(b).status_code == 200
+    assert order() == [a["id"], c["id"], b["id"]]
+
+    # Dropping into another column is a status change too; the board reads in rank order
+    assert move(a, after_id=c["id"], status="completed").status_code == 200
+    board = client.get(f"/api/v1/projects/{project['id']}/board", headers=headers).json()
+    cards = {column["status"]: [card["id"] for card in column["cards"]] for column in board["columns"]}
+    assert cards["pending"] == [c["id"], b["id"]] and cards["completed"] == [a["id"]]
+
+    assert move(a, after_id=b["id"], before_id=c["id"]).status_code == 400
+    # A bad neighbour fails the whole move, column change included
+    assert move(b, after_id="missing", status="completed").status_code == 400
+    assert client.get(f"/api/v1/tasks/{b['id']}", headers=headers).json()["status"] == "pending"
+    assert move(a, after_id=create_test_task(client, admin_token, create_test_project(client, admin_token)["id"])["id"]).status_code == 400
+
+    # Long keys are respaced after the response, keeping the order
+    monkeypatch.setattr(tasks_endpoint, "TASK_RANK_MAX_LENGTH", 0)
+    assert move(b, before_id=c["id"]).status_code == 200
+    tasks = client.get("/api/v1/tasks/", headers=headers, params={"project_id": project["id"], "order": "rank"}).json()
+    assert [task["id"] for task in tasks] == [b["id"], c["id"], a["id"]]
+    assert [task["rank"] for task in tasks] == ["F", "V", "k"]
+    assert Tasks.rebalance_ranks(project["id"]) == 3
+
+
+def test_task_batch(client: TestClient, admin_token, user_token, monkeypatch):
+    from app.api.v1.endpoints import tasks as tasks_endpoint
+    from app.models.task import TaskStatusTransition
+
+    project = create_test_project(client, admin_token)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    existing = create_test_task(client, admin_token, project["id"])
+
+    def new(name, ref=None, parent=None):
+        return {
+            "name": name, "description": "", "project_id": project["id"], "ref": ref, "parent_task_id": parent,
+            "start_date": datetime.now().isoformat(), "deadline": (datetime.now() + timedelta(days=2)).isoformat()
+        }
+
+    def batch(body, token=admin_token):
+        return client.post("/api/v1/tasks/batch", headers={"Authorization": f"Bearer {token}"}, json=body)
+
+    def task_count():
+        response = client.get("/api/v1/tasks/", headers=headers, params={"project_id": project["id"]})
+        return len(response.json())
+
+    # Children may come before their parents; temporary ids tie them together
+    response = batch({
+        "create": [new("Leaf", "c", "b"), new("Middle", "b", "a"), new("Top", "a"), new("Under existing", parent=existing["id"])],
+        "update": [{"id": existing["id"], "name": "Renamed", "status": "in_progress"}]
+    })
+    assert response.status_code == 200
+    result = response.json()
+    ids = result["ids"]
+    assert set(ids) == {"a", "b", "c"}
+    assert [t["name"] for t in result["created"]] == ["Leaf", "Middle", "Top", "Under existing"]
+    # Ranked after the project's tasks, in the order given
+    ranks = [t["rank"] for t in result["created"]]
+    assert ranks == sorted(ranks) and ranks[0] > existing["rank"]
+    assert [(t["name"], t["status"]) for t in result["updated"]] == [("Renamed", "in_progress")]
+    subtree = client.get(f"/api/v1/tasks/{ids['a']}/subtree", headers=headers).json()
+    assert subtree["subtasks"][0]["id"] == ids["b"] and subtree["subtasks"][0]["subtasks"][0]["id"] == ids["c"]
+    assert TaskStatusTransition.select().where(TaskStatusTransition.task_id == ids["c"]).count() == 1
+
+    # Completing a parent with its subtasks works in any order within the batch
+    response = batch({"update": [{"id": ids[ref], "status": "completed"} for ref in "abc"]})
+    assert response.status_code == 200
+    assert client.get(f"/api/v1/tasks/{ids['a']}", headers=headers).json()["progress"] == 1.0
+
+    # One invalid operation rejects the whole batch
+    count = task_count()
+    response = batch({"create": [new("Lost")], "update": [{"id": existing["id"], "status": "completed"}]})
+    assert response.status_code == 400
+    assert task_count() == count
+    assert batch({"create": [new("A", "x", "y"), new("B", "y", "x")]}).status_code == 400
+    assert batch({"create": [new("A", "x"), new("B", "x")]}).status_code == 400
+    assert batch({"create": [new("A", parent="missing")]}).status_code == 400
+    assert batch({"delete": ["missing"]}).status_code == 404
+    assert batch({"create": [new("A")]}, token=user_token).status_code == 403
+    assert batch({"update": [{"id": existing["id"], "project_id": "other"}]}).status_code == 400
+    monkeypatch.setattr(tasks_endpoint, "TASK_BATCH_MAX_SIZE", 1)
+    assert batch({"create": [new("A"), new("B")]}).status_code == 400
+    monkeypatch.undo()
+
+    # Deletes take the subtasks along
+    response = batch({"delete": [ids["a"]]})
+    assert response.status_code == 200
+    assert set(response.json()["deleted"]) == {ids["a"], ids["b"], ids["c"]}
+    assert task_count() == count - 1
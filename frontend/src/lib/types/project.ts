@@ -57,6 +57,10 @@ export interface GanttTask {
     end: string;
     progress: number;
     dependencies?: string[];
+    critical?: boolean;
+    slack?: number | null;
+    parent?: string | null;
+    kind?: 'project' | 'task';
 }
 
 export interface Comment {